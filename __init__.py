@@ -1,3 +1,17 @@
-from CarGame.player import Player
-from CarGame.game import Game
-from CarGame.game_map import GameMap
+import importlib
+import os
+import sys
+
+package_folder = os.path.dirname(os.path.abspath(__file__))
+"""The folder of the game, added to sys.path since its modules import each other by their plain names."""
+if package_folder not in sys.path:
+    sys.path.insert(0, package_folder)
+
+lazy_exports = {"Player": "player", "Game": "game", "GameMap": "game_map"}
+"""The classes exported by the package, with the module they come from, only imported (along with pygame) once used."""
+
+
+def __getattr__(name: str):
+    if name in lazy_exports:
+        return getattr(importlib.import_module(lazy_exports[name]), name)
+    raise AttributeError("module " + repr(__name__) + " has no attribute " + repr(name))
@@ -0,0 +1,200 @@
+import argparse
+import importlib
+import os
+import sys
+import time
+
+startup_budget = 1.0
+"""The time (in seconds) the game may take from its launch to its first frame, a warning being printed above it."""
+
+
+class StartupTimer:
+    """A class used to measure the steps of the startup of the game, from the launch of the program.
+
+    Attributes
+    ----------
+    start: float
+        the time.perf_counter() of the launch.
+    steps: list
+        the name and the duration (in seconds) of each step measured so far.
+
+    Methods
+    -------
+    step(name)
+        Used to end a step of the startup.
+
+    load(module)
+        Used to import a module as a step of the startup.
+
+    report()
+        Used to describe the steps of the startup.
+    """
+
+    def __init__(self, start: float):
+        self.start = start
+        self.last = start
+        self.steps = []
+
+    def step(self, name: str):
+        """Used to end a step of the startup, begun at the end of the previous one."""
+        now = time.perf_counter()
+        self.steps.append((name, now - self.last))
+        self.last = now
+
+    def load(self, module: str):
+        """Used to import a module as a step of the startup.
+
+        :return: the module.
+        """
+        loaded = importlib.import_module(module)
+        self.step("import " + module)
+        return loaded
+
+    @property
+    def elapsed(self):
+        return self.last - self.start
+
+    def report(self):
+        """Used to describe the steps of the startup.
+
+        :return: a string with the duration of each step and the total, in milliseconds.
+        """
+        return "Startup: " + ", ".join(
+            name + " " + str(round(seconds * 1000, 2)) + "ms" for name, seconds in self.steps
+        ) + ", total " + str(round(self.elapsed * 1000, 2)) + "ms"
+
+
+def player_names(names: list, player_count: int, bot_count: int):
+    """Used to complete the names given on the command line, the missing ones being "Player #n" for the players and
+    "Bot n" for the computer, as asked by main.py.
+
+    :return: the name of each player.
+    """
+    human_count = player_count - bot_count
+    defaults = ["Player #" + str(a + 1) for a in range(human_count)] + ["Bot " + str(a + 1) for a in range(bot_count)]
+    return list(names) + defaults[len(names):]
+
+
+def play_headless(options, names: list, timer: StartupTimer):
+    """Used to play a game between computer players without any window, as tournament.play_game does, the rollouts of
+    the monte_carlo bots running on the processes of the ai pool as in the windowed game.
+
+    :return: the exit status of the program.
+    """
+    tournament = timer.load("tournament")
+    tournament.load_map(options.map)
+    timer.step("load map")
+    if options.check_startup:
+        return check_startup(timer, options.startup_budget)
+    seed = options.seed if options.seed is not None else int(time.time_ns() % 2**32)
+    policy = options.policy or "monte_carlo"  # constants.ai_policy, which can't be read without importing pygame
+    ai = tournament.ai
+    if policy == "monte_carlo" and options.workers != 0:
+        ai.warm_pool(options.workers)
+    try:
+        result = tournament.play_game(options.map, (policy,) * options.players, seed, options.budget,
+                                      workers=ai.pool_workers)
+    finally:
+        ai.shutdown_pool()
+    for number, name in enumerate(names):
+        print(name.ljust(16), result["outcomes"][number].ljust(10), result["moves"][number], "moves")
+    if result["winner"] is not None:
+        print("Congratulations for reaching the end,", names[result["winner"]], "!")
+    print("Played in", round(result["seconds"], 3), "s (seed", str(seed) + ")")
+    return 0
+
+
+def play_window(options, names: list, timer: StartupTimer):
+    """Used to open the window of the game and play it, pygame being only imported now.
+
+    :return: the exit status of the program.
+    """
+    timer.load("pygame")
+    main = timer.load("main")
+    warm_up = main.assets.registry.warm_up()
+    if options.budget is not None:
+        main.constants.ai_time_budget = options.budget
+    warm_up.join()
+    game = main.new_game(options.map, names, options.bots, options.policy, timer.start)
+    timer.step("open window")
+    if options.check_startup:
+        game.game.camera.follow(game.game.player_list[0].position)
+        game.render()
+        timer.step("first frame")
+        status = check_startup(timer, options.startup_budget)
+        main.pygame.quit()
+        return status
+    main.play(game)
+    print(timer.report())
+    if game.first_frame_time is not None and game.first_frame_time > options.startup_budget:
+        print("Warning: the first frame took longer than the startup budget of", options.startup_budget, "s",
+              file=sys.stderr)
+    return 0
+
+
+def check_startup(timer: StartupTimer, budget: float):
+    """Used to compare the startup of the game to its budget.
+
+    :return: the exit status of the program, 1 if the startup took longer than the budget.
+    """
+    print(timer.report())
+    if timer.elapsed > budget:
+        print("The startup took longer than its budget of", round(budget * 1000, 2), "ms", file=sys.stderr)
+        return 1
+    return 0
+
+
+def main(arguments=None):
+    timer = StartupTimer(time.perf_counter())
+    folder = os.path.dirname(os.path.abspath(__file__))
+    if folder not in sys.path:
+        sys.path.insert(0, folder)
+    os.chdir(folder)
+    ai = timer.load("ai")
+    parser = argparse.ArgumentParser(prog="CarGame", description="Plays a race, without asking anything on startup.")
+    parser.add_argument("--players", type=int, default=2, help="the number of players (between 1 and 8).")
+    parser.add_argument("--map", type=int, default=1, help="the number of the map.")
+    parser.add_argument("--names", nargs="*", default=[],
+                        help="the names of the players, the computer players coming last.")
+    parser.add_argument("--bots", type=int, default=None,
+                        help="the number of players controlled by the computer (none, or all of them if headless).")
+    parser.add_argument("--headless", action="store_true",
+                        help="play without any window (and without pygame), every player being a bot.")
+    parser.add_argument("--policy", default=None, choices=ai.policies,
+                        help="the policy of the computer players (constants.ai_policy by default).")
+    parser.add_argument("--budget", type=float, default=None,
+                        help="the time a monte_carlo bot can spend on each move, in seconds.")
+    parser.add_argument("--seed", type=int, default=None, help="the seed of a headless game, to play it again.")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="the number of processes running the rollouts of the monte_carlo bots of a headless game "
+                             "(one per core by default, 0 to run them in the main process).")
+    parser.add_argument("--startup-budget", type=float, default=startup_budget,
+                        help="the time the game may take from its launch to its first frame, in seconds.")
+    parser.add_argument("--check-startup", action="store_true",
+                        help="only start the game (up to its first frame), print the time it took and exit with an "
+                             "error if it is over --startup-budget.")
+    options = parser.parse_args(arguments)
+    if not 0 < options.players < 9:
+        parser.error("there can be between 1 and 8 players")
+    if not os.path.exists("maps/map" + str(options.map) + ".csv"):
+        parser.error("there is no map " + str(options.map))
+    if options.bots is None:
+        options.bots = options.players if options.headless else 0
+    if not 0 <= options.bots <= options.players:
+        parser.error("there can't be more bots than players")
+    if options.headless and options.bots != options.players:
+        parser.error("a headless game can only be played by bots")
+    if len(options.names) > options.players:
+        parser.error("there are more names than players")
+    if options.headless and options.budget is None:
+        options.budget = 0.1
+    names = player_names(options.names, options.players, options.bots)
+    timer.step("parse arguments")
+
+    if options.headless:
+        return play_headless(options, names, timer)
+    return play_window(options, names, timer)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,391 @@
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
+import time
+import numpy as np
+import rules
+import simulation
+from rules import PlayerState
+
+policies = ("random", "greedy", "monte_carlo")
+"""The ways an AI player can choose its acceleration."""
+
+rollout_depth = 20
+"""The highest number of moves of the AI player simulated by a rollout."""
+
+rollout_epsilon = 0.1
+"""The probability for a rollout to take a random safe move instead of the greedy one."""
+
+pool = None
+"""The process pool running the rollouts, created the first time it is needed."""
+pool_workers = 0
+"""The number of processes of the pool, 0 while there is no pool."""
+
+
+def landing_distances(distances: np.ndarray, landings: np.ndarray):
+    """Used to get the distance to the finish line of several tiles, the tiles outside of the map or from which the
+    finish line can't be reached being as far as possible.
+
+    Parameters
+    ----------
+    distances: np.array((width, height))
+        the distance field of the map (GameMap.distance_field).
+    landings: np.array((count, 2))
+        the coordinates of the tiles.
+    """
+    width, height = distances.shape
+    inside = (landings[:, 0] >= 0) & (landings[:, 0] < width) & (landings[:, 1] >= 0) & (landings[:, 1] < height)
+    result = np.full(len(landings), width * height)
+    reached = distances[landings[inside, 0], landings[inside, 1]]
+    result[np.flatnonzero(inside)[reached >= 0]] = reached[reached >= 0]
+    return result
+
+
+def candidate_actions(state: simulation.RaceState, player: int, occupancy=None, viability=None):
+    """Used to get the accelerations worth considering for a player: the safe ones (see rules.evaluate_moves), or the
+    ones that don't crash right away if none is safe.
+
+    Parameters
+    ----------
+    state: simulation.RaceState
+        the state of the game.
+    player: int
+        the number of the player.
+    occupancy: np.array((width, height)) (optional)
+        the players' traces, only the terrain being looked at if None.
+    viability: ViabilityTable (optional)
+        the viability table of the map (GameMap.viability_table), telling exactly which moves are unsafe, the
+        braking distance being used instead if None.
+
+    :return: the outcome of each acceleration and the array of the indexes of the candidates (empty if every move
+    crashes).
+    """
+    moves, unsafe = rules.evaluate_moves(
+        state.terrain, occupancy, state.positions[player], state.speeds[player], 2**player, viability=viability
+    )
+    candidates = np.flatnonzero(~unsafe)
+    if len(candidates) == 0:
+        candidates = np.flatnonzero(moves != rules.PATH_CRASH)
+    return moves, candidates
+
+
+def winning_action(state: simulation.RaceState, player: int, moves: np.ndarray):
+    """Used to find an acceleration landing the player on the finish line.
+
+    :return: the index of the acceleration, or None if there is none.
+    """
+    landings = state.positions[player] + state.speeds[player] + rules.accelerations
+    for action in np.flatnonzero(moves == rules.PATH_WIN):
+        x, y = landings[action]
+        if state.terrain[x, y] == rules.TERRAIN_WIN:
+            return int(action)
+    return None
+
+
+def greedy_action(state: simulation.RaceState, player: int, distances: np.ndarray, rng, epsilon: float = 0.0,
+                  occupancy=None, viability=None):
+    """Used to choose the acceleration bringing the player closest to the finish line among the safe ones, or a
+    random safe one with a probability of epsilon.
+
+    Parameters
+    ----------
+    state: simulation.RaceState
+        the state of the game.
+    player: int
+        the number of the player.
+    distances: np.array((width, height))
+        the distance field of the map.
+    rng: np.random.Generator
+        the random generator used for the random moves and to break ties.
+    epsilon: float (optional)
+        the probability of taking a random safe move, defaulting to 0.
+    occupancy: np.array((width, height)) (optional)
+        the players' traces, only the terrain being looked at if None.
+    viability: ViabilityTable (optional)
+        the viability table of the map (GameMap.viability_table), telling exactly which moves are unsafe, the
+        braking distance being used instead if None.
+
+    :return: the index of the acceleration, or simulation.RETIRE if every move crashes.
+    """
+    moves, candidates = candidate_actions(state, player, occupancy, viability)
+    action = winning_action(state, player, moves)
+    if action is not None:
+        return action
+    if len(candidates) == 0:
+        return simulation.RETIRE
+    if epsilon and rng.random() < epsilon:
+        return int(rng.choice(candidates))
+    landings = state.positions[player] + state.speeds[player] + rules.accelerations[candidates]
+    scores = landing_distances(distances, landings) + rng.random(len(candidates)) * 0.5
+    return int(candidates[np.argmin(scores)])
+
+
+def next_turn(state: simulation.RaceState):
+    """Used to give the turn to the next player who can still play.
+
+    :return: the RaceState with the turn changed.
+    """
+    turn = state.turn
+    for _ in range(state.player_count):
+        if state.states[turn] == simulation.CAN_PLAY:
+            break
+        turn = (turn + 1) % state.player_count
+    if turn == state.turn:
+        return state
+    return simulation.RaceState(state.terrain, state.positions, state.speeds, state.states, state.trails, turn)
+
+
+def rollout(state: simulation.RaceState, player: int, action: int, distances: np.ndarray, rng,
+            depth: int = rollout_depth, viability=None):
+    """Used to play a game from a state until its end (or depth moves of the player), the player starting with an
+    acceleration and every player then following greedy_action with a probability rollout_epsilon of a random move.
+
+    The score is between 0 and 1: 0 if the player crashes, at least 0.6 if he wins (more the sooner he does), and
+    between 0.1 and 0.5 depending on how much closer to the finish line he got if the game isn't over after depth
+    moves.
+
+    Parameters
+    ----------
+    state: simulation.RaceState
+        the state of the game, with the turn of the player.
+    player: int
+        the number of the player.
+    action: int
+        the index of the first acceleration of the player.
+    distances: np.array((width, height))
+        the distance field of the map.
+    rng: np.random.Generator
+        the random generator of the rollout.
+    depth: int (optional)
+        the highest number of moves of the player that are simulated.
+    viability: ViabilityTable (optional)
+        the viability table of the map, used by the greedy moves.
+
+    :return: the score of the rollout.
+    """
+    start = max(int(landing_distances(distances, state.positions[player][None])[0]), 1)
+    state, event = simulation.apply_move(state, player, action)
+    mover = player
+    moves = 1
+    while True:
+        if event == simulation.Event.WON:
+            return 0.6 + 0.4 * (1 - moves / (depth + 1)) if mover == player else 0.05
+        if state.states[player] == simulation.IS_OUT:
+            return 0.0
+        if moves >= depth:
+            break
+        state = next_turn(state)
+        mover = state.turn
+        if mover == player:
+            moves += 1
+        state, event = simulation.apply_move(
+            state, mover, greedy_action(state, mover, distances, rng, rollout_epsilon, viability=viability)
+        )
+    end = int(landing_distances(distances, state.positions[player][None])[0])
+    return 0.1 + 0.4 * float(np.clip((start - end) / start, 0, 1))
+
+
+def rollout_worker(state: simulation.RaceState, player: int, actions: list, distances: np.ndarray, budget: float,
+                   seed: int, viability=None):
+    """Used to run rollouts for each of the candidate accelerations, in turn, for a given time. This runs in the
+    processes of the pool.
+
+    Parameters
+    ----------
+    state: simulation.RaceState
+        the state of the game, with the turn of the player.
+    player: int
+        the number of the player.
+    actions: list
+        the indexes of the accelerations to evaluate.
+    distances: np.array((width, height))
+        the distance field of the map.
+    budget: float
+        the time to spend, in seconds (at least one rollout is run for each acceleration).
+    seed: int
+        the seed of the random generator.
+    viability: ViabilityTable (optional)
+        the viability table of the map, used by the greedy moves of the rollouts.
+
+    :return: the sum of the scores and the number of rollouts of each acceleration of rules.accelerations.
+    """
+    rng = np.random.default_rng(seed)
+    totals = np.zeros(len(rules.accelerations))
+    counts = np.zeros(len(rules.accelerations), dtype=np.int64)
+    end = time.perf_counter() + budget
+    index = 0
+    while index < len(actions) or time.perf_counter() < end:
+        action = actions[index % len(actions)]
+        totals[action] += rollout(state, player, action, distances, rng, viability=viability)
+        counts[action] += 1
+        index += 1
+    return totals, counts
+
+
+def get_pool(workers: int = None):
+    """Used to get the process pool running the rollouts, created (with one process per core by default) the first
+    time. The processes are spawned, so that they don't inherit the window of the game.
+
+    Parameters
+    ----------
+    workers: int (optional)
+        the number of processes, defaulting to the number of cores.
+    """
+    global pool, pool_workers
+    if pool is None:
+        pool_workers = workers or os.cpu_count() or 1
+        pool = ProcessPoolExecutor(max_workers=pool_workers, mp_context=multiprocessing.get_context("spawn"))
+    return pool
+
+
+def warm_pool(workers: int = None, wait: bool = True):
+    """Used to start the processes of the pool before the first move of an AI player, so that it doesn't eat into
+    his time budget.
+
+    Parameters
+    ----------
+    workers: int (optional)
+        the number of processes, defaulting to the number of cores.
+    wait: bool (optional)
+        whether to wait for the processes to be ready. Without waiting, they get ready in the background (the rollouts
+        measure their budget once started, so an early first move only takes longer).
+    """
+    executor = get_pool(workers)
+    futures = [executor.submit(os.getpid) for _ in range(pool_workers)]
+    if wait:
+        for future in futures:
+            future.result()
+
+
+def shutdown_pool():
+    """Used to stop the processes of the pool."""
+    global pool, pool_workers
+    if pool is not None:
+        pool.shutdown(cancel_futures=True)
+        pool = None
+        pool_workers = 0
+
+
+def monte_carlo_values(state: simulation.RaceState, player: int, actions, distances: np.ndarray, budget: float,
+                       workers: int = None, seed: int = None, viability=None):
+    """Used to estimate how good each acceleration is, by running rollouts on every process of the pool for the
+    time budget. The more cores and time, the more rollouts and the better the estimates.
+
+    Parameters
+    ----------
+    state: simulation.RaceState
+        the state of the game, with the turn of the player.
+    player: int
+        the number of the player.
+    actions: list
+        the indexes of the accelerations to evaluate.
+    distances: np.array((width, height))
+        the distance field of the map.
+    budget: float
+        the time to spend, in seconds.
+    workers: int (optional)
+        the number of processes used, defaulting to all the processes of the pool. With 0, the rollouts are run in
+        this process.
+    seed: int (optional)
+        the seed of the random generators.
+    viability: ViabilityTable (optional)
+        the viability table of the map, used by the greedy moves of the rollouts.
+
+    :return: the mean score and the number of rollouts of each acceleration of rules.accelerations.
+    """
+    seeds = np.random.SeedSequence(seed)
+    actions = [int(action) for action in actions]
+    if workers == 0:
+        totals, counts = rollout_worker(
+            state, player, actions, distances, budget, seeds.generate_state(1)[0], viability
+        )
+    else:
+        executor = get_pool()
+        workers = workers or pool_workers
+        futures = [
+            executor.submit(
+                rollout_worker, state, player, actions, distances, budget, int(child.generate_state(1)[0]), viability
+            )
+            for child in seeds.spawn(workers)
+        ]
+        totals = np.zeros(len(rules.accelerations))
+        counts = np.zeros(len(rules.accelerations), dtype=np.int64)
+        for future in futures:
+            worker_totals, worker_counts = future.result()
+            totals += worker_totals
+            counts += worker_counts
+    values = np.full(len(rules.accelerations), -1.0)
+    values[counts > 0] = totals[counts > 0] / counts[counts > 0]
+    return values, counts
+
+
+def choose_action(state: simulation.RaceState, player: int, distances: np.ndarray, policy: str = "monte_carlo",
+                  budget: float = 0.5, workers: int = None, rng=None, viability=None):
+    """Used to choose the acceleration of an AI player.
+
+    Parameters
+    ----------
+    state: simulation.RaceState
+        the state of the game, with the turn of the player.
+    player: int
+        the number of the player.
+    distances: np.array((width, height))
+        the distance field of the map.
+    policy: str (optional)
+        "random" for a random safe move, "greedy" for the safe move closest to the finish line, or "monte_carlo"
+        (the default) for the move with the best rollouts.
+    budget: float (optional)
+        the time a monte_carlo player can spend, in seconds.
+    workers: int (optional)
+        the number of processes a monte_carlo player uses (see monte_carlo_values).
+    rng: np.random.Generator (optional)
+        the random generator used by the random and greedy players.
+    viability: ViabilityTable (optional)
+        the viability table of the map (GameMap.viability_table), telling exactly which moves are unsafe, the
+        braking distance being used instead if None.
+
+    :return: the index of the acceleration in rules.accelerations.
+    """
+    if policy not in policies:
+        raise ValueError("Unknown AI policy: " + str(policy))
+    if rng is None:
+        rng = np.random.default_rng()
+    occupancy = state.occupancy()
+    moves, candidates = candidate_actions(state, player, occupancy, viability)
+    action = winning_action(state, player, moves)
+    if action is not None:
+        return action
+    if len(candidates) == 0:
+        return len(rules.accelerations) - 1
+    if policy == "random" or len(candidates) == 1:
+        return int(rng.choice(candidates))
+    if policy == "greedy":
+        return greedy_action(state, player, distances, rng, occupancy=occupancy, viability=viability)
+    values, counts = monte_carlo_values(state, player, candidates, distances, budget, workers, viability=viability)
+    return int(np.argmax(values))
+
+
+def play(game, player, policy: str = "monte_carlo", budget: float = 0.5):
+    """Used to choose the acceleration of an AI player in a game.
+
+    Parameters
+    ----------
+    game: Game
+        the game being played, the player's own trace already removed (see Game.update).
+    player: Player
+        the AI player whose turn it is.
+    policy: str (optional)
+        the policy of the player (see choose_action).
+    budget: float (optional)
+        the time the player can spend, in seconds.
+
+    :return: the acceleration chosen, as an np.array([,]).
+    """
+    if player.state_check(game.game_map) != PlayerState.CAN_PLAY:
+        return rules.accelerations[-1]
+    state = game.snapshot(player.number)
+    game_map = game.game_map
+    action = choose_action(
+        state, player.number, game_map.distance_field(), policy, budget, viability=game_map.viability_table()
+    )
+    return rules.accelerations[action]
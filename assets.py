@@ -0,0 +1,109 @@
+import threading
+import pygame
+
+image_files = {
+    "car": "image/red_car.png",
+    "icon": "image/car_game_icon.png",
+}
+"""The images of the game, by name."""
+
+default_font_size = 30
+"""The size of the font used to display the players' names."""
+
+
+class AssetRegistry:
+    """A class loading the images and fonts of the game the first time they are used, and sharing them between
+    everything that uses them (for example, all the players use the same car texture and font).
+
+    Attributes
+    ----------
+    images: dict
+        the images already loaded, by name.
+    fonts: dict
+        the fonts already loaded, by size.
+    converted: set
+        the names of the images already converted to the pixel format of the window.
+
+    Methods
+    -------
+    image(name)
+        Used to get an image, loading it the first time.
+
+    font(size)
+        Used to get the default font at a size, loading it the first time.
+
+    warm_up(names, font_sizes)
+        Used to load assets in a background thread before they are needed.
+    """
+
+    def __init__(self):
+        self.images = {}
+        self.fonts = {}
+        self.converted = set()
+        self.lock = threading.Lock()
+
+    def image(self, name: str):
+        """Used to get an image, loading it the first time. Once the window exists, the image is converted to its pixel
+        format (once), so that blitting it doesn't need any conversion.
+
+        Parameters
+        ----------
+        name: str
+            the name of the image, one of the keys of image_files.
+
+        :return: the pygame.Surface of the image.
+        """
+        with self.lock:
+            if name not in self.images:
+                self.images[name] = pygame.image.load(image_files[name])
+            if name not in self.converted and pygame.display.get_init() and pygame.display.get_surface() is not None:
+                self.images[name] = self.images[name].convert_alpha()
+                self.converted.add(name)
+            return self.images[name]
+
+    def font(self, size: int = default_font_size):
+        """Used to get the default pygame font at a size, loading it the first time.
+
+        Parameters
+        ----------
+        size: int (optional)
+            the size of the font, defaulting to default_font_size.
+
+        :return: the pygame.font.Font.
+        """
+        with self.lock:
+            if size not in self.fonts:
+                if not pygame.font.get_init():
+                    pygame.font.init()
+                self.fonts[size] = pygame.font.Font(None, size)
+            return self.fonts[size]
+
+    def warm_up(self, names=None, font_sizes=(default_font_size,)):
+        """Used to load assets in a background thread, for example while the players answer the questions in the
+        terminal, so that they are ready when the game starts.
+
+        Parameters
+        ----------
+        names: list (optional)
+            the names of the images to load, defaulting to all of them.
+        font_sizes: tuple (optional)
+            the sizes of the fonts to load.
+
+        :return: the started thread, which can be joined before creating the window.
+        """
+        if names is None:
+            names = list(image_files)
+
+        def load():
+            for name in names:
+                self.image(name)
+            for size in font_sizes:
+                self.font(size)
+
+        thread = threading.Thread(target=load, name="asset-warm-up", daemon=True)
+        thread.start()
+        return thread
+
+
+registry = AssetRegistry()
+"""The asset registry shared by the whole game."""
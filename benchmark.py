@@ -0,0 +1,273 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import numpy as np
+import pygame
+
+import constants
+import path_finding
+import rules
+import track_format
+from game_map import GameMap
+from main import MyGame
+from simulation import start_positions
+from viability import ViabilityTable
+
+map_numbers = (1, 2, 3, 4, 5)
+"""The maps the benchmarks run on."""
+
+
+def measure(function, number: int, repeat: int):
+    """Used to time a function: it is called number times in a row, repeat times, and the best and median runs are
+    kept (the best one being the least disturbed by the rest of the system).
+
+    Parameters
+    ----------
+    function: callable
+        the function to time, called without arguments.
+    number: int
+        the number of calls in a run.
+    repeat: int
+        the number of runs.
+
+    :return: a dictionary with the median and minimum time per call (in microseconds) and the number of calls.
+    """
+    function()
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        runs.append((time.perf_counter() - start) / number)
+    runs = np.array(runs) * 1e6
+    return {
+        "median_us": round(float(np.median(runs)), 3),
+        "min_us": round(float(runs.min()), 3),
+        "calls": number * repeat,
+    }
+
+
+def new_game(map_number: int, player_count: int = 4):
+    """Used to create a game with players on their starting positions, as main.py does.
+
+    Parameters
+    ----------
+    map_number: int
+        the number of the map.
+    player_count: int (optional)
+        the number of players, defaulting to 4.
+
+    :return: the MyGame.
+    """
+    game = MyGame(map_number)
+    for a, position in enumerate(start_positions(game.position_grid, player_count)):
+        game.game.new_player(a, "Player " + str(a + 1), position)
+    return game
+
+
+def loading_benchmarks(map_number: int):
+    """Used to get the benchmarks of loading a map: compiling its csv files, and mapping the compiled track."""
+    map_file = "maps/map" + str(map_number) + ".csv"
+    track_file = os.path.join("maps", ".benchmark" + str(map_number) + track_format.TRACK_SUFFIX)
+
+    def load():
+        track_format.loaded_tracks.clear()
+        GameMap(map_file)
+
+    def compile_csv():
+        track_format.compile_track(map_file, track_file)
+
+    try:
+        yield "GameMap.__init__", load, 200
+        yield "track_format.compile_track", compile_csv, 5
+    finally:
+        if os.path.exists(track_file):
+            os.remove(track_file)
+
+
+def rules_benchmarks(map_number: int):
+    """Used to get the benchmarks of the rules checked for every move and every frame."""
+    game = new_game(map_number)
+    game_map = game.game.game_map
+    player = game.game.player_list[0]
+    velocity = player.speed + rules.accelerations[0]
+
+    yield "Player.path_checking", lambda: player.path_checking(game_map, velocity), 2000
+    yield "Player.collision_speed_check", lambda: player.collision_speed_check(
+        game_map, rules.accelerations[0], True
+    ), 2000
+    yield "Player.evaluate_accelerations", lambda: player.evaluate_accelerations(game_map, True), 1000
+    yield "MyGame.end_of_player", lambda: game.end_of_player(player, game_map), 1000
+    yield "Game.player_states", game.game.player_states, 5000
+
+    velocities = [np.array(velocity) for velocity in ((2, 2), (2, -2), (-2, 2), (-2, -2), (0, 0))]
+    walk = player.get_walk_coordinates(next(
+        velocity for velocity in velocities if player.path_checking(game_map, velocity) != rules.PATH_CRASH
+        or not velocity.any()
+    ))
+
+    def trace():
+        game_map.modify_tile_list_state(walk, 2**player.number)
+        game_map.remove_previous_move(2**player.number)
+
+    yield "GameMap.modify_tile_list_state+remove_previous_move", trace, 2000
+
+
+def search_benchmarks(map_number: int):
+    """Used to get the benchmarks of the path finding, from the first starting position to the nearest tile of the
+    finish line, and of the viability table."""
+    game_map = GameMap("maps/map" + str(map_number) + ".csv")
+    distances = game_map.distance_field()
+    yield "ViabilityTable.compute", lambda: ViabilityTable.compute(game_map.terrain), 5
+    start = tuple(game_map.start_grid[0])
+    goals = np.argwhere(distances == 0)
+    if distances[start] < 0 or len(goals) == 0:
+        return
+    end = tuple(goals[np.argmin(np.abs(goals - start).max(axis=1))])
+    yield "path_finding.a_star", lambda: path_finding.a_star(game_map.map, start, end), 20
+    yield "path_finding.a_star(distance_field)", lambda: path_finding.a_star(
+        game_map.map, start, end, distances=distances
+    ), 20
+
+
+def rendering_benchmarks(map_number: int):
+    """Used to get the benchmarks of drawing a frame, the map alone, the dynamic parts of the game and a whole
+    render. The frame rate cap is lifted while they run, so that the renders are not waiting for the clock."""
+    game = new_game(map_number)
+    game.game.draw_background(game.window)
+    tile_size = game.game.tile_size
+
+    yield "GameMap.draw", lambda: game.game.game_map.draw(game.window, tile_size), 200
+    yield "Game.draw", lambda: game.game.draw(game.window, game.turn_count), 200
+
+    def render(full: bool):
+        if full:
+            game.dirty_rects = None
+        game.render()
+
+    frame_rate = constants.frame_rate
+    constants.frame_rate = 0
+    try:
+        yield "MyGame.render(full)", lambda: render(True), 100
+        yield "MyGame.render(dirty)", lambda: render(False), 100
+    finally:
+        constants.frame_rate = frame_rate
+
+
+benchmark_groups = {
+    "loading": loading_benchmarks,
+    "rules": rules_benchmarks,
+    "search": search_benchmarks,
+    "rendering": rendering_benchmarks,
+}
+"""The groups of benchmarks, each one yielding (name, function, number of calls) for a map."""
+
+
+def run(groups, maps, repeat: int):
+    """Used to run the benchmarks.
+
+    Parameters
+    ----------
+    groups: list
+        the names of the groups of benchmarks to run.
+    maps: list
+        the numbers of the maps to run them on.
+    repeat: int
+        the number of runs of each benchmark.
+
+    :return: a dictionary of results, by "name[map N]".
+    """
+    results = {}
+    for group in groups:
+        for map_number in maps:
+            for name, function, number in benchmark_groups[group](map_number):
+                key = name + "[map" + str(map_number) + "]"
+                results[key] = measure(function, number, repeat)
+                print(key.ljust(64), str(results[key]["median_us"]).rjust(12), "us", file=sys.stderr)
+    return results
+
+
+def environment():
+    """Used to describe where the benchmarks ran, so that results from different machines aren't mixed up."""
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pygame": pygame.version.ver,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+    }
+
+
+def compare(results: dict, baseline: dict):
+    """Used to compare results with a baseline.
+
+    Parameters
+    ----------
+    results: dict
+        the results of this run.
+    baseline: dict
+        the results of the baseline run.
+
+    :return: a dictionary with, for each benchmark of both runs, the baseline and current median times and their ratio
+    (below 1 is faster than the baseline).
+    """
+    comparison = {}
+    for key in results:
+        if key in baseline:
+            before = baseline[key]["median_us"]
+            after = results[key]["median_us"]
+            comparison[key] = {
+                "baseline_us": before,
+                "current_us": after,
+                "ratio": round(after / before, 3) if before else None,
+            }
+    return comparison
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Benchmarks of the hot paths of the game, run headless.")
+    parser.add_argument("--group", action="append", choices=sorted(benchmark_groups),
+                        help="a group of benchmarks to run (all of them by default), can be repeated.")
+    parser.add_argument("--map", action="append", type=int, choices=map_numbers,
+                        help="a map to run the benchmarks on (all of them by default), can be repeated.")
+    parser.add_argument("--repeat", type=int, default=5, help="the number of runs of each benchmark.")
+    parser.add_argument("--output", help="the JSON file to write the results to (printed otherwise).")
+    parser.add_argument("--baseline", help="a JSON file of earlier results to compare with.")
+    parser.add_argument("--tolerance", type=float, default=None,
+                        help="with --baseline, exit with an error if a benchmark is slower than the baseline by more "
+                             "than this ratio (0.1 for 10%%).")
+    options = parser.parse_args(arguments)
+
+    output = os.path.abspath(options.output) if options.output else None
+    baseline = os.path.abspath(options.baseline) if options.baseline else None
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    pygame.init()
+    results = run(options.group or list(benchmark_groups), options.map or list(map_numbers), options.repeat)
+    pygame.quit()
+
+    report = {"environment": environment(), "results": results}
+    status = 0
+    if baseline:
+        with open(baseline) as file:
+            report["comparison"] = compare(results, json.load(file)["results"])
+        for key, entry in report["comparison"].items():
+            print(key.ljust(64), str(entry["ratio"]).rjust(8), "x", file=sys.stderr)
+            if options.tolerance is not None and entry["ratio"] is not None and entry["ratio"] > 1 + options.tolerance:
+                status = 1
+    if output:
+        with open(output, "w") as file:
+            json.dump(report, file, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
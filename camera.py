@@ -0,0 +1,196 @@
+import math
+
+min_tile_size = 16
+"""The smallest size of a tile on the window, in pixels: maps too big to fit in the window at this size are seen
+through the camera, a part at a time."""
+
+max_tile_size = 96
+"""The biggest size of a tile on the window when zooming in, in pixels."""
+
+follow_margin = 0.25
+"""The part of the view, on each side, that the followed player has to leave for the camera to center on him."""
+
+
+class Camera:
+    """A class defining which part of the map is shown on the window, and at which size. By default the tiles are as
+    big as the window allows for the whole map to be shown (as long as they are at least min_tile_size pixels), and the
+    view can be panned and zoomed.
+
+    Attributes
+    ----------
+    map_width: int
+        the width of the map, in tiles.
+    map_height: int
+        the height of the map, in tiles.
+    view_size: tuple
+        the size of the window, in pixels.
+    zoom: int
+        the size of a tile chosen by zooming, None to fit the map in the window.
+    x: int
+        the x coordinate, in pixels of the whole map, of the left of the view.
+    y: int
+        the y coordinate, in pixels of the whole map, of the top of the view.
+
+    Methods
+    -------
+    tile_size
+        The size of a tile on the window, in pixels.
+
+    offset
+        The coordinates, in pixels of the whole map, of the top left corner of the view.
+
+    resize(view_size)
+        Used to set the size of the window.
+
+    visible_tiles()
+        Used to get the range of tiles shown, at least partly, in the view.
+
+    is_visible(position)
+        Used to know if a tile is shown in the view.
+
+    center_on(position)
+        Used to center the view on a tile.
+
+    follow(position)
+        Used to center the view on a tile if it's getting close to the sides of the view.
+
+    pan(tiles_x, tiles_y)
+        Used to move the view by a number of tiles.
+
+    zoom_by(steps)
+        Used to make the tiles bigger or smaller, keeping the center of the view in place.
+    """
+
+    def __init__(self, map_width: int, map_height: int, view_size: tuple):
+        """
+        Parameters
+        ----------
+        map_width: int
+            the width of the map, in tiles.
+        map_height: int
+            the height of the map, in tiles.
+        view_size: tuple
+            the size of the window, in pixels.
+        """
+        self.map_width = map_width
+        self.map_height = map_height
+        self.view_size = tuple(view_size)
+        self.zoom = None
+        self.x = 0
+        self.y = 0
+
+    @property
+    def tile_size(self):
+        if self.zoom is not None:
+            return self.zoom
+        return max(int(self.view_size[0] / self.map_width), min_tile_size)
+
+    @property
+    def offset(self):
+        return self.x, self.y
+
+    def clamp(self):
+        """Used to keep the view on the map, the map being shown from its top left corner if it fits in the window."""
+        tile_size = self.tile_size
+        self.x = int(max(0, min(self.x, self.map_width * tile_size - self.view_size[0])))
+        self.y = int(max(0, min(self.y, self.map_height * tile_size - self.view_size[1])))
+
+    def resize(self, view_size: tuple):
+        """Used to set the size of the window.
+
+        Parameters
+        ----------
+        view_size: tuple
+            the size of the window, in pixels.
+        """
+        if tuple(view_size) != self.view_size:
+            self.view_size = tuple(view_size)
+            self.clamp()
+
+    def visible_tiles(self):
+        """Used to get the range of tiles shown, at least partly, in the view.
+
+        :return: the first and last (excluded) x and y coordinates of the tiles, as (x0, y0, x1, y1).
+        """
+        tile_size = self.tile_size
+        return (
+            max(self.x // tile_size, 0),
+            max(self.y // tile_size, 0),
+            min(math.ceil((self.x + self.view_size[0]) / tile_size), self.map_width),
+            min(math.ceil((self.y + self.view_size[1]) / tile_size), self.map_height),
+        )
+
+    def is_visible(self, position):
+        """Used to know if a tile is shown, at least partly, in the view.
+
+        Parameters
+        ----------
+        position: np.array([,])
+            the coordinates of the tile.
+        """
+        x0, y0, x1, y1 = self.visible_tiles()
+        return x0 <= position[0] < x1 and y0 <= position[1] < y1
+
+    def center_on(self, position):
+        """Used to center the view on a tile.
+
+        Parameters
+        ----------
+        position: np.array([,])
+            the coordinates of the tile.
+        """
+        tile_size = self.tile_size
+        self.x = int((position[0] + 0.5) * tile_size - self.view_size[0] / 2)
+        self.y = int((position[1] + 0.5) * tile_size - self.view_size[1] / 2)
+        self.clamp()
+
+    def follow(self, position):
+        """Used to center the view on a tile if it's outside of the view or getting close to its sides (closer than
+        follow_margin of the view).
+
+        Parameters
+        ----------
+        position: np.array([,])
+            the coordinates of the tile, for example the position of the player whose turn it is.
+        """
+        tile_size = self.tile_size
+        screen_x = (position[0] + 0.5) * tile_size - self.x
+        screen_y = (position[1] + 0.5) * tile_size - self.y
+        width, height = self.view_size
+        if not (
+            follow_margin * width <= screen_x <= (1 - follow_margin) * width
+            and follow_margin * height <= screen_y <= (1 - follow_margin) * height
+        ):
+            self.center_on(position)
+
+    def pan(self, tiles_x: int, tiles_y: int):
+        """Used to move the view by a number of tiles.
+
+        Parameters
+        ----------
+        tiles_x, tiles_y: int
+            the number of tiles to move the view by, on each axis.
+        """
+        self.x += tiles_x * self.tile_size
+        self.y += tiles_y * self.tile_size
+        self.clamp()
+
+    def zoom_by(self, steps: int):
+        """Used to make the tiles bigger (positive steps) or smaller (negative steps), by a quarter of their size per
+        step, keeping the center of the view in place.
+
+        Parameters
+        ----------
+        steps: int
+            the number of zoom steps.
+        """
+        tile_size = self.tile_size
+        center_x = (self.x + self.view_size[0] / 2) / tile_size
+        center_y = (self.y + self.view_size[1] / 2) / tile_size
+        new_size = tile_size
+        for _ in range(abs(steps)):
+            new_size = new_size + max(new_size // 4, 1) if steps > 0 else new_size - max(new_size // 5, 1)
+        self.zoom = max(min_tile_size, min(max_tile_size, new_size))
+        self.x = int(center_x * self.zoom - self.view_size[0] / 2)
+        self.y = int(center_y * self.zoom - self.view_size[1] / 2)
+        self.clamp()
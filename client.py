@@ -0,0 +1,239 @@
+import argparse
+import asyncio
+import os
+import sys
+import numpy as np
+import ai
+import protocol
+import rules
+import simulation
+from game_map import GameMap
+from protocol import Message, Reason
+
+numpad_actions = {"8": 0, "4": 1, "2": 2, "6": 3, "9": 4, "3": 5, "1": 6, "7": 7, "5": 8}
+"""The index in rules.accelerations of the acceleration of each numpad digit, as with constants.default_inputs."""
+
+
+class GameClient:
+    """A client playing a game hosted by a server (see server.py). It keeps its own copy of the game as a
+    simulation.RaceState, updated with the moves sent by the server, so that it can choose its moves without asking
+    for the whole map.
+
+    Attributes
+    ----------
+    reader: asyncio.StreamReader
+        the stream the messages of the server are read from.
+    writer: asyncio.StreamWriter
+        the stream the messages to the server are written to.
+    game_id: int
+        the number of the game on the server.
+    number: int
+        the number of the player of the client.
+    map_number: int
+        the number of the map.
+    names: list
+        the name of each player.
+    state: simulation.RaceState
+        the state of the game, as last sent by the server.
+    distances: np.array((width, height))
+        the distance field of the map.
+    viability: ViabilityTable
+        the viability table of the map.
+    ranking: list
+        the numbers of the players from the first to the last, once the game is over.
+
+    Methods
+    -------
+    connect(host, port)
+        Used to connect to the server.
+
+    join(map_number, player_count, name)
+        Used to join a game and wait for it to start.
+
+    play(choose)
+        Used to play the game until it's over.
+    """
+
+    def __init__(self):
+        self.reader = None
+        self.writer = None
+        self.game_id = None
+        self.number = None
+        self.map_number = None
+        self.names = []
+        self.state = None
+        self.distances = None
+        self.viability = None
+        self.ranking = None
+
+    async def connect(self, host: str = "127.0.0.1", port: int = protocol.default_port):
+        """Used to connect to the server."""
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+
+    def close(self):
+        """Used to close the connection to the server."""
+        if self.writer is not None:
+            self.writer.close()
+
+    async def join(self, map_number: int, player_count: int, name: str):
+        """Used to join a game and wait for it to start, once every player has joined.
+
+        Parameters
+        ----------
+        map_number: int
+            the number of the map.
+        player_count: int
+            the number of players of the game.
+        name: str
+            the name of the player.
+        """
+        self.writer.write(protocol.frame(Message.JOIN, protocol.JOIN.pack(map_number, player_count) + name.encode()))
+        await self.writer.drain()
+        message, payload = await protocol.read_frame(self.reader)
+        if message != Message.START:
+            raise ConnectionError("The server refused to start the game")
+        self.game_id, self.number, self.map_number, positions, self.names = protocol.decode_start(payload)
+        game_map = GameMap("maps/map" + str(self.map_number) + ".csv")
+        self.distances = game_map.distance_field()
+        self.viability = game_map.viability_table()
+        self.state = simulation.new_state(game_map.terrain, positions)
+
+    def apply_delta(self, payload: bytes):
+        """Used to update the state of the game with a move sent by the server. The move is replayed with the
+        simulation to get the player's new trace, and the position, speed and state sent by the server are kept."""
+        move_count, player, action, player_state, x, y, speed_x, speed_y = protocol.DELTA.unpack(payload)
+        state, _ = simulation.apply_move(self.state, player, action)
+        positions = state.positions.copy()
+        speeds = state.speeds.copy()
+        states = state.states.copy()
+        positions[player] = x, y
+        speeds[player] = speed_x, speed_y
+        states[player] = player_state
+        self.state = simulation.RaceState(state.terrain, positions, speeds, states, state.trails, state.turn)
+
+    async def play(self, choose):
+        """Used to play the game until it's over.
+
+        Parameters
+        ----------
+        choose: callable
+            called as choose(client, rejected) when it's the turn of the player, rejected being the set of the
+            accelerations already refused by the server for this move, and returning the index of the acceleration
+            in rules.accelerations (or a coroutine returning it).
+
+        :return: the numbers of the players from the first to the last.
+        """
+        rejected = set()
+        while True:
+            message, payload = await protocol.read_frame(self.reader)
+            if message is None:
+                raise ConnectionError("The server closed the connection")
+            if message == Message.DELTA:
+                self.apply_delta(payload)
+            elif message == Message.TURN:
+                move_count, player = protocol.TURN.unpack(payload)
+                if player == self.number:
+                    rejected = set()
+                    await self.send_move(choose, move_count, rejected)
+            elif message == Message.REJECT:
+                move_count, reason = protocol.REJECT.unpack(payload)
+                if Reason(reason) != Reason.NOT_YOUR_TURN:
+                    await self.send_move(choose, move_count, rejected)
+            elif message == Message.END:
+                (count,) = protocol.END.unpack_from(payload)
+                self.ranking = list(payload[protocol.END.size:protocol.END.size + count])
+                return self.ranking
+
+    async def send_move(self, choose, move_count: int, rejected: set):
+        """Used to choose a move and send it to the server."""
+        self.state = simulation.RaceState(
+            self.state.terrain, self.state.positions, self.state.speeds, self.state.states, self.state.trails,
+            self.number
+        )
+        action = choose(self, rejected)
+        if asyncio.iscoroutine(action):
+            action = await action
+        rejected.add(action)
+        self.writer.write(protocol.frame(Message.MOVE, protocol.MOVE.pack(move_count, action)))
+        await self.writer.drain()
+
+
+def bot(policy: str, budget: float = 0.1):
+    """Used to get a choose function (see GameClient.play) playing with an AI policy (see ai.policies). If the server
+    refuses its move, the bot takes the first safe move left.
+
+    Parameters
+    ----------
+    policy: str
+        the policy of the bot.
+    budget: float (optional)
+        the time a monte_carlo bot can spend on each move, in seconds.
+    """
+    rng = np.random.default_rng()
+
+    def choose(client: GameClient, rejected: set):
+        state = client.state
+        if not rejected:
+            return ai.choose_action(
+                state, client.number, client.distances, policy, budget, workers=0, rng=rng, viability=client.viability
+            )
+        moves, unsafe = rules.evaluate_moves(
+            state.terrain, state.occupancy(), state.positions[client.number], state.speeds[client.number],
+            2**client.number, viability=client.viability
+        )
+        left = [action for action in np.flatnonzero(~unsafe) if action not in rejected]
+        return int(left[0]) if left else len(rules.accelerations) - 1
+
+    return choose
+
+
+async def keyboard(client: GameClient, rejected: set):
+    """Used to choose the move of a human player, typed as a numpad digit in the terminal."""
+    state = client.state
+    if rejected:
+        print("This move isn't safe, choose another one.")
+    else:
+        for number, name in enumerate(client.names):
+            print(name.ljust(16), simulation.PlayerState(int(state.states[number])).name.ljust(9),
+                  "position", state.positions[number].tolist(), "speed", state.speeds[number].tolist())
+    while True:
+        digit = await asyncio.get_running_loop().run_in_executor(None, input, "Your move (numpad 1-9): ")
+        if digit.strip() in numpad_actions:
+            return numpad_actions[digit.strip()]
+
+
+async def play(host: str, port: int, map_number: int, player_count: int, name: str, choose):
+    """Used to connect to a server, join a game and play it.
+
+    :return: the GameClient, once the game is over.
+    """
+    client = GameClient()
+    await client.connect(host, port)
+    try:
+        await client.join(map_number, player_count, name)
+        await client.play(choose)
+    finally:
+        client.close()
+    return client
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Plays a game hosted by a server (see server.py).")
+    parser.add_argument("--host", default="127.0.0.1", help="the address of the server.")
+    parser.add_argument("--port", type=int, default=protocol.default_port, help="the port of the server.")
+    parser.add_argument("--map", type=int, default=1, help="the number of the map.")
+    parser.add_argument("--players", type=int, default=2, help="the number of players of the game.")
+    parser.add_argument("--name", default="Player", help="the name of the player.")
+    parser.add_argument("--bot", choices=ai.policies, help="let an AI policy play instead of typing the moves.")
+    parser.add_argument("--budget", type=float, default=0.1,
+                        help="the time a monte_carlo bot can spend on each move, in seconds.")
+    options = parser.parse_args(arguments)
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    choose = bot(options.bot, options.budget) if options.bot else keyboard
+    client = asyncio.run(play(options.host, options.port, options.map, options.players, options.name, choose))
+    print("Final ranking:", ", ".join(client.names[number] for number in client.ranking))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,5 @@
 import numpy as np
 import pygame
-from game_map import GameMap
 
 default_inputs = {
     pygame.K_KP8: np.array([0, -1]),
@@ -15,8 +14,44 @@ default_inputs = {
 }
 """The base inputs for the player stored in a dictionary."""
 
+camera_pan_keys = {
+    pygame.K_LEFT: (-1, 0),
+    pygame.K_RIGHT: (1, 0),
+    pygame.K_UP: (0, -1),
+    pygame.K_DOWN: (0, 1),
+}
+"""The keys moving the camera, with the direction they move it to."""
+
+camera_pan_step = 4
+"""The number of tiles the camera moves by each time a camera_pan_keys key is pressed."""
+
+camera_zoom_keys = {
+    pygame.K_PLUS: 1,
+    pygame.K_EQUALS: 1,
+    pygame.K_KP_PLUS: 1,
+    pygame.K_MINUS: -1,
+    pygame.K_KP_MINUS: -1,
+}
+"""The keys zooming the camera in (1) or out (-1), the mouse wheel zooming as well."""
+
 window_width = 1280
 window_height = 800
 window_size = (window_width, window_height)
 
+frame_rate = 60
+"""The maximum number of frames drawn per second."""
+
+input_timeout = 250
+"""The maximum time (in milliseconds) the game waits for an input before checking its state again."""
+
+ai_policy = "monte_carlo"
+"""The policy of the AI players (one of ai.policies)."""
+
+ai_time_budget = 0.5
+"""The time (in seconds) an AI player can spend choosing each of his moves."""
+
+profile_trace_file = "profile_trace.json"
+"""The file the profiler (toggled with the p key) saves its trace to when the game ends, in the Chrome trace format."""
 
+replay_folder = "replays"
+"""The folder the move log of each game is saved to when it ends, to be replayed with replay.py."""
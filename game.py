@@ -1,5 +1,8 @@
+from camera import Camera
 from game_map import GameMap
 from player import Player
+from player import PlayerTable
+from simulation import RaceState
 import numpy as np
 import pygame
 import constants as cst
@@ -13,13 +16,21 @@ class Game:
     ----------
     player_list: list
         a list containing all players in the game.
+    player_table: PlayerTable
+        the positions, speeds and has_played of all the players, each Player being a view on his row.
+    map_number: int
+        the number of the map the game is played on.
     game_map: GameMap
         a map of the game containing all the tiles.
+    camera: Camera
+        the part of the map shown on the window, and the size of its tiles.
+    tile_size: int
+        the size of a tile on the window during the last frame.
 
     Methods
     -------
-    new_player(player_number, name, player_position, player_speed)
-        Used to create new players.
+    new_player(player_number, name, player_position, player_speed, ai)
+        Used to create new players, controlled by a human or by the computer.
 
     move_players(player, action)
         Defines what the input will have as an effect on the player, depending on his number and if the wanted action
@@ -28,9 +39,27 @@ class Game:
     update(self, player: Player):
         used to remove the previous move of the player.
 
+    ranking()
+        Used to sort the players from the closest to the furthest from the finish line.
+
+    snapshot(turn)
+        Used to get the state of the game as a simulation.RaceState.
+
+    restore(state)
+        Used to put the game back in a state taken with snapshot.
+
+    player_states()
+        Used to get the state of every player at once.
+
+    player_state_reset()
+        Used to start a new round once every player has played.
+
+    draw_background(window, rects)
+        Used to draw the parts of the map that never change, on the whole window or only on some rectangles.
+
     draw(window)
         A small draw method that calls on each player's draw method, as well as the map's draw method to draw
-        everything on the window.
+        everything that can change on the window.
     """
 
     def __init__(self, map_number: int):
@@ -40,8 +69,12 @@ class Game:
         None.
         """
         self.player_list = []
+        self.player_table = PlayerTable()
+        self.map_number = map_number
         self.game_map = GameMap("maps/map" + str(map_number) + ".csv")
+        self.camera = Camera(self.game_map.width, self.game_map.height, cst.window_size)
         self.tile_size = 0
+        self.view = None
 
     def new_player(
         self,
@@ -49,6 +82,7 @@ class Game:
         name: str,
         player_position: np.array = np.array([0, 0]),
         player_speed: np.array = np.array([0, 0]),
+        ai: str = None,
     ):
         """Used to create new players and adds them to the player_list.
         If the user doesn't specify a speed or position, the default values of [0, 0] will be applied.
@@ -67,8 +101,11 @@ class Game:
         player_speed: np.array([,])
             used to determine the speed (and direction) of the player at any time.
 
+        ai: str (optional)
+            the policy of the player if he is controlled by the computer (one of ai.policies), None for a human player.
+
         """
-        new_player = Player(player_number, player_position, player_speed.copy(), name)
+        new_player = Player(player_number, player_position, player_speed, name, ai=ai, table=self.player_table)
         self.player_list.append(new_player)
 
     """def move_players(self, players_out: int, player_won: list):
@@ -87,9 +124,96 @@ class Game:
         """Used to remove the previous move of the player."""
         self.game_map.remove_previous_move(int(2**player.number))
 
+    def ranking(self):
+        """Used to sort the players from the closest to the furthest from the finish line, using the distance field
+        of the map. Players that are out (or can't reach the finish line anymore) are ranked last.
+
+        :return: the list of players, sorted from first to last.
+        """
+
+        def distance(player: Player):
+            moves = self.game_map.finish_distance(player.position)
+            return moves if moves >= 0 else self.game_map.width * self.game_map.height
+
+        return sorted(self.player_list, key=distance)
+
+    def snapshot(self, turn: int):
+        """Used to get the state of the game as a simulation.RaceState, a small immutable value without any pygame
+        object, to simulate moves, save the game or send it to another process.
+
+        Parameters
+        ----------
+        turn: int
+            the number of the player whose turn it is.
+
+        :return: the RaceState of the game.
+        """
+        game_map = self.game_map
+        table = self.player_table
+        states = self.player_states()
+        positions = table.positions[:table.count].copy()
+        speeds = table.speeds[:table.count].copy()
+        trails = tuple(
+            np.array(game_map.traces.get(2**player.number, np.zeros(0)), dtype=np.int64) for player in self.player_list
+        )
+        terrain = game_map.terrain
+        if terrain.flags.writeable:
+            terrain = terrain.copy()
+            terrain.flags.writeable = False
+        return RaceState(terrain, positions, speeds, states, trails, turn)
+
+    def restore(self, state: RaceState):
+        """Used to put the game back in a state taken with snapshot (or played from one with the simulation): the
+        positions and speeds of the players, their traces on the map and who has already played this round.
+
+        Parameters
+        ----------
+        state: RaceState
+            the state of the game, with as many players as the game.
+        """
+        if state.terrain.shape != self.game_map.terrain.shape or state.player_count != len(self.player_list):
+            raise ValueError("The state doesn't belong to this game")
+        game_map = self.game_map
+        game_map.occupancy[:] = 0
+        game_map.traces = {}
+        table = self.player_table
+        table.positions[:table.count] = state.positions
+        table.speeds[:table.count] = state.speeds
+        table.has_played[:table.count] = np.arange(table.count) < state.turn
+        for player in self.player_list:
+            trail = state.trails[player.number]
+            if len(trail):
+                game_map.modify_tile_list_state(np.unravel_index(trail, game_map.occupancy.shape), 2**player.number)
+
+    def draw_background(self, window: pygame.display, rects: list = None):
+        """Used to draw the parts of the map that never change, as seen through the camera, either on the whole window
+        or only on the rectangles that were drawn on during the previous frame (if the camera didn't move).
+
+        Parameters
+        ----------
+
+        window: pygame.display
+            the window on which everything will be drawn
+        rects: list (optional)
+            the rectangles drawn on during the previous frame, the whole window is drawn if None.
+
+        :return: True if the whole window has been drawn, False if only the rectangles have been restored.
+        """
+        self.camera.resize(window.get_size())
+        view = (self.camera.tile_size, self.camera.offset, window.get_size())
+        if rects is None or view != self.view:
+            self.view = view
+            self.tile_size = self.camera.tile_size
+            window.fill((0, 0, 0))
+            window.blit(self.game_map.static_surface(self.tile_size, self.camera.offset, window.get_size()), (0, 0))
+            return True
+        self.game_map.restore(window, self.tile_size, rects, self.camera.offset)
+        return False
+
     def draw(self, window: pygame.display, turn: int):
         """A small draw method that calls on each player's draw method, as well as the map's draw method to draw
-        everything on the window.
+        everything that can change on the window, on top of what draw_background has drawn. The players outside of
+        the view of the camera are skipped.
 
         Parameters
         ----------
@@ -98,17 +222,22 @@ class Game:
             the window on which everything will be drawn
         turn: int
             the number of the turn in the game, to know if it's the player's turn or not.
+
+        :return: the list of rectangles of the window that have been drawn on.
         """
-        self.tile_size = int(pygame.display.get_window_size()[0] / self.game_map.width)
-        self.game_map.draw(window, self.tile_size)
+        rects = self.game_map.draw_traces(window, self.tile_size, self.camera.offset)
         for player in self.player_list:
-            player.draw(window, self.tile_size, turn)
+            if self.camera.is_visible(player.position) or self.camera.is_visible(player.position + player.speed):
+                rects += player.draw(window, self.tile_size, turn, self.camera.offset)
+        return rects
+
+    def player_states(self):
+        """Used to get the state of every player at once (see PlayerTable.state_values).
+
+        :return: an array with the PlayerState value of each player, in the order of player_list.
+        """
+        return self.player_table.state_values(self.game_map)
 
     def player_state_reset(self):
-        count = 0
-        for player in self.player_list:
-            if player.has_played:
-                count += 1
-        if count == len(self.player_list):
-            for player in self.player_list:
-                player.can_play()
+        """Used to start a new round, every player being able to play again, once every player has played."""
+        self.player_table.player_state_reset()
@@ -1,7 +1,11 @@
+from __future__ import annotations
+
 import numpy as np
-import pygame
-import constants
-import math
+import map_cache
+import rules
+import track_format
+import viability
+from viability import ViabilityTable
 
 # from CarGame.player import Player
 from enum import Flag, auto
@@ -20,6 +24,20 @@ class TileState(Flag):
     WIN = auto()  # 512
 
 
+DISTANCE_VERSION = 2
+"""The version of the way distance_field is computed, its caches being computed again when it changes."""
+
+PLAYER_MASK = TileState.WALL.value - 1
+"""The bits of a tile value that are used by the players' traces."""
+
+terrain_colors = {
+    0: (55, 55, 55),
+    TileState.WALL.value: (139, 69, 19),
+    TileState.WIN.value: (255, 255, 255),
+}
+"""The colors of the road, the walls and the finish line."""
+
+
 class GameMap:
     """A class containing all the information about the game map and the tiles it contains, in order to determine if
     the player can go on/over some tiles.
@@ -30,12 +48,34 @@ class GameMap:
         used to determine the width (x coordinates) of the game map.
     height: int
         used to determine the height (y coordinates) of the game map.
+    terrain: np.array((width, height))
+        the read-only uint8 layer of the tiles that never change during a game (rules.TERRAIN_WALL, rules.TERRAIN_WIN
+        or 0 for each tile), shared between the copies of the map.
+    occupancy: np.array((width, height))
+        the uint8 layer of the players' traces, each player setting his own bit (TileState.PLAYER_1 to PLAYER_8).
     map: np.array((width, height))
-        a 2D array containing the types of all tiles for each set of coordinates, allowing the game to know if the
-        player can go on/over specific tiles.
+        a read-only 2D array combining both layers into the types of all tiles for each set of coordinates (refer to
+        the TileState Flag class for values), built when asked for.
+    file: str
+        the path of the csv file the map was loaded from, None once the map has been modified by a builder method.
+    start_grid: np.array((start_count, 2))
+        the starting positions of the players on this map.
+    traces: dict
+        for each player value, the flat indexes of the tiles on which the player left his trace.
+    viability: ViabilityTable
+        the states of a car from which it can avoid crashing into the terrain, computed when first needed.
 
     Methods
     -------
+    tile(x, y)
+        Used to get the type of a single tile, both layers combined.
+
+    copy()
+        Used to get a copy of the map sharing its terrain, on which players can move without changing this one.
+
+    set_terrain(index, terrain_value)
+        Used to add a terrain value to some tiles.
+
     create_finish_line(finish_x: int, finish_y: int, start_finish_x: int, start_finish_y: int)
         Creates where all players must race to in order to win.
 
@@ -46,6 +86,18 @@ class GameMap:
         Allows to create a pre-made map, with the kill zones and finish zone already established
         (must be a 40 x by 25 y map).
 
+    distance_field()
+        Used to get, for every tile, the number of moves needed to reach the finish line.
+
+    viability_table()
+        Used to get the table of the states of a car from which it can avoid crashing into the terrain.
+
+    finish_distance(position)
+        Used to get the number of moves needed to reach the finish line from a tile.
+
+    finish_distances(positions)
+        Used to get the number of moves needed to reach the finish line from several tiles at once.
+
     get_tile_list_type(index, value)
         Used to return the map of the game without a set value.
 
@@ -56,7 +108,19 @@ class GameMap:
         Used to remove the previous move of a player (each player will leave a "trace" of his movement from the last
         turn), this method is used to erase this trace.
 
-    draw(window, tile_size)
+    terrain_surface()
+        Used to get the surface of the tiles that never change, with one pixel per tile.
+
+    static_surface(tile_size, offset, size)
+        Used to get the surface with the tiles that never change and the grid, as seen in a view of the window.
+
+    restore(window, tile_size, rects, offset)
+        Used to erase what was drawn over some parts of the window by drawing the static tiles on them again.
+
+    draw_traces(window, tile_size, offset)
+        Used to draw the tiles on which the players left a trace during their last move.
+
+    draw(window, tile_size, offset)
         Used to draw the game_map on the window.
     """
 
@@ -64,16 +128,67 @@ class GameMap:
         """
         Parameters
         ----------
-        width: int
-            used to determine the width (x coordinate) of the game map.
-        height: int
-            used to determine the height (xy coordinate) of the game map.
+        file: str
+            the path of the csv file of the map (maps/mapN.csv), loaded through its compiled track file.
+        """
+        track = track_format.load_track(file)
+        self.terrain = track.terrain
+        self.occupancy = np.zeros(self.terrain.shape, dtype=np.uint8)
+        self.start_grid = np.array(track.starts, dtype=int)
+        self.file = file
+        self.width, self.height = self.terrain.shape
+        self.distances = None
+        self.viability = None
+        self.surfaces = {}
+        self.traces = {}
+
+    @property
+    def map(self):
+        tiles = (self.terrain.astype(np.int64) << rules.TERRAIN_SHIFT) | self.occupancy
+        tiles.flags.writeable = False
+        return tiles
+
+    def tile(self, x: int, y: int):
+        """Used to get the type of a single tile, both layers combined (refer to the TileState Flag class for values).
+
+        Parameters
+        ----------
+        x, y: int
+            the coordinates of the tile.
+        """
+        return (int(self.terrain[x, y]) << rules.TERRAIN_SHIFT) | int(self.occupancy[x, y])
+
+    def copy(self):
+        """Used to get a copy of the map on which players can move without changing this one. The terrain never
+        changes, so it is shared, and only the occupancy layer and the traces are copied.
+
+        :return: the new GameMap.
         """
+        game_map = GameMap.__new__(GameMap)
+        game_map.__dict__.update(self.__dict__)
+        game_map.occupancy = self.occupancy.copy()
+        game_map.traces = dict(self.traces)
+        return game_map
 
-        # self.map = np.zeros((width, height), dtype=int)
-        self.map = np.genfromtxt(file, dtype=int, delimiter=",")
-        self.width = len(self.map)
-        self.height = len(self.map[0])
+    def set_terrain(self, index: tuple, terrain_value: int):
+        """Used to add a terrain value to some tiles, the terrain being copied first since it is read-only (and may be
+        shared with the track file and other maps).
+
+        Parameters
+        ----------
+        index: tuple
+            the indexes of the tiles to modify.
+        terrain_value: int
+            the terrain value to add to the tiles (rules.TERRAIN_WALL or rules.TERRAIN_WIN).
+        """
+        terrain = np.array(self.terrain, dtype=np.uint8)
+        terrain[index] |= terrain_value
+        terrain.flags.writeable = False
+        self.terrain = terrain
+        self.file = None
+        self.distances = None
+        self.viability = None
+        self.surfaces = {}
 
     def create_finish_line(
         self, finish_x: int, finish_y: int, start_finish_x: int, start_finish_y: int
@@ -92,9 +207,10 @@ class GameMap:
         start_finish_y:
             used to determine where the finish zone starts in y coordinates.
         """
-        for x in range(finish_x):
-            for y in range(finish_y):
-                self.map[start_finish_x + x, start_finish_y + y] |= TileState.WIN.value
+        self.set_terrain(
+            (slice(start_finish_x, start_finish_x + finish_x), slice(start_finish_y, start_finish_y + finish_y)),
+            rules.TERRAIN_WIN,
+        )
 
     def create_kill_zone(
         self,
@@ -117,11 +233,13 @@ class GameMap:
         kill_zone_start_y:
             used to determine where the kill zone starts in y coordinates.
         """
-        for x in range(kill_zone_x):
-            for y in range(kill_one_y):
-                self.map[
-                    kill_zone_start_x + x, kill_zone_start_y + y
-                ] |= TileState.WALL.value
+        self.set_terrain(
+            (
+                slice(kill_zone_start_x, kill_zone_start_x + kill_zone_x),
+                slice(kill_zone_start_y, kill_zone_start_y + kill_one_y),
+            ),
+            rules.TERRAIN_WALL,
+        )
 
     def base_map(self):
         """
@@ -139,6 +257,108 @@ class GameMap:
             self.create_kill_zone(5, 4, 3, 21)  # 256
             self.create_finish_line(3, 4, 0, 21)  # 512
 
+    def distance_field(self):
+        """Used to get, for every tile, the number of moves needed to reach the finish line.
+
+        The distances are computed once with a breadth-first search starting from every WIN tile at the same time,
+        going through all the tiles that are not walls, one move being a step to any of the eight neighbours. Each
+        step of the search grows the whole frontier at once with array shifts. The result is cached next to the csv
+        file of the map, and computed again when the csv file, the terrain or DISTANCE_VERSION changes.
+
+        :return: a 2D array with the distance of each tile to the finish line, -1 if the finish line can't be reached.
+        """
+        if self.distances is not None:
+            return self.distances
+        key = map_cache.content_key(DISTANCE_VERSION, self.terrain)
+        cached = map_cache.load_cached(self.file, ".distance.npz", key) if self.file is not None else None
+        if cached is not None and cached["distances"].shape == self.terrain.shape:
+            self.distances = cached["distances"]
+            return self.distances
+
+        passable = (self.terrain & rules.TERRAIN_WALL) == 0
+        frontier = passable & ((self.terrain & rules.TERRAIN_WIN) != 0)
+        reached = frontier.copy()
+        distances = np.full(self.terrain.shape, -1, dtype=np.int32)
+        distances[frontier] = 0
+        step = 0
+        while frontier.any():
+            step += 1
+            grown = frontier.copy()
+            grown[1:, :] |= frontier[:-1, :]
+            grown[:-1, :] |= frontier[1:, :]
+            spread = grown.copy()
+            spread[:, 1:] |= grown[:, :-1]
+            spread[:, :-1] |= grown[:, 1:]
+            frontier = spread & passable & ~reached
+            distances[frontier] = step
+            reached |= frontier
+
+        self.distances = distances
+        if self.file is not None:
+            map_cache.save_cached(self.file, ".distance.npz", key, distances=distances)
+        return self.distances
+
+    def viability_table(self):
+        """Used to get the table of the states (position and speed) of a car from which it can avoid crashing into the
+        terrain forever, or reach the finish line (see ViabilityTable). It is computed once and cached next to the
+        csv file of the map, and computed again when the csv file, the terrain or viability.VERSION changes.
+
+        :return: the ViabilityTable of the map.
+        """
+        if self.viability is not None:
+            return self.viability
+        key = map_cache.content_key(viability.VERSION, self.terrain)
+        cached = map_cache.load_cached(self.file, ".viable.npz", key) if self.file is not None else None
+        if cached is not None and tuple(cached["size"]) == self.terrain.shape:
+            max_speed_x, max_speed_y = cached["max_speeds"]
+            self.viability = ViabilityTable(self.width, self.height, int(max_speed_x), int(max_speed_y), cached["bits"])
+            return self.viability
+
+        self.viability = ViabilityTable.compute(self.terrain)
+        if self.file is not None:
+            map_cache.save_cached(
+                self.file, ".viable.npz", key, size=np.array(self.terrain.shape),
+                max_speeds=np.array([self.viability.max_speed_x, self.viability.max_speed_y]), bits=self.viability.bits
+            )
+        return self.viability
+
+    def finish_distance(self, position):
+        """Used to get the number of moves needed to reach the finish line from a tile.
+
+        Parameters
+        ----------
+        position: np.array([,])
+            the coordinates of the tile.
+
+        :return: the number of moves, -1 if the tile is outside the map or the finish line can't be reached from it.
+        """
+        x, y = int(position[0]), int(position[1])
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return -1
+        return int(self.distance_field()[x, y])
+
+    def finish_distances(self, positions: np.ndarray):
+        """Used to get the number of moves needed to reach the finish line from several tiles at once.
+
+        Parameters
+        ----------
+        positions: np.array((count, 2))
+            the coordinates of the tiles.
+
+        :return: an array with the number of moves from each tile, -1 for the tiles outside the map or from which the
+        finish line can't be reached.
+        """
+        positions = np.asarray(positions)
+        inside = (
+            (positions[:, 0] >= 0)
+            & (positions[:, 0] < self.width)
+            & (positions[:, 1] >= 0)
+            & (positions[:, 1] < self.height)
+        )
+        distances = np.full(len(positions), -1, dtype=np.int32)
+        distances[inside] = self.distance_field()[positions[inside, 0], positions[inside, 1]]
+        return distances
+
     def get_tile_list_type(self, index: tuple, tile_value: int):
         """Used to return a set of tiles stored in a tuple of tuples of indexes for a specific player with his
         number associated value (refer to the TileState Flag class for values).
@@ -151,7 +371,8 @@ class GameMap:
         tile_value: int
             the value of the player which has to make a move.
         """
-        return list(self.map[index] & ~tile_value)
+        tiles = (self.terrain[index].astype(np.int64) << rules.TERRAIN_SHIFT) | self.occupancy[index]
+        return list(tiles & ~tile_value)
 
     def modify_tile_list_state(self, index: tuple, tile_value: int):
         """Used to modify a tile list with a tuple-tuple of indexes to a set value.
@@ -164,11 +385,16 @@ class GameMap:
         tile_value: int
             the value we want to modify the tiles values to.
         """
-        self.map[index] |= tile_value
+        self.occupancy[index] |= np.uint8(tile_value)
+        indices = np.ravel_multi_index(index, self.occupancy.shape)
+        if tile_value in self.traces:
+            indices = np.concatenate([self.traces[tile_value], indices])
+        self.traces[tile_value] = indices
 
     def remove_previous_move(self, value: int):
         """Used to remove the previous move of a player (each player will leave a "trace" of his movement from the last
-        turn), this method is used to erase this trace.
+        turn), this method is used to erase this trace. Only the tiles recorded by modify_tile_list_state for this
+        value are cleared, so the cost depends on the length of the trace and not on the size of the map.
 
         Parameters
         ----------
@@ -176,74 +402,152 @@ class GameMap:
         value: int
             the value from which the map has to be removed of.
         """
-        self.map &= ~value
+        indices = self.traces.pop(value, None)
+        if indices is not None:
+            self.occupancy.flat[indices] &= np.uint8(~value & PLAYER_MASK)
 
-    def draw(self, window: pygame.display, tile_size: int):
-        """Used to draw the game_map on the window.
+    def terrain_surface(self):
+        """Used to get the surface of the tiles that never change (road, walls and finish line), with one pixel per
+        tile, drawn once and kept until the terrain changes.
+
+        :return: a surface of width by height pixels.
+        """
+        import pygame
+
+        if "terrain" not in self.surfaces:
+            colors = np.empty((self.width, self.height, 3), dtype=np.uint8)
+            colors[:] = terrain_colors[0]
+            colors[(self.terrain & rules.TERRAIN_WALL) != 0] = terrain_colors[TileState.WALL.value]
+            colors[(self.terrain & rules.TERRAIN_WIN) != 0] = terrain_colors[TileState.WIN.value]
+            self.surfaces["terrain"] = pygame.surfarray.make_surface(colors)
+        return self.surfaces["terrain"]
+
+    def static_surface(self, tile_size: int, offset=(0, 0), size: tuple = None):
+        """Used to get the surface with the tiles that never change and the grid, as seen in a view of the window. Only
+        the tiles in the view are scaled up from terrain_surface and only their grid lines are drawn, so the cost
+        depends on the size of the view and not on the size of the map. The last view drawn is kept for the next
+        frames.
 
         Parameters
         ----------
-
-        window: pygame.display
-            the window on which the map has to draw itself
         tile_size: int
-            the size of a tile, calculated in the Game class
-        """
-        for a in range(self.width):
-            for b in range(self.height):
-                if self.map[a, b] == TileState.WALL.value:
-                    pygame.draw.rect(
-                        window,
-                        (139, 69, 19),
-                        (
-                            a * tile_size,
-                            b * tile_size,
-                            tile_size,
-                            tile_size,
-                        ),
-                    )
-                elif self.map[a, b] == TileState.WIN.value:
-                    pygame.draw.rect(
-                        window,
-                        (255, 255, 255),
-                        (
-                            a * tile_size,
-                            b * tile_size,
-                            tile_size,
-                            tile_size,
-                        ),
-                    )
-                elif self.map[a, b] == 0:
-                    pygame.draw.rect(
-                        window,
-                        (55, 55, 55),
-                        (
-                            a * tile_size,
-                            b * tile_size,
-                            tile_size,
-                            tile_size,
-                        ),
-                    )
-                else:
-                    value = int(math.log(self.map[a, b], 2))
-                    pygame.draw.rect(
-                        window,
-                        (100, 31, value * 31),
-                        (a * tile_size, b * tile_size, tile_size, tile_size),
-                    )
+            the size of a tile, calculated by the camera of the Game class
+        offset: tuple (optional)
+            the coordinates, in pixels of the whole map, of the top left corner of the view (see Camera.offset).
+        size: tuple (optional)
+            the size of the view in pixels, defaulting to the size of the whole map.
 
-        for x in range(self.width + 1):
+        :return: a surface of the size of the view.
+        """
+        import pygame
+
+        offset_x, offset_y = int(offset[0]), int(offset[1])
+        if size is None:
+            size = (self.width * tile_size, self.height * tile_size)
+        key = (tile_size, offset_x, offset_y, tuple(size))
+        if self.surfaces.get("view", (None,))[0] == key:
+            return self.surfaces["view"][1]
+
+        surface = pygame.Surface(size)
+        x0 = max(offset_x // tile_size, 0)
+        y0 = max(offset_y // tile_size, 0)
+        x1 = min(-(-(offset_x + size[0]) // tile_size), self.width)
+        y1 = min(-(-(offset_y + size[1]) // tile_size), self.height)
+        if x1 > x0 and y1 > y0:
+            tiles = self.terrain_surface().subsurface((x0, y0, x1 - x0, y1 - y0))
+            surface.blit(
+                pygame.transform.scale(tiles, ((x1 - x0) * tile_size, (y1 - y0) * tile_size)),
+                (x0 * tile_size - offset_x, y0 * tile_size - offset_y),
+            )
+        top = -offset_y
+        bottom = self.height * tile_size - offset_y
+        left = -offset_x
+        right = self.width * tile_size - offset_x
+
+        for x in range(x0, x1 + 1):
             pygame.draw.line(
-                window,
+                surface,
                 (0, 0, 0),
-                (x * tile_size - tile_size/2, 0),
-                (x * tile_size - tile_size/2, constants.window_height),
+                (x * tile_size - tile_size/2 - offset_x, top),
+                (x * tile_size - tile_size/2 - offset_x, bottom),
             )
 
-        for y in range(self.height + 1):
+        for y in range(y0, y1 + 1):
             pygame.draw.line(
-                window,
+                surface,
                 (0, 0, 0),
-                (0, y * tile_size - tile_size/2),
-                (constants.window_width, y * tile_size - tile_size/2),
+                (left, y * tile_size - tile_size/2 - offset_y),
+                (right, y * tile_size - tile_size/2 - offset_y),
             )
+        self.surfaces["view"] = (key, surface)
+        return surface
+
+    def restore(self, window: pygame.display, tile_size: int, rects: list, offset=(0, 0)):
+        """Used to erase what was drawn over some parts of the window by drawing the static tiles on them again.
+
+        Parameters
+        ----------
+
+        window: pygame.display
+            the window on which the map has to draw itself
+        tile_size: int
+            the size of a tile, calculated by the camera of the Game class
+        rects: list
+            the rectangles of the window that have to be restored
+        offset: tuple (optional)
+            the coordinates, in pixels of the whole map, of the top left corner of the window (see Camera.offset).
+        """
+        surface = self.static_surface(tile_size, offset, window.get_size())
+        for rect in rects:
+            window.fill((0, 0, 0), rect)
+            window.blit(surface, rect, rect)
+
+    def draw_traces(self, window: pygame.display, tile_size: int, offset=(0, 0)):
+        """Used to draw the tiles on which the players left a trace during their last move, skipping the ones outside
+        of the window.
+
+        Parameters
+        ----------
+
+        window: pygame.display
+            the window on which the map has to draw itself
+        tile_size: int
+            the size of a tile, calculated by the camera of the Game class
+        offset: tuple (optional)
+            the coordinates, in pixels of the whole map, of the top left corner of the window (see Camera.offset).
+
+        :return: the list of rectangles of the window that have been drawn on.
+        """
+        import pygame
+
+        offset_x, offset_y = offset
+        width, height = window.get_size()
+        rects = []
+        for tile_value in sorted(self.traces):
+            value = tile_value.bit_length() - 1
+            for a, b in zip(*np.unravel_index(self.traces[tile_value], self.occupancy.shape)):
+                x = a * tile_size - offset_x
+                y = b * tile_size - offset_y
+                if -tile_size < x < width and -tile_size < y < height:
+                    rects.append(
+                        pygame.draw.rect(window, (100, 31, value * 31), (x, y, tile_size, tile_size))
+                    )
+        return rects
+
+    def draw(self, window: pygame.display, tile_size: int, offset=(0, 0)):
+        """Used to draw the game_map on the window.
+
+        Parameters
+        ----------
+
+        window: pygame.display
+            the window on which the map has to draw itself
+        tile_size: int
+            the size of a tile, calculated by the camera of the Game class
+        offset: tuple (optional)
+            the coordinates, in pixels of the whole map, of the top left corner of the window (see Camera.offset).
+
+        :return: the list of rectangles of the window on which traces have been drawn.
+        """
+        window.blit(self.static_surface(tile_size, offset, window.get_size()), (0, 0))
+        return self.draw_traces(window, tile_size, offset)
@@ -1,71 +1,220 @@
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
 import numpy as np
 import os
+import time
 import pygame
+import ai
+import assets
 import constants
+import replay
 
 from game import Game
+from profiling import FrameProfiler
 from game_map import GameMap
 from player import Player
 from player import PlayerState
+from simulation import RETIRE, start_positions
+import rules
 
 os.environ["SDL_VIDEO_CENTERED"] = "1"
 
+keep_speed = len(rules.accelerations) - 1
+"""The index of the acceleration keeping the same speed (numpad 5) in rules.accelerations."""
+
 
 class MyGame:
-    def __init__(self, map_number: int):
-        pygame.init()
+    def __init__(self, map_number: int, start_time: float = None):
+        self.start_time = time.perf_counter() if start_time is None else start_time
+        self.first_frame_time = None
+        pygame.display.init()
         self.window = pygame.display.set_mode(constants.window_size)
         pygame.display.set_caption("Car Game")
-        pygame.display.set_icon(pygame.image.load("image/car_game_icon.png"))
+        pygame.display.set_icon(assets.registry.image("icon"))
         self.clock = pygame.time.Clock()
         self.running = True
-        self.position_grid = np.genfromtxt("positions/position"+str(map_number)+".csv", dtype=int, delimiter=",")
         self.game = Game(map_number)
+        self.position_grid = self.game.game_map.start_grid
         self.collision_help = True
         self.turn_count = 0
+        self.dirty_rects = None
+        self.needs_redraw = True
+        self.input_time = None
+        self.input_latencies = []
+        self.profiler = FrameProfiler()
+        self.follow_player = True
+        self.move_log = None
+        self.thinker = ThreadPoolExecutor(max_workers=1)
 
     def process_input(self, player: Player):
+        """Used to wait for the inputs of the player (at most constants.input_timeout milliseconds) and apply them.
+        Every input that changes what is displayed asks for the window to be drawn again."""
+        with self.profiler.phase("input_wait"):
+            first_event = pygame.event.wait(constants.input_timeout)
+        received = time.perf_counter()
+        with self.profiler.phase("process_input"):
+            self.handle_events(player, [first_event] + pygame.event.get(), received)
+
+    def handle_events(self, player: Player, events: list, received: float):
+        """Used to apply the events received while waiting for the inputs of the player.
 
-        for event in pygame.event.get():
+        Parameters
+        ----------
+        player: Player
+            the player whose turn it is.
+        events: list
+            the pygame events received.
+        received: float
+            the time (from time.perf_counter) at which the events were received.
+        """
+        for event in events:
             if event.type == pygame.QUIT:
                 self.running = False
                 break
+            elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED, pygame.WINDOWRESIZED):
+                self.dirty_rects = None
+                self.needs_redraw = True
+            elif event.type == pygame.MOUSEWHEEL:
+                self.game.camera.zoom_by(event.y)
+                self.request_redraw(received)
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE:
                     self.running = False
                     break
                 elif event.key == pygame.K_h:
                     self.collision_help = not self.collision_help
+                    self.request_redraw(received)
+                elif event.key == pygame.K_p:
+                    self.profiler.enabled = not self.profiler.enabled
+                    self.request_redraw(received)
+                elif event.key in constants.camera_pan_keys:
+                    direction_x, direction_y = constants.camera_pan_keys[event.key]
+                    self.game.camera.pan(direction_x * constants.camera_pan_step, direction_y * constants.camera_pan_step)
+                    self.request_redraw(received)
+                elif event.key in constants.camera_zoom_keys:
+                    self.game.camera.zoom_by(constants.camera_zoom_keys[event.key])
+                    self.request_redraw(received)
+                elif event.key == pygame.K_c:
+                    self.game.camera.center_on(player.position)
+                    self.request_redraw(received)
                 else:
                     if constants.default_inputs.get(event.key) is not None:
                         if not player.collision_speed_check(
                             self.game.game_map, constants.default_inputs.get(event.key), self.collision_help
                         ):
-                            player.speed += constants.default_inputs.get(event.key)
-                            self.move_player(player)
+                            self.move_player(player, constants.default_inputs.get(event.key))
+                            self.request_redraw(received)
                             break
 
+    def snapshot(self):
+        """Used to get the state of the game (see Game.snapshot), with the turn of the player who has to play.
+
+        :return: the simulation.RaceState of the game.
+        """
+        return self.game.snapshot(self.turn_count)
+
+    def restore(self, state):
+        """Used to put the game back in a state taken with snapshot, the window being drawn again entirely.
+
+        Parameters
+        ----------
+        state: simulation.RaceState
+            the state of the game.
+        """
+        self.game.restore(state)
+        self.turn_count = state.turn
+        self.dirty_rects = None
+        self.needs_redraw = True
+        self.follow_player = True
+
+    def request_redraw(self, input_time: float):
+        """Used to ask for the window to be drawn again after an input changed the state of the game.
+
+        Parameters
+        ----------
+        input_time: float
+            the time (from time.perf_counter) at which the input was received, kept to measure the latency until it
+            is displayed.
+        """
+        self.needs_redraw = True
+        if self.input_time is None:
+            self.input_time = input_time
+
+    def latency_report(self):
+        """Used to describe the time between the inputs and their display on the window.
+
+        :return: a string with the number of inputs, the mean, 95th percentile and maximum latencies.
+        """
+        if not self.input_latencies:
+            return "No input displayed."
+        latencies = np.array(self.input_latencies) * 1000
+        return (
+            "Input latency over " + str(len(latencies)) + " inputs: mean " + str(round(latencies.mean(), 2))
+            + "ms, 95% " + str(round(np.percentile(latencies, 95), 2))
+            + "ms, max " + str(round(latencies.max(), 2)) + "ms"
+        )
+
+    def startup_report(self):
+        """Used to describe the time between the creation of the game (or the launch of the program, if its start time
+        was given) and its first frame on the window.
+
+        :return: a string with the time to first frame.
+        """
+        if self.first_frame_time is None:
+            return "No frame displayed."
+        return "Time to first frame: " + str(round(self.first_frame_time * 1000, 2)) + "ms"
+
     def render(self):
-        self.window.fill((0, 0, 0))
-        self.game.draw(self.window, self.turn_count)
-        if self.collision_help:
-            pygame.draw.rect(self.window, (200, 200, 200), (constants.window_width - self.game.game_map.width, 0, 30, 30))
-        for player in self.game.player_list:
-            if (
-                player.collision_speed_check(self.game.game_map, np.array([0, 0]), self.collision_help)
-                and player.state_check(self.game.game_map) != PlayerState.IS_OUT
-            ):
-                pygame.draw.polygon(
-                    self.window, (200, 50, 50), [(80, 60), (40, 130), (120, 130)]
+        """Used to draw the game on the window. Only the rectangles drawn on during this frame or the previous one are
+        sent to the display, unless the whole window had to be drawn again. The frame rate is capped to
+        constants.frame_rate. While the profiler is enabled, its overlay is drawn on top of the game."""
+        self.clock.tick(constants.frame_rate)
+        with self.profiler.phase("render"):
+            with self.profiler.phase("draw_background"):
+                full_redraw = self.game.draw_background(self.window, self.dirty_rects)
+            with self.profiler.phase("Game.draw"):
+                rects = self.game.draw(self.window, self.turn_count)
+            if self.collision_help:
+                rects.append(
+                    pygame.draw.rect(self.window, (200, 200, 200), (constants.window_width - self.game.game_map.width, 0, 30, 30))
                 )
-                pygame.draw.polygon(
-                    self.window, (255, 255, 255), [(80, 70), (48, 125), (112, 125)]
-                )
-                pygame.draw.rect(self.window, (0, 0, 0), (77, 85, 6, 20))
-                pygame.draw.circle(self.window, (0, 0, 0), (80, 115), 4)
-        pygame.display.update()
+            with self.profiler.phase("move_safety"):
+                for player in self.game.player_list:
+                    if player.state_check(self.game.game_map) == PlayerState.IS_OUT:
+                        continue
+                    outcomes, unsafe = player.evaluate_accelerations(self.game.game_map, self.collision_help)
+                    if self.collision_help and player.number == self.turn_count:
+                        rects += player.draw_move_safety(
+                            self.window, self.game.tile_size, unsafe, self.game.camera.offset
+                        )
+                    if unsafe[keep_speed]:
+                        rects.append(pygame.draw.polygon(
+                            self.window, (200, 50, 50), [(80, 60), (40, 130), (120, 130)]
+                        ))
+                        pygame.draw.polygon(
+                            self.window, (255, 255, 255), [(80, 70), (48, 125), (112, 125)]
+                        )
+                        pygame.draw.rect(self.window, (0, 0, 0), (77, 85, 6, 20))
+                        pygame.draw.circle(self.window, (0, 0, 0), (80, 115), 4)
+            if self.profiler.enabled:
+                rects.append(self.profiler.draw_overlay(self.window, self.clock.get_fps()))
+            with self.profiler.phase("display.update"):
+                if full_redraw:
+                    pygame.display.update()
+                else:
+                    pygame.display.update(self.dirty_rects + rects)
+        self.dirty_rects = rects
+        self.needs_redraw = False
+        if self.first_frame_time is None:
+            self.first_frame_time = time.perf_counter() - self.start_time
+        if self.input_time is not None:
+            self.input_latencies.append(time.perf_counter() - self.input_time)
+            self.input_time = None
 
     def run(self):
+        self.move_log = replay.MoveLog(
+            self.game.map_number, [player.position for player in self.game.player_list]
+        )
         while self.running:
             for player in self.game.player_list:
                 if player.number == self.turn_count:
@@ -73,18 +222,71 @@ class MyGame:
                         player.has_played = True
                     else:
                         self.game.update(player)
-                        self.render()
-                        self.process_input(player)
-                        if self.end_of_player(player, self.game.game_map):
+                        if self.follow_player:
+                            self.game.camera.follow(player.position)
+                            self.follow_player = False
+                        if self.needs_redraw:
+                            self.render()
+                        if player.ai is None:
+                            self.process_input(player)
+                        else:
+                            self.ai_turn(player)
+                        playing = player.state_check(self.game.game_map) == PlayerState.CAN_PLAY
+                        with self.profiler.phase("end_of_player"):
+                            hopeless = self.end_of_player(player, self.game.game_map)
+                        if hopeless:
+                            if playing:
+                                self.move_log.record(player.number, RETIRE)
                             continue
                         if not player.movement_validity():
                             continue
                     self.turn_count += 1
                     self.turn_count %= len(self.game.player_list)
+                    self.needs_redraw = True
+                    self.follow_player = True
                     self.game.player_state_reset()
                     self.end_of_game()
 
-    def move_player(self, player: Player):
+    def ai_turn(self, player: Player):
+        """Used to make a player controlled by the computer play his turn. He thinks on another thread while the
+        window keeps answering, and the game can still be left with escape or by closing the window (once he is done
+        thinking, his move being dropped). The other keys pressed meanwhile are ignored, so that they aren't taken as
+        the move of the next player.
+
+        Parameters
+        ----------
+        player: Player
+            the AI player whose turn it is.
+        """
+        left = False
+        with self.profiler.phase("ai"):
+            thinking = self.thinker.submit(ai.play, self.game, player, player.ai, constants.ai_time_budget)
+            finished = False
+            while not finished:
+                finished = bool(wait([thinking], timeout=1 / constants.frame_rate).done)
+                for event in pygame.event.get((pygame.QUIT, pygame.KEYDOWN)):
+                    if event.type == pygame.QUIT or event.key == pygame.K_ESCAPE:
+                        left = True
+            acceleration = thinking.result()
+        if left:
+            self.running = False
+            return
+        self.move_player(player, acceleration)
+        self.needs_redraw = True
+
+    def move_player(self, player: Player, acceleration: np.array):
+        """Used to make a player move with an acceleration, the move being kept in the move log of the game.
+
+        Parameters
+        ----------
+        player: Player
+            the player whose turn it is.
+        acceleration: np.array([,])
+            the acceleration chosen, one of the values of constants.default_inputs.
+        """
+        player.speed += acceleration
+        if self.move_log is not None:
+            self.move_log.record(player.number, replay.action_index(acceleration))
         if player.path_checking(self.game.game_map) == 1:
             self.game.game_map.modify_tile_list_state(
                 player.get_walk_coordinates(), 2**player.number
@@ -98,21 +300,24 @@ class MyGame:
             player.plays()
 
     def end_of_game(self):
-        players_out = 0
-        players_won = 0
-        for player in self.game.player_list:
-            if player.state_check(self.game.game_map) == PlayerState.IS_OUT:
-                players_out += 1
-            elif player.state_check(self.game.game_map) == PlayerState.HAS_WON:
-                players_won += 1
+        if not self.running:
+            return
+        states = self.game.player_states()
+        players_out = np.count_nonzero(states == PlayerState.IS_OUT.value)
+        players_won = np.count_nonzero(states == PlayerState.HAS_WON.value)
         if players_out == len(self.game.player_list):
             self.running = False
             print("Everyone is out, game is over!")
         if players_won > 0:
             self.running = False
+        if not self.running:
+            print("Final ranking:", ", ".join(player.name for player in self.game.ranking()))
 
     def end_of_player(self, player: Player, game_map: GameMap):
         """Used to determine if the player should be taken out of the game due to impossibility to save himself.
+        With the collision help, a move landing on a tile from which the finish line can't be reached counts as
+        hopeless as well. A player who has just reached the finish line is never taken out, and a player taken out
+        leaves no trace on the map (as when he crashes).
 
         Parameters
         ----------
@@ -123,45 +328,90 @@ class MyGame:
         :return:
         True if the player should be taken out of the game, False if he can still play.
         """
-        outcomes = []
-        for i, elem in constants.default_inputs.items():
-            outcomes.append(player.collision_speed_check(game_map, elem, self.collision_help))
-        if np.all(outcomes):
+        if player.state_check(game_map) == PlayerState.HAS_WON:
+            return False
+        outcomes, unsafe = player.evaluate_accelerations(game_map, self.collision_help)
+        if self.collision_help:
+            unsafe |= game_map.finish_distances(player.position + player.speed + rules.accelerations) < 0
+        if np.all(unsafe):
             player.is_out()
+            game_map.remove_previous_move(2**player.number)
             return True
         return False
 
 
-can_start = False
+def new_game(map_number: int, names: list, bot_count: int, policy: str = None, start_time: float = None):
+    """Used to open the window of a game and place its players on the starting grid.
 
-while not can_start:
-    try:
-        player_count = int(input("Please chose how much player will play (max 8): "))
-        if not 0 < player_count < 9:
-            print("Invalid number. Please try again")
-        else:
-            can_start = True
-        map_number = int(input("On which map do you want to play? (Maps go from 1 to 5) "))
-        if not 0 < map_number < 6:
-            print("Not a valid map number, try again!")
-            can_start = False
-    except ValueError:
-        print("That's not a number, try again!")
-        can_start = False
+    Parameters
+    ----------
+    map_number: int
+        the number of the map.
+    names: list
+        the name of each player, the last bot_count ones being controlled by the computer.
+    bot_count: int
+        the number of players controlled by the computer.
+    policy: str (optional)
+        the policy of the computer players (one of ai.policies), constants.ai_policy by default.
+    start_time: float (optional)
+        the time.perf_counter() the program was launched at, for the startup report.
+
+    :return: the MyGame.
+    """
+    game = MyGame(map_number, start_time)
+    policy = constants.ai_policy if policy is None else policy
+    for a, position in enumerate(start_positions(game.position_grid, len(names))):
+        game.game.new_player(a, names[a], position, ai=policy if a >= len(names) - bot_count else None)
+    return game
 
 
-name_list = []
-for a in range(player_count):
-    name_list.append(input("Player #" + str(a + 1) + ", choose your name: "))
+def play(game: MyGame):
+    """Used to play a game until it's over, then save its replay and print its reports. The processes of the AI
+    players are started in the background, so that they don't delay the first frame."""
+    if any(player.ai is not None for player in game.game.player_list):
+        ai.warm_pool(wait=False)
+    game.run()
+    game.thinker.shutdown()
+    ai.shutdown_pool()
+    replay_file = os.path.join(constants.replay_folder, time.strftime("%Y%m%d-%H%M%S") + replay.REPLAY_SUFFIX)
+    game.move_log.save(replay_file, game.game.game_map.terrain)
+    print("Replay saved to", replay_file)
+    print(game.startup_report())
+    print(game.latency_report())
+    if game.profiler.events:
+        print("Saved", game.profiler.dump(constants.profile_trace_file), "trace events to", constants.profile_trace_file)
+    pygame.quit()
 
-game = MyGame(map_number)
 
-for a in range(player_count):
-    if a == 0:
-        game.game.new_player(a, name_list[a], game.position_grid[player_count - 1])
-    else:
-        game.game.new_player(a, name_list[a], game.position_grid[a - 1])
+if __name__ == "__main__":
+    warm_up = assets.registry.warm_up()
+    can_start = False
+
+    while not can_start:
+        try:
+            player_count = int(input("Please chose how much player will play (max 8): "))
+            if not 0 < player_count < 9:
+                print("Invalid number. Please try again")
+            else:
+                can_start = True
+            map_number = int(input("On which map do you want to play? (Maps go from 1 to 5) "))
+            if not 0 < map_number < 6:
+                print("Not a valid map number, try again!")
+                can_start = False
+            if can_start:
+                bot_count = int(input("How many of these players are controlled by the computer? "))
+                if not 0 <= bot_count <= player_count:
+                    print("Not a valid number of bots, try again!")
+                    can_start = False
+        except ValueError:
+            print("That's not a number, try again!")
+            can_start = False
 
+    name_list = []
+    for a in range(player_count - bot_count):
+        name_list.append(input("Player #" + str(a + 1) + ", choose your name: "))
+    for a in range(bot_count):
+        name_list.append("Bot " + str(a + 1))
 
-game.run()
-pygame.quit()
+    warm_up.join()
+    play(new_game(map_number, name_list, bot_count))
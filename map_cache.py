@@ -0,0 +1,102 @@
+import hashlib
+import os
+import numpy as np
+
+
+def source_signature(source: str):
+    """Used to get what identifies a version of a source file (its modification time and its size).
+
+    Parameters
+    ----------
+    source: str
+        the path of the source file.
+
+    :return: an array containing the modification time (in nanoseconds) and the size of the file.
+    """
+    status = os.stat(source)
+    return np.array([status.st_mtime_ns, status.st_size], dtype=np.int64)
+
+
+def content_key(version: int, data: np.ndarray):
+    """Used to get what identifies the content of a cache: the version of the way it is computed and a hash of the data
+    it is computed from, so that a cache written by another version of the game, or for another terrain, isn't used.
+
+    Parameters
+    ----------
+    version: int
+        the version of the way the cached arrays are computed.
+    data: np.array
+        the array the cached arrays are computed from (the terrain of a map).
+
+    :return: an array of bytes holding the version and the hash.
+    """
+    digest = hashlib.blake2b(np.ascontiguousarray(data).tobytes(), digest_size=16)
+    digest.update(str(data.shape).encode() + str(data.dtype).encode())
+    return np.frombuffer(version.to_bytes(4, "little") + digest.digest(), dtype=np.uint8)
+
+
+def cache_path(source: str, suffix: str):
+    """Used to get the path of a file cached next to its source (maps/map1.csv -> maps/map1<suffix>).
+
+    Parameters
+    ----------
+    source: str
+        the path of the source file.
+    suffix: str
+        the end of the name of the cached file, extension included.
+    """
+    return os.path.splitext(source)[0] + suffix
+
+
+def load_cached(source: str, suffix: str, key: np.ndarray):
+    """Used to load the arrays cached next to a source file, as long as the source didn't change since and the cache
+    was written with the same key.
+
+    Parameters
+    ----------
+    source: str
+        the path of the source file.
+    suffix: str
+        the end of the name of the cached file, extension included.
+    key: np.array
+        what identifies the content of the cache (see content_key).
+
+    :return: a dictionary of the cached arrays, or None if there is no valid cache.
+    """
+    path = cache_path(source, suffix)
+    try:
+        with np.load(path) as cached:
+            if not np.array_equal(cached["signature"], source_signature(source)):
+                return None
+            if not np.array_equal(cached["key"], key):
+                return None
+            return {name: cached[name] for name in cached.files if name not in ("signature", "key")}
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def save_cached(source: str, suffix: str, key: np.ndarray, **arrays):
+    """Used to cache arrays next to a source file, along with the signature of the source and the key of the content.
+
+    The file is written under a temporary name first, so that other processes never read a partial cache.
+
+    Parameters
+    ----------
+    source: str
+        the path of the source file.
+    suffix: str
+        the end of the name of the cached file, extension included.
+    key: np.array
+        what identifies the content of the cache (see content_key).
+    arrays: np.array
+        the arrays to cache, by name.
+    """
+    path = cache_path(source, suffix)
+    temporary = path + "." + str(os.getpid()) + ".tmp"
+    try:
+        with open(temporary, "wb") as file:
+            np.savez(file, signature=source_signature(source), key=key, **arrays)
+        os.replace(temporary, path)
+    except OSError:
+        if os.path.exists(temporary):
+            os.remove(temporary)
@@ -1,109 +1,159 @@
-from CarGame.game_map import GameMap, TileState
-
-
-class Node:
-    """A node class for A* Pathfinding"""
-
-    def __init__(self, parent=None, position=None):
-        self.parent = parent
-        self.position = position
-
-        self.g = 0
-        self.h = 0
-        self.f = 0
-
-    def __eq__(self, other):
-        return self.position == other.position
-
-
-def a_star(maze, start, end):
-    """Returns a list of tuples as a path from the given start to the given end in the given maze"""
-    start_node = Node(None, start)
-    start_node.g = start_node.h = start_node.f = 0
-    end_node = Node(None, end)
-    end_node.g = end_node.h = end_node.f = 0
-
-    open_list = []
-    closed_list = []
-    open_list.append(start_node)
-
-    while len(open_list) > 0:
-        current_node = open_list[0]
-        current_index = 0
-
-        for index, item in enumerate(open_list):
-            if item.f < current_node.f:
-                current_node = item
-                current_index = index
-
-        open_list.pop(current_index)
-        closed_list.append(current_node)
-
-        if current_node == end_node:
+import heapq
+import time
+import numpy as np
+from game_map import GameMap, TileState
+
+neighbour_moves = ((0, -1), (0, 1), (-1, 0), (1, 0), (-1, -1), (-1, 1), (1, -1), (1, 1))
+"""The eight moves that can be made from a tile to one of its neighbours."""
+
+base_map_legs = (((1, 3), (25, 20)), ((24, 21), (1, 21)))
+"""The (start, end) pairs used by path_finder to go around the base game map."""
+
+
+class SearchStats:
+    """A class used to keep track of the work done by a search.
+
+    Attributes
+    ----------
+    nodes_expanded: int
+        the number of tiles taken out of the open list and expanded.
+    nodes_pushed: int
+        the number of entries pushed on the open list.
+    elapsed_time: float
+        the wall time spent in the search, in seconds.
+    """
+
+    def __init__(self):
+        self.nodes_expanded = 0
+        self.nodes_pushed = 0
+        self.elapsed_time = 0.0
+
+    def __repr__(self):
+        return (
+            "SearchStats(nodes_expanded=" + str(self.nodes_expanded)
+            + ", nodes_pushed=" + str(self.nodes_pushed)
+            + ", elapsed_time=" + str(round(self.elapsed_time * 1000, 3)) + "ms)"
+        )
+
+
+def heuristic(position: tuple, end: tuple):
+    """Used to estimate the number of moves left from a tile to the end.
+
+    Since a move can go to any of the eight neighbours, the Chebyshev distance never overestimates the remaining
+    number of moves, which keeps the A* search optimal.
+
+    Parameters
+    ----------
+    position: tuple
+        the coordinates of the tile.
+    end: tuple
+        the coordinates of the end tile.
+
+    :return: the estimated number of moves left.
+    """
+    return max(abs(position[0] - end[0]), abs(position[1] - end[1]))
+
+
+def a_star(maze, start, end, stats: SearchStats = None, distances: np.ndarray = None):
+    """Returns a list of tuples as a path from the given start to the given end in the given maze.
+
+    The open list is a binary heap and the closed and open sets are bitmaps over the tiles of the maze, so each
+    tile is expanded at most once. When the end is on the finish line, the distance field of the map (see
+    GameMap.distance_field) is a tighter estimate that still never overestimates, and is used along with the
+    Chebyshev distance.
+
+    Parameters
+    ----------
+    maze: np.array
+        the tiles of the map, as in GameMap.map.
+    start: tuple
+        the coordinates of the first tile of the path.
+    end: tuple
+        the coordinates of the last tile of the path.
+    stats: SearchStats (optional)
+        filled with the number of nodes expanded and the time spent in the search.
+    distances: np.array (optional)
+        the distance of each tile to the finish line, used as heuristic if the end is on the finish line.
+
+    :return: the list of coordinates from start to end, or None if there is no path.
+    """
+    if stats is None:
+        stats = SearchStats()
+    start_time = time.perf_counter()
+    maze = np.asarray(maze)
+    width, height = maze.shape
+    start = (int(start[0]), int(start[1]))
+    end = (int(end[0]), int(end[1]))
+
+    blocked = ((maze & ~TileState.WIN.value) != 0).ravel()
+    closed = np.zeros(width * height, dtype=bool)
+    opened = np.zeros(width * height, dtype=bool)
+    g_score = np.zeros(width * height, dtype=np.int32)
+    parent = np.full(width * height, -1, dtype=np.int32)
+
+    if distances is None or not maze[end] & TileState.WIN.value:
+        distances = np.zeros(maze.shape, dtype=np.int32)
+
+    start_index = start[0] * height + start[1]
+    end_index = end[0] * height + end[1]
+    opened[start_index] = True
+    open_list = [(max(heuristic(start, end), distances[start]), 0, start_index)]
+    stats.nodes_pushed += 1
+
+    path = None
+    while open_list:
+        f, g, index = heapq.heappop(open_list)
+        if closed[index] or g > g_score[index]:
+            continue
+        closed[index] = True
+        stats.nodes_expanded += 1
+
+        if index == end_index:
             path = []
-            current = current_node
-
-            while current is not None:
-                path.append(current.position)
-                current = current.parent
-            return path[::-1]
-
-        children = []
-        for new_position in [
-            (0, -1),
-            (0, 1),
-            (-1, 0),
-            (1, 0),
-            (-1, -1),
-            (-1, 1),
-            (1, -1),
-            (1, 1),
-        ]:
-            node_position = (
-                current_node.position[0] + new_position[0],
-                current_node.position[1] + new_position[1],
-            )
-            if (
-                node_position[0] > (len(maze) - 1)
-                or node_position[0] < 0
-                or node_position[1] > (len(maze[len(maze) - 1]) - 1)
-                or node_position[1] < 0
-            ):
+            while index != -1:
+                path.append(divmod(int(index), height))
+                index = parent[index]
+            path.reverse()
+            break
+
+        x, y = divmod(index, height)
+        for move_x, move_y in neighbour_moves:
+            child_x = x + move_x
+            child_y = y + move_y
+            if not (0 <= child_x < width and 0 <= child_y < height):
                 continue
-
-            if maze[node_position[0]][node_position[1]] & ~TileState.WIN.value:
+            child = child_x * height + child_y
+            if closed[child] or blocked[child]:
                 continue
-
-            new_node = Node(current_node, node_position)
-            children.append(new_node)
-
-        for child in children:
-            for closed_child in closed_list:
-                if child == closed_child:
-                    continue
-
-            child.g = current_node.g + 1
-            child.h = ((child.position[0] - end_node.position[0]) ** 2) + (
-                (child.position[1] - end_node.position[1]) ** 2
-            )
-            child.f = child.g + child.h
-            for open_node in open_list:
-                if child == open_node and child.g > open_node.g:
-                    continue
-
-            open_list.append(child)
-
-
-def path_finder():
-    """Used to look for the shortest path from start to finish on the base game map of the game."""
-    maze = GameMap(40, 25)
-    maze.base_map()
-
-    start = (1, 3)
-    end = (25, 20)
-
-    start2 = (24, 21)
-    end2 = (1, 21)
-
-    return a_star(maze.map, start, end) + a_star(maze.map, start2, end2)
-    # print(path)
+            if opened[child] and g_score[child] <= g + 1:
+                continue
+            opened[child] = True
+            g_score[child] = g + 1
+            parent[child] = index
+            estimate = max(heuristic((child_x, child_y), end), distances[child_x, child_y])
+            heapq.heappush(open_list, (g + 1 + estimate, g + 1, child))
+            stats.nodes_pushed += 1
+
+    stats.elapsed_time += time.perf_counter() - start_time
+    return path
+
+
+def path_finder(game_map: GameMap, stats: SearchStats = None):
+    """Used to look for the shortest path from start to finish on the base game map of the game.
+
+    Parameters
+    ----------
+    game_map: GameMap
+        the loaded map on which the path has to be found.
+    stats: SearchStats (optional)
+        filled with the statistics of all the searches made.
+
+    :return: the list of coordinates going through every leg, or None if one of them can't be completed.
+    """
+    path = []
+    for start, end in base_map_legs:
+        leg = a_star(game_map.map, start, end, stats, game_map.distance_field())
+        if leg is None:
+            return None
+        path += leg
+    return path
@@ -1,29 +1,98 @@
-import math
-from enum import Enum
 from game_map import GameMap
 from game_map import TileState
 import numpy as np
 import pygame
 import os
+import assets
 import constants as cst
+import rules
+import sprites
+from rules import PlayerState
+
+
+class PlayerTable:
+    """A class storing the players of a game as one table, a row per player, so that the state of every player can
+    be found at once instead of player by player. Each Player is a view on his row.
+
+    Attributes
+    ----------
+    positions: np.array((capacity, 2))
+        the position of each player, [-1, -1] for the players that are out.
+    speeds: np.array((capacity, 2))
+        the speed of each player.
+    has_played: np.array(capacity)
+        whether each player has played during this round.
+    count: int
+        the number of players in the table, only the first count rows being used.
 
+    Methods
+    -------
+    add(position, speed)
+        Used to add a player to the table.
 
-class PlayerState(Enum):
-    """Defines in which state the player currently is.
+    state_values(game_map)
+        Used to get the PlayerState value of every player at once.
 
-    Arguments
-    ---------
-    1: CAN_PLAY
-        if in this state, the player can act normally.
-    2: IS_OUT
-        if in this state, the player has lost and cannot move until the end.
-    3: HAS_WON
-        if in this state, the player will be declared (one of the) winner(s) at the end of the turn.
+    player_state_reset()
+        Used to start a new round once every player has played.
     """
 
-    CAN_PLAY = 1
-    IS_OUT = 2
-    HAS_WON = 3
+    def __init__(self, capacity: int = 8):
+        """
+        Parameters
+        ----------
+        capacity: int (optional)
+            the number of rows allocated, the table growing if more players are added.
+        """
+        self.positions = np.zeros((capacity, 2), dtype=np.int64)
+        self.speeds = np.zeros((capacity, 2), dtype=np.int64)
+        self.has_played = np.ones(capacity, dtype=bool)
+        self.count = 0
+
+    def add(self, position: np.ndarray, speed: np.ndarray):
+        """Used to add a player to the table.
+
+        :return: the index of the row of the player.
+        """
+        if self.count == len(self.positions):
+            capacity = 2 * len(self.positions) or 1
+            self.positions = np.resize(self.positions, (capacity, 2))
+            self.speeds = np.resize(self.speeds, (capacity, 2))
+            self.has_played = np.resize(self.has_played, capacity)
+        self.positions[self.count] = position
+        self.speeds[self.count] = speed
+        self.has_played[self.count] = True
+        self.count += 1
+        return self.count - 1
+
+    def state_values(self, game_map: GameMap):
+        """Used to get the state of every player at once, with the same checks as Player.state_check: a player is out
+        if his position is negative (he is then put at [-1, -1] with no speed), and has won if he is on a finish line
+        tile that no trace covers.
+
+        Parameters
+        ----------
+        game_map: GameMap
+            the map on which the players are evolving.
+
+        :return: an array with the PlayerState value of each player.
+        """
+        positions = self.positions[:self.count]
+        out = positions.min(axis=1) < 0
+        if out.any():
+            positions[out] = -1
+            self.speeds[:self.count][out] = 0
+        x = np.minimum(positions[:, 0], game_map.width - 1)
+        y = np.minimum(positions[:, 1], game_map.height - 1)
+        won = (game_map.terrain[x, y] == rules.TERRAIN_WIN) & (game_map.occupancy[x, y] == 0)
+        states = np.where(won, PlayerState.HAS_WON.value, PlayerState.CAN_PLAY.value).astype(np.int8)
+        states[out] = PlayerState.IS_OUT.value
+        return states
+
+    def player_state_reset(self):
+        """Used to start a new round, every player being able to play again, once every player has played."""
+        if self.has_played[:self.count].all():
+            self.has_played[:self.count] = False
 
 
 class Player:
@@ -36,9 +105,13 @@ class Player:
     name: str
         chosen by the players at the beginning of the game to allow them to recognize themselves.
     position: np.array([,])
-        used by the game to know where the player is on the grid.
+        used by the game to know where the player is on the grid (his row of the positions of the PlayerTable).
     speed: np.array([,])
-        used by the game to make the player move.
+        used by the game to make the player move (his row of the speeds of the PlayerTable).
+    table: PlayerTable
+        the table holding the position, speed and has_played of the player.
+    index: int
+        the row of the player in the table.
 
 
     Methods
@@ -59,21 +132,25 @@ class Player:
     get_walk_coordinates()
         used to determine which tiles the player is going to go over on his next move.
 
-    transform_to_tuples_positions(array)
-        used to transform an array containing arrays of coordinates to a tuple of tuples of indexes.
-
     collision_speed_check(game_map, speed = None)
         used to know if the player can make a specific move or not (the speed being the desired change in the player's
         speed) without being automatically being out of the game.
 
+    evaluate_accelerations(game_map, help)
+        used to evaluate the outcome and safety of all nine accelerations at once.
+
     movement_validity()
         used to know if the player has made a valid move in his turn, in order not to skip his turn completely.
 
-    draw(window, tile_size)
+    draw(window, tile_size, turn, offset)
         A method used to draw the player's car image, rotating according to his direction, as well as the tile
-        he would land on in his next move if he keeps the same speed.
+        he would land on in his next move if he keeps the same speed (the rotated images come from the shared
+        sprites.sprite_cache).
 
-    draw_arrow(window, tile_size)
+    draw_move_safety(window, tile_size, unsafe, offset)
+        Used to outline the tiles the player would land on with each acceleration, colored by safety.
+
+    draw_arrow(window, tile_size, offset)
         Used to draw a small square under the player if it's his turn.
 
     can_play()
@@ -90,7 +167,9 @@ class Player:
         speed: np.ndarray,
         name: str,
         inputs: dict = cst.default_inputs,
-        texture=pygame.image.load("image/red_car.png"),
+        texture=None,
+        ai: str = None,
+        table: PlayerTable = None,
     ):
         """
         Parameters
@@ -106,19 +185,46 @@ class Player:
         inputs: dict (optional)
             the dictionary of the player's movement possibilities, has a default value of constants.default_inputs.
         texture (optional)
-            the texture of the player on the game, defaulting to a red car.
+            the texture of the player on the game, defaulting to the red car of the asset registry (loaded when the
+            player is first drawn).
+        ai: str (optional)
+            the policy of the player if he is controlled by the computer (one of ai.policies), None for a human player.
+        table: PlayerTable (optional)
+            the table of the players of the game, the player getting a table of his own if None.
         """
         self.number = number
-        self.position = position
-        self.speed = speed
+        self.table = table if table is not None else PlayerTable(1)
+        self.index = self.table.add(position, speed)
         self.name = name
         self.inputs = inputs
         self.texture = texture
-        self.scaled_texture = None
+        self.ai = ai
         self.displayed_texture = None
-        self.has_played = True
-        self.font = pygame.font.Font(None, 30)
-        self.name_display = self.font.render(self.name, False, pygame.color.Color("#e0e0e0"))
+        self.name_display = None
+
+    @property
+    def position(self):
+        return self.table.positions[self.index]
+
+    @position.setter
+    def position(self, value):
+        self.table.positions[self.index] = value
+
+    @property
+    def speed(self):
+        return self.table.speeds[self.index]
+
+    @speed.setter
+    def speed(self, value):
+        self.table.speeds[self.index] = value
+
+    @property
+    def has_played(self):
+        return bool(self.table.has_played[self.index])
+
+    @has_played.setter
+    def has_played(self, value: bool):
+        self.table.has_played[self.index] = value
 
     def plays(self):
         """Uses the player speed and current location to make him go to a new tile."""
@@ -145,33 +251,13 @@ class Player:
         if velocity is None:
             velocity = self.speed.copy()
         if self.state_check(game_map) == PlayerState.IS_OUT:
-            path = 2
-            return path
-        path = 1
-        if np.any(
-            np.greater(
-                (velocity + self.position),
-                np.array([game_map.width - 1, game_map.height - 1]),
-            )
-        ) or np.any(np.less((self.position + velocity), np.array([0, 0]))):
-            path = 2
-            return path
-        path_tile = game_map.get_tile_list_type(
-            self.get_walk_coordinates(velocity), 2**self.number
-        )
-        if sum(path_tile) > 0:
-            for elem in path_tile:
-                if elem == TileState.WIN.value:
-                    path = 3
-                elif not elem == 0:
-                    path = 2
-                    break
-        return path
+            return rules.PATH_CRASH
+        return rules.path_outcome(game_map.terrain, game_map.occupancy, self.position, velocity, 2**self.number)
 
     def is_out(self):
         """Used to put the player in the "IS_OUT" state to return the type more easily."""
-        self.position = np.array([-1, -1])
-        self.speed = np.array([0, 0])
+        self.position = -1
+        self.speed = 0
 
     def state_check(self, game_map: GameMap):
         """Checks a player's state to know if he can play, is out or has won.
@@ -190,41 +276,24 @@ class Player:
         if np.any(self.position < 0):
             self.is_out()
             return PlayerState.IS_OUT
-        if game_map.map[self.position[0], self.position[1]] == TileState.WIN.value:
+        if game_map.tile(self.position[0], self.position[1]) == TileState.WIN.value:
             return PlayerState.HAS_WON
         return PlayerState.CAN_PLAY
 
     def get_walk_coordinates(self, velocity=None):
         """Used to determine which tiles the player is going to go over on his next move.
 
-        :return: a tuple of tuples of indexes with the coordinates on the map of the tiles that will be walked on.
+        :return: a tuple of two arrays with the x and y coordinates on the map of the tiles that will be walked on.
         """
         if velocity is None:
             velocity = self.speed.copy()
-        max_len = np.absolute(velocity).max()
-        if max_len == 0:
-            return (self.position[0],), (self.position[1],)
-        return self.transform_to_tuples_positions(
-            np.array([(velocity / max_len * i).astype(int) for i in range(max_len + 1)])
-        )
-
-    def transform_to_tuples_positions(self, array: np.array):
-        """Used to transform an array containing arrays of coordinates to a tuple of tuples of indexes.
-
-        Parameters
-        ----------
-        array: np.array
-            the array containing the coordinates array.
-
-        :return: a tuple of tuples for coordinates.
-        """
-        for x in array:
-            x += self.position
-        return tuple([tuple(elem) for elem in array.T])
+        return rules.walk_coordinates(self.position, velocity)
 
     def collision_speed_check(self, game_map: GameMap, acceleration: np.array, help: bool):
         """Used to know if the player can make a specific move or not (the speed being the desired change
-        in the player's speed) without being automatically being out of the game.
+        in the player's speed) without being automatically being out of the game: the move is unsafe if it crashes,
+        or if it lands in a state from which he will crash into the terrain whatever he does (see
+        GameMap.viability_table).
 
         Parameters
         ----------
@@ -236,20 +305,34 @@ class Player:
         :return: True if the movement will lead to lose, False if the path is safe.
         """
         if help:
-            x = int(self.speed[0] + acceleration[0])
-            y = int(self.speed[1] + acceleration[1])
-            x_interval = round((x**2 + abs(x)) / 2)
-            y_interval = round((y**2 + abs(y)) / 2)
-            path1 = self.path_checking(
-                game_map, np.array([np.sign(x) * x_interval, np.sign(y) * y_interval])
-            )
-            path2 = self.path_checking(game_map, np.array([x, y]))
-            if self.position[0] + x_interval < 0 or self.position[1] + y_interval < 0:
-                return True
-            if path1 == 2 or path2 == 2:
+            velocity = self.speed + acceleration
+            if self.path_checking(game_map, velocity) == rules.PATH_CRASH:
                 return True
+            return not game_map.viability_table().viable(self.position + velocity, velocity)[0]
         return False
 
+    def evaluate_accelerations(self, game_map: GameMap, help: bool):
+        """Used to evaluate the nine accelerations (in the order of rules.accelerations) in a single pass, instead of
+        calling path_checking and collision_speed_check for each of them.
+
+        Parameters
+        ----------
+        game_map: GameMap
+            the map on which the player is evolving.
+        help: bool
+            whether the collision help is enabled, no move being considered unsafe otherwise.
+
+        :return: the array of path_checking results of each move, and the array of collision_speed_check results.
+        """
+        if self.state_check(game_map) == PlayerState.IS_OUT:
+            outcomes = np.full(len(rules.accelerations), rules.PATH_CRASH)
+            return outcomes, np.full(len(rules.accelerations), help)
+        outcomes, unsafe = rules.evaluate_moves(
+            game_map.terrain, game_map.occupancy, self.position, self.speed, 2**self.number,
+            viability=game_map.viability_table()
+        )
+        return outcomes, unsafe & help
+
     def movement_validity(self):
         """Used to know if the player has made a valid move in his turn, in order not to skip his turn completely.
 
@@ -257,7 +340,7 @@ class Player:
         """
         return self.has_played
 
-    def draw(self, window: pygame.display, tile_size: int, turn: int):
+    def draw(self, window: pygame.display, tile_size: int, turn: int, offset=(0, 0)):
         """A method used to draw the player's car image, rotating according to his direction, as well as the tile
         he would land on in his next move if he keeps the same speed.
 
@@ -272,43 +355,78 @@ class Player:
 
         turn: int
             the current turn of the game, to know if it's this player's turn to play or not
+
+        offset: tuple (optional)
+            the coordinates, in pixels of the whole map, of the top left corner of the window (see Camera.offset)
+
+        :return: the list of rectangles of the window that have been drawn on.
         """
-        if self.scaled_texture is None:
-            self.scaled_texture = pygame.transform.scale(
-                self.texture, (tile_size, tile_size)
-            )
-        if self.displayed_texture is None:
-            self.displayed_texture = self.scaled_texture
-        if self.speed[1] == 0:
-            angle = 180 + (90 * np.sign(self.speed[0]))
-        elif self.speed[1] > 0:
-            angle = 180 + math.degrees(math.atan(self.speed[0] / self.speed[1]))
-        else:
-            angle = math.degrees(math.atan(self.speed[0] / self.speed[1]))
-        self.displayed_texture = pygame.transform.rotate(self.scaled_texture, angle)
-
-        pygame.draw.rect(
+        offset_x, offset_y = offset
+        if self.texture is None:
+            self.texture = assets.registry.image("car")
+        if self.name_display is None:
+            self.name_display = assets.registry.font().render(self.name, False, pygame.color.Color("#e0e0e0"))
+        self.displayed_texture = sprites.sprite_cache.get(self.texture, self.speed, tile_size)
+
+        rects = [pygame.draw.rect(
             window,
             (80, 28, 28 * self.number),
             (
-                (self.speed[0] + self.position[0]) * tile_size + tile_size / 4,
-                (self.speed[1] + self.position[1]) * tile_size + tile_size / 4,
+                (self.speed[0] + self.position[0]) * tile_size + tile_size / 4 - offset_x,
+                (self.speed[1] + self.position[1]) * tile_size + tile_size / 4 - offset_y,
                 tile_size / 2,
                 tile_size / 2,
             ),
-        )
+        )]
         path = self.get_walk_coordinates()
 
         if turn == self.number:
-            self.draw_arrow(window, tile_size)
+            rects.append(self.draw_arrow(window, tile_size, offset))
             for a in range(len(path[0])):
-                pygame.draw.rect(window, (80, 28, 28 * self.number), (
-                (path[0][a] * tile_size) + 3 / 8 * tile_size, path[1][a] * tile_size + 3 / 8 * tile_size, tile_size / 4,
-                tile_size / 4))
-        window.blit(self.name_display, ((self.position[0] + 1) * tile_size, self.position[1] * tile_size))
-        window.blit(self.displayed_texture, (self.position * tile_size))
+                rects.append(pygame.draw.rect(window, (80, 28, 28 * self.number), (
+                (path[0][a] * tile_size) + 3 / 8 * tile_size - offset_x,
+                path[1][a] * tile_size + 3 / 8 * tile_size - offset_y, tile_size / 4, tile_size / 4)))
+        rects.append(window.blit(
+            self.name_display, ((self.position[0] + 1) * tile_size - offset_x, self.position[1] * tile_size - offset_y)
+        ))
+        rects.append(window.blit(
+            self.displayed_texture, (self.position[0] * tile_size - offset_x, self.position[1] * tile_size - offset_y)
+        ))
+        return rects
+
+    def draw_move_safety(self, window: pygame.display, tile_size: int, unsafe: np.ndarray, offset=(0, 0)):
+        """Used to outline the tiles the player would land on with each of the nine accelerations, in red if the move
+        is unsafe and in green otherwise.
+
+        Parameters
+        ----------
+
+        window: pygame.display
+            the window on which the game is displayed
 
-    def draw_arrow(self, window, tile_size: int):
+        tile_size: int
+            the size of a tile on the window
+
+        unsafe: np.array
+            for each acceleration of rules.accelerations, True if the move is unsafe (see evaluate_accelerations).
+
+        offset: tuple (optional)
+            the coordinates, in pixels of the whole map, of the top left corner of the window (see Camera.offset)
+
+        :return: the list of rectangles of the window that have been drawn on.
+        """
+        offset_x, offset_y = offset
+        rects = []
+        for landing, danger in zip(self.position + self.speed + rules.accelerations, unsafe):
+            rects.append(pygame.draw.rect(
+                window,
+                (200, 50, 50) if danger else (50, 200, 50),
+                (landing[0] * tile_size + 2 - offset_x, landing[1] * tile_size + 2 - offset_y, tile_size - 4, tile_size - 4),
+                2,
+            ))
+        return rects
+
+    def draw_arrow(self, window, tile_size: int, offset=(0, 0)):
         """Used to draw a small square under the player if it's his turn.
 
         Parameters
@@ -319,10 +437,17 @@ class Player:
 
         tile_size: int
             the size of a tile on the window
+
+        offset: tuple (optional)
+            the coordinates, in pixels of the whole map, of the top left corner of the window (see Camera.offset)
+
+        :return: the rectangle of the window that has been drawn on.
         """
-        pygame.draw.circle(
+        return pygame.draw.circle(
             window,
-            (145, 224, 255), (((self.position[0] + 1/2) * tile_size), ((self.position[1] + 1/2) * tile_size)), tile_size/3)
+            (145, 224, 255),
+            (((self.position[0] + 1/2) * tile_size - offset[0]), ((self.position[1] + 1/2) * tile_size - offset[1])),
+            tile_size/3)
 
     def can_play(self):
         """Used to change the player's attribute 'has_played' to False"""
@@ -0,0 +1,226 @@
+from collections import deque
+import json
+import os
+import time
+import numpy as np
+
+
+class NullPhase:
+    """The phase returned by a disabled profiler, doing nothing at all."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        return False
+
+
+null_phase = NullPhase()
+
+
+class Phase:
+    """A timed phase of a frame, recorded in its profiler when it ends.
+
+    Attributes
+    ----------
+    profiler: FrameProfiler
+        the profiler the phase is recorded in.
+    name: str
+        the name of the phase.
+    start: float
+        the time (from time.perf_counter) at which the phase started.
+    """
+
+    def __init__(self, profiler, name: str):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exception):
+        self.profiler.record(self.name, self.start, time.perf_counter())
+        return False
+
+
+class FrameProfiler:
+    """A class timing the phases of the game loop (rendering, inputs, end of turn checks...). The last durations of
+    each phase are kept in a ring buffer to get rolling percentiles, and every phase is kept as a trace event that can
+    be saved in the Chrome trace format (chrome://tracing, Perfetto). A disabled profiler costs close to nothing: its
+    phases don't read the clock nor record anything.
+
+    Attributes
+    ----------
+    enabled: bool
+        whether the phases are timed.
+    capacity: int
+        the number of durations kept for each phase.
+    durations: dict
+        for each phase, the ring buffer of its last durations (in seconds).
+    counts: dict
+        for each phase, the number of durations recorded.
+    events: deque
+        the last trace events recorded, as (name, start, end) tuples.
+    origin: float
+        the time (from time.perf_counter) the trace events are relative to.
+
+    Methods
+    -------
+    phase(name)
+        Used to time a phase, as a context manager.
+
+    record(name, start, end)
+        Used to record the duration of a phase.
+
+    percentiles(name, quantiles)
+        Used to get the rolling percentiles of the durations of a phase.
+
+    summary()
+        Used to get the rolling percentiles of every phase.
+
+    draw_overlay(window, fps)
+        Used to draw the frame rate and the time spent in each phase on the window.
+
+    dump(path)
+        Used to save the trace events in the Chrome trace format.
+    """
+
+    def __init__(self, enabled: bool = False, capacity: int = 240, max_events: int = 100000):
+        """
+        Parameters
+        ----------
+        enabled: bool (optional)
+            whether the phases are timed from the start, defaulting to False.
+        capacity: int (optional)
+            the number of durations kept for each phase, defaulting to 240 (4 seconds at 60 frames per second).
+        max_events: int (optional)
+            the highest number of trace events kept, the oldest ones being dropped.
+        """
+        self.enabled = enabled
+        self.capacity = capacity
+        self.durations = {}
+        self.counts = {}
+        self.events = deque(maxlen=max_events)
+        self.origin = time.perf_counter()
+
+    def phase(self, name: str):
+        """Used to time a phase: `with profiler.phase("render"): ...`.
+
+        Parameters
+        ----------
+        name: str
+            the name of the phase.
+
+        :return: the context manager timing the phase.
+        """
+        if not self.enabled:
+            return null_phase
+        return Phase(self, name)
+
+    def record(self, name: str, start: float, end: float):
+        """Used to record the duration of a phase.
+
+        Parameters
+        ----------
+        name: str
+            the name of the phase.
+        start, end: float
+            the times (from time.perf_counter) at which the phase started and ended.
+        """
+        if name not in self.durations:
+            self.durations[name] = np.zeros(self.capacity)
+            self.counts[name] = 0
+        self.durations[name][self.counts[name] % self.capacity] = end - start
+        self.counts[name] += 1
+        self.events.append((name, start, end))
+
+    def percentiles(self, name: str, quantiles=(50, 95, 99)):
+        """Used to get the rolling percentiles of the durations of a phase, over the last durations kept.
+
+        Parameters
+        ----------
+        name: str
+            the name of the phase.
+        quantiles: tuple (optional)
+            the percentiles to get, defaulting to the 50th, 95th and 99th.
+
+        :return: an array with each percentile in milliseconds, or None if the phase was never recorded.
+        """
+        if not self.counts.get(name):
+            return None
+        durations = self.durations[name][:min(self.counts[name], self.capacity)]
+        return np.percentile(durations, quantiles) * 1000
+
+    def summary(self):
+        """Used to get the rolling 50th, 95th and 99th percentiles of every phase.
+
+        :return: a dictionary with, for each phase, its percentiles in milliseconds and its number of durations.
+        """
+        return {
+            name: {
+                "p50_ms": round(float(p50), 3),
+                "p95_ms": round(float(p95), 3),
+                "p99_ms": round(float(p99), 3),
+                "count": self.counts[name],
+            }
+            for name in self.durations
+            for p50, p95, p99 in [self.percentiles(name)]
+        }
+
+    def draw_overlay(self, window, fps: float):
+        """Used to draw the frame rate and the 50th and 95th percentiles of each phase in the bottom left corner of
+        the window.
+
+        Parameters
+        ----------
+        window: pygame.display
+            the window on which the game is displayed.
+        fps: float
+            the current frame rate.
+
+        :return: the rectangle of the window that has been drawn on.
+        """
+        import pygame
+        import assets
+
+        font = assets.registry.font(20)
+        lines = ["FPS " + str(round(fps, 1))]
+        for name in sorted(self.durations):
+            p50, p95 = self.percentiles(name, (50, 95))
+            lines.append(name + ": " + str(round(p50, 2)) + "ms / p95 " + str(round(p95, 2)) + "ms")
+        line_height = font.get_linesize()
+        width = max(font.size(line)[0] for line in lines) + 12
+        height = line_height * len(lines) + 8
+        overlay = pygame.Surface((width, height), pygame.SRCALPHA)
+        overlay.fill((0, 0, 0, 170))
+        for index, line in enumerate(lines):
+            overlay.blit(font.render(line, True, (230, 230, 230)), (6, 4 + index * line_height))
+        return window.blit(overlay, (0, window.get_height() - height))
+
+    def dump(self, path: str):
+        """Used to save the trace events in the Chrome trace format, which can be opened in chrome://tracing or
+        Perfetto.
+
+        Parameters
+        ----------
+        path: str
+            the path of the JSON file to write.
+
+        :return: the number of events written.
+        """
+        events = [
+            {
+                "name": name,
+                "ph": "X",
+                "ts": round((start - self.origin) * 1e6, 3),
+                "dur": round((end - start) * 1e6, 3),
+                "pid": os.getpid(),
+                "tid": 0,
+            }
+            for name, start, end in self.events
+        ]
+        with open(path, "w") as file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
+        return len(events)
@@ -0,0 +1,156 @@
+from enum import Enum
+import asyncio
+import struct
+
+default_port = 5555
+"""The TCP port the game server listens on by default."""
+
+FRAME_HEADER = struct.Struct("<HB")
+"""size of the payload and type of a message."""
+JOIN = struct.Struct("<BB")
+"""map number and number of players of the game a client wants to join, followed by his name in UTF-8."""
+MOVE = struct.Struct("<IB")
+"""number of the move the player answers to and index of his acceleration in rules.accelerations."""
+START = struct.Struct("<IBBB")
+"""number of the game, number of the player receiving it, map number and number of players, followed by the starting
+position of each player (START_PLAYER) and his name."""
+START_PLAYER = struct.Struct("<hhB")
+"""starting position of a player and size of his name."""
+TURN = struct.Struct("<IB")
+"""number of the move and number of the player who has to play it."""
+DELTA = struct.Struct("<IBBB4h")
+"""number of the move, number of the player, index of his acceleration (simulation.RETIRE if he was taken out), his
+PlayerState value, position and speed after the move."""
+REJECT = struct.Struct("<IB")
+"""number of the move and Reason of the refusal."""
+END = struct.Struct("<B")
+"""number of players in the ranking, followed by their numbers from the first to the last."""
+
+
+max_payload = 4096
+"""The largest payload a message can have, the longest being a START message with 8 players and their names."""
+
+
+class Message(Enum):
+    """Defines the type of a message exchanged between the server and its clients.
+
+    Arguments
+    ---------
+    1: JOIN
+        a client asks to join a game (client to server).
+    2: MOVE
+        a player chooses his acceleration (client to server).
+    16: START
+        the game is full and starts (server to client).
+    17: TURN
+        a player has to play (server to clients).
+    18: DELTA
+        what changed after a move (server to clients).
+    19: REJECT
+        the move of the player was refused, he has to choose another one (server to client).
+    20: END
+        the game is over (server to clients).
+    """
+
+    JOIN = 1
+    MOVE = 2
+    START = 16
+    TURN = 17
+    DELTA = 18
+    REJECT = 19
+    END = 20
+
+
+class Reason(Enum):
+    """Defines why a move was refused by the server.
+
+    Arguments
+    ---------
+    1: NOT_YOUR_TURN
+        it isn't the turn of the player, or the move answers to an earlier turn.
+    2: UNKNOWN_ACTION
+        the acceleration isn't one of rules.accelerations.
+    3: UNSAFE
+        the move is unsafe (see Player.collision_speed_check).
+    """
+
+    NOT_YOUR_TURN = 1
+    UNKNOWN_ACTION = 2
+    UNSAFE = 3
+
+
+payload_sizes = {
+    Message.JOIN: (JOIN.size, max_payload),
+    Message.MOVE: (MOVE.size, MOVE.size),
+    Message.START: (START.size, max_payload),
+    Message.TURN: (TURN.size, TURN.size),
+    Message.DELTA: (DELTA.size, DELTA.size),
+    Message.REJECT: (REJECT.size, REJECT.size),
+    Message.END: (END.size, END.size + 8),
+}
+"""The smallest and largest size of the payload of each type of message."""
+
+
+def frame(message: Message, payload: bytes = b""):
+    """Used to build the bytes of a message: its header (size of the payload and type) then its payload."""
+    return FRAME_HEADER.pack(len(payload), message.value) + payload
+
+
+async def read_frame(reader: asyncio.StreamReader):
+    """Used to read the next message sent on a connection. A message of an unknown type, or whose payload is too short
+    or too long for its type, can't be understood, and the rest of the stream neither.
+
+    :return: the Message and its payload, or (None, b"") if the connection was closed or the message is invalid.
+    """
+    try:
+        header = await reader.readexactly(FRAME_HEADER.size)
+        size, message = FRAME_HEADER.unpack(header)
+        message = Message(message)
+        smallest, largest = payload_sizes[message]
+        if not smallest <= size <= largest:
+            return None, b""
+        return message, await reader.readexactly(size)
+    except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+        return None, b""
+
+
+def encode_start(game_id: int, player: int, map_number: int, positions, names):
+    """Used to build the payload of a START message.
+
+    Parameters
+    ----------
+    game_id: int
+        the number of the game on the server.
+    player: int
+        the number of the player receiving the message.
+    map_number: int
+        the number of the map.
+    positions: list
+        the starting position of each player.
+    names: list
+        the name of each player.
+    """
+    payload = bytearray(START.pack(game_id, player, map_number, len(names)))
+    for position, name in zip(positions, names):
+        name = name.encode()[:255]
+        payload += START_PLAYER.pack(int(position[0]), int(position[1]), len(name)) + name
+    return bytes(payload)
+
+
+def decode_start(payload: bytes):
+    """Used to read the payload of a START message.
+
+    :return: the number of the game, the number of the player receiving it, the map number, the list of the starting
+    positions and the list of the names of the players.
+    """
+    game_id, player, map_number, player_count = START.unpack_from(payload)
+    offset = START.size
+    positions = []
+    names = []
+    for _ in range(player_count):
+        x, y, size = START_PLAYER.unpack_from(payload, offset)
+        offset += START_PLAYER.size
+        positions.append((x, y))
+        names.append(payload[offset:offset + size].decode(errors="replace"))
+        offset += size
+    return game_id, player, map_number, positions, names
@@ -0,0 +1,212 @@
+import numpy as np
+import rules
+from game_map import GameMap
+from rules import accelerations
+
+
+class RaceSolver:
+    """A class used to find the minimum number of turns needed to go from a starting position to the finish line,
+    following the same physics as the players (speed += acceleration, position += speed).
+
+    The search is a breadth-first search over the (x, y, vx, vy) states of a car, where every turn the whole frontier
+    is expanded at once with NumPy arrays. Each transition is validated with the same swept-tile rule as
+    Player.path_checking, using only the static tiles (walls and finish line) of the map.
+
+    Attributes
+    ----------
+    game_map: GameMap
+        the map on which the race takes place.
+    max_speed_x: int
+        the highest speed a car can reach on the x axis during the current search without going out of the map.
+    max_speed_y: int
+        the highest speed a car can reach on the y axis during the current search without going out of the map.
+
+    Methods
+    -------
+    encode(x, y, speed_x, speed_y)
+        Used to transform states into their index in the state space.
+
+    decode(states)
+        Used to transform state indexes back into positions and speeds.
+
+    swept_crash(x, y, speed_x, speed_y)
+        Used to know, for a batch of moves, which ones go on/over a tile that can't be run on.
+
+    speed_limit(start_speed, length)
+        Used to know the highest speed a car can reach on an axis of a given length.
+
+    solve(start, speed)
+        Used to get the shortest sequence of accelerations leading from a start to the finish line.
+    """
+
+    def __init__(self, game_map: GameMap):
+        """
+        Parameters
+        ----------
+        game_map: GameMap
+            the map on which the race takes place.
+        """
+        self.game_map = game_map
+        self.max_speed_x = 0
+        self.max_speed_y = 0
+        self.span_x = 1
+        self.span_y = 1
+        self.blocked = (game_map.terrain & rules.TERRAIN_BLOCKING) != 0
+        self.win = game_map.terrain == rules.TERRAIN_WIN
+
+    @staticmethod
+    def speed_limit(start_speed: int, length: int):
+        """Used to know the highest speed a car can reach on an axis of a given length.
+
+        Since the speed changes by at most 1 each turn, going from a speed s to a speed v > s moves the car by at
+        least s + 1 + ... + v tiles, which can't be more than the length of the axis.
+
+        Parameters
+        ----------
+        start_speed: int
+            the speed of the car on this axis at the beginning of the search.
+        length: int
+            the number of tiles of the map on this axis.
+
+        :return: the highest absolute speed the car can have on this axis.
+        """
+        speed = abs(start_speed)
+        distance = 0
+        while distance + speed + 1 <= length - 1:
+            speed += 1
+            distance += speed
+        return speed
+
+    def encode(self, x, y, speed_x, speed_y):
+        """Used to transform states into their index in the state space.
+
+        Parameters
+        ----------
+        x, y: np.array
+            the positions of the cars.
+        speed_x, speed_y: np.array
+            the speeds of the cars.
+
+        :return: an array with the index of each state.
+        """
+        cell = x * self.game_map.height + y
+        return (cell * self.span_x + speed_x + self.max_speed_x) * self.span_y + speed_y + self.max_speed_y
+
+    def decode(self, states: np.ndarray):
+        """Used to transform state indexes back into positions and speeds.
+
+        Parameters
+        ----------
+        states: np.array
+            the indexes of the states.
+
+        :return: a tuple with the x, y, speed_x and speed_y arrays.
+        """
+        cell, speed_y = np.divmod(states, self.span_y)
+        cell, speed_x = np.divmod(cell, self.span_x)
+        x, y = np.divmod(cell, self.game_map.height)
+        return x, y, speed_x - self.max_speed_x, speed_y - self.max_speed_y
+
+    def swept_crash(self, x, y, speed_x, speed_y):
+        """Used to know, for a batch of moves, which ones go on/over a tile that can't be run on.
+
+        The tiles walked on are taken from rules.walk_table, as in Player.get_walk_coordinates, every move being
+        padded to the length of the longest one by repeating its last tile.
+
+        Parameters
+        ----------
+        x, y: np.array
+            the positions the cars start from.
+        speed_x, speed_y: np.array
+            the speeds of the cars for this move, all landing inside the map.
+
+        :return: an array of booleans, True if the move leads to a crash.
+        """
+        walks = rules.walk_table.padded(np.stack([speed_x, speed_y], axis=-1))
+        return self.blocked[x[:, None] + walks[..., 0], y[:, None] + walks[..., 1]].any(axis=1)
+
+    def solve(self, start, speed=(0, 0)):
+        """Used to get the shortest sequence of accelerations leading from a start to the finish line.
+
+        Parameters
+        ----------
+        start: np.array([,])
+            the position the car starts from.
+        speed: np.array([,]) (optional)
+            the speed the car starts with, defaulting to [0, 0].
+
+        :return: a list of accelerations (taken from rules.accelerations) to apply on each turn, or None if the
+        finish line cannot be reached.
+        """
+        start_x, start_y = int(start[0]), int(start[1])
+        if self.win[start_x, start_y]:
+            return []
+        self.max_speed_x = self.speed_limit(int(speed[0]), self.game_map.width)
+        self.max_speed_y = self.speed_limit(int(speed[1]), self.game_map.height)
+        self.span_x = 2 * self.max_speed_x + 1
+        self.span_y = 2 * self.max_speed_y + 1
+        state_count = self.game_map.width * self.game_map.height * self.span_x * self.span_y
+        parent = np.full(state_count, -1, dtype=np.int32)
+        move = np.zeros(state_count, dtype=np.uint8)
+        start_state = self.encode(start_x, start_y, int(speed[0]), int(speed[1]))
+        parent[start_state] = start_state
+        frontier = np.array([start_state])
+
+        while len(frontier) > 0:
+            x, y, speed_x, speed_y = self.decode(frontier)
+            source = np.repeat(frontier, len(accelerations))
+            move_index = np.tile(np.arange(len(accelerations)), len(frontier))
+            speed_x = np.repeat(speed_x, len(accelerations)) + accelerations[move_index, 0]
+            speed_y = np.repeat(speed_y, len(accelerations)) + accelerations[move_index, 1]
+            x = np.repeat(x, len(accelerations))
+            y = np.repeat(y, len(accelerations))
+            new_x = x + speed_x
+            new_y = y + speed_y
+
+            inside = (
+                (new_x >= 0)
+                & (new_x < self.game_map.width)
+                & (new_y >= 0)
+                & (new_y < self.game_map.height)
+                & (np.absolute(speed_x) <= self.max_speed_x)
+                & (np.absolute(speed_y) <= self.max_speed_y)
+            )
+            source, move_index = source[inside], move_index[inside]
+            x, y, speed_x, speed_y = x[inside], y[inside], speed_x[inside], speed_y[inside]
+            new_x, new_y = new_x[inside], new_y[inside]
+
+            clear = ~self.swept_crash(x, y, speed_x, speed_y)
+            source, move_index = source[clear], move_index[clear]
+            speed_x, speed_y = speed_x[clear], speed_y[clear]
+            new_x, new_y = new_x[clear], new_y[clear]
+
+            winning = np.flatnonzero(self.win[new_x, new_y])
+            if len(winning) > 0:
+                path = [move_index[winning[0]]]
+                state = source[winning[0]]
+                while parent[state] != state:
+                    path.append(move[state])
+                    state = parent[state]
+                return [accelerations[index].copy() for index in reversed(path)]
+
+            states = self.encode(new_x, new_y, speed_x, speed_y)
+            unseen = parent[states] == -1
+            states, first = np.unique(states[unseen], return_index=True)
+            parent[states] = source[unseen][first]
+            move[states] = move_index[unseen][first]
+            frontier = states
+        return None
+
+
+def solve_map(map_number: int):
+    """Used to find the shortest race from every starting position of a map.
+
+    Parameters
+    ----------
+    map_number: int
+        the number of the map (and of its starting positions).
+
+    :return: a list with, for each starting position, the list of accelerations to apply on each turn.
+    """
+    solver = RaceSolver(GameMap("maps/map" + str(map_number) + ".csv"))
+    return [solver.solve(start) for start in solver.game_map.start_grid]
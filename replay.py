@@ -0,0 +1,352 @@
+import argparse
+import os
+import struct
+import sys
+import time
+import numpy as np
+import rules
+import simulation
+
+MAGIC = b"CARLOG"
+VERSION = 2
+HEADER = struct.Struct("<6sBBBxHI")
+"""magic, version, map number, number of players, keyframe interval and number of moves."""
+KEYFRAME_HEADER = struct.Struct("<II")
+"""number of the move the keyframe is taken before and size of the keyframe."""
+
+REPLAY_SUFFIX = ".carlog"
+
+keyframe_interval = 32
+"""The number of moves between two keyframes of a replay file."""
+
+
+def encode_move(player: int, action: int):
+    """Used to store a move in a single byte, the number of the player in the 4 high bits and the index of his
+    acceleration in rules.accelerations (or simulation.RETIRE) in the 4 low bits."""
+    return (player << 4) | action
+
+
+def decode_move(move: int):
+    """Used to get the number of the player and the index of the acceleration of a move stored by encode_move."""
+    return move >> 4, move & 0x0F
+
+
+def action_index(acceleration):
+    """Used to get the index of an acceleration in rules.accelerations.
+
+    Parameters
+    ----------
+    acceleration: np.array([,])
+        the acceleration, one of the values of constants.default_inputs.
+    """
+    return int(np.flatnonzero((rules.accelerations == np.asarray(acceleration)).all(axis=1))[0])
+
+
+class MoveLog:
+    """A class recording the moves of a game, in the order they were played, so that the game can be replayed.
+
+    Attributes
+    ----------
+    map_number: int
+        the number of the map the game is played on.
+    starts: np.array((player_count, 2))
+        the starting position of each player.
+    moves: bytearray
+        the moves played, one byte each (see encode_move).
+
+    Methods
+    -------
+    record(player, action)
+        Used to add a move to the log.
+
+    to_bytes(terrain)
+        Used to store the log, with keyframes of the game every keyframe_interval moves.
+
+    save(path, terrain)
+        Used to write the log to a file.
+    """
+
+    def __init__(self, map_number: int, starts, moves: bytes = b""):
+        """
+        Parameters
+        ----------
+        map_number: int
+            the number of the map the game is played on.
+        starts: np.array((player_count, 2))
+            the starting position of each player.
+        moves: bytes (optional)
+            the moves already played.
+        """
+        self.map_number = map_number
+        self.starts = np.array(starts, dtype=np.int64).reshape(-1, 2)
+        self.moves = bytearray(moves)
+
+    def __len__(self):
+        return len(self.moves)
+
+    def record(self, player: int, action: int):
+        """Used to add a move to the log.
+
+        Parameters
+        ----------
+        player: int
+            the number of the player who played.
+        action: int
+            the index of his acceleration in rules.accelerations, or simulation.RETIRE if he was taken out of the
+            game.
+        """
+        self.moves.append(encode_move(player, action))
+
+    def to_bytes(self, terrain: np.ndarray = None, interval: int = keyframe_interval):
+        """Used to store the log: a header, the starting positions, the moves, then a keyframe of the game every
+        interval moves, computed by replaying the game.
+
+        Parameters
+        ----------
+        terrain: np.array((width, height)) (optional)
+            the terrain of the map, loaded from the map number if None.
+        interval: int (optional)
+            the number of moves between two keyframes.
+
+        :return: the bytes of the log.
+        """
+        data = bytearray(HEADER.pack(MAGIC, VERSION, self.map_number, len(self.starts), interval, len(self.moves)))
+        data += self.starts.astype("<u2").tobytes()
+        data += self.moves
+        keyframes = Replay(self, terrain, interval).build_keyframes()[1:]
+        data += struct.pack("<I", len(keyframes))
+        for index, state in enumerate(keyframes, 1):
+            keyframe = state.to_bytes()
+            data += KEYFRAME_HEADER.pack(index * interval, len(keyframe))
+            data += keyframe
+        return bytes(data)
+
+    def save(self, path: str, terrain: np.ndarray = None):
+        """Used to write the log to a file (see to_bytes).
+
+        Parameters
+        ----------
+        path: str
+            the path of the file.
+        terrain: np.array((width, height)) (optional)
+            the terrain of the map, loaded from the map number if None.
+        """
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with open(path, "wb") as file:
+            file.write(self.to_bytes(terrain))
+
+
+def from_bytes(data: bytes, terrain: np.ndarray = None):
+    """Used to read a log stored by MoveLog.to_bytes, along with its keyframes.
+
+    Parameters
+    ----------
+    data: bytes
+        the bytes of the log.
+    terrain: np.array((width, height)) (optional)
+        the terrain of the map, loaded from the map number if None.
+
+    :return: the Replay of the log, its keyframes already loaded.
+    """
+    magic, version, map_number, player_count, interval, move_count = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a move log of this version of the game")
+    offset = HEADER.size
+    starts = np.frombuffer(data, dtype="<u2", count=2 * player_count, offset=offset).reshape(-1, 2)
+    offset += starts.nbytes
+    replay = Replay(MoveLog(map_number, starts, data[offset:offset + move_count]), terrain, interval)
+    offset += move_count
+    (keyframe_count,) = struct.unpack_from("<I", data, offset)
+    offset += 4
+    for _ in range(keyframe_count):
+        move, size = KEYFRAME_HEADER.unpack_from(data, offset)
+        offset += KEYFRAME_HEADER.size
+        replay.keyframes[move // interval] = simulation.RaceState.from_bytes(
+            data[offset:offset + size], replay.terrain
+        )
+        offset += size
+    return replay
+
+
+def load(path: str, terrain: np.ndarray = None):
+    """Used to read a log from a file, written by MoveLog.save.
+
+    :return: the Replay of the log.
+    """
+    with open(path, "rb") as file:
+        return from_bytes(file.read(), terrain)
+
+
+class Replay:
+    """A class computing the states of a recorded game headlessly, with the simulation. A keyframe of the game is
+    kept every interval moves, so that the state after any move is found from the closest keyframe in at most
+    interval steps.
+
+    Attributes
+    ----------
+    log: MoveLog
+        the moves of the game.
+    terrain: np.array((width, height))
+        the read-only terrain of the map.
+    interval: int
+        the number of moves between two keyframes.
+    keyframes: dict
+        the states known before every interval-th move, by index (the state before move index * interval).
+
+    Methods
+    -------
+    build_keyframes()
+        Used to replay the whole game, keeping every keyframe.
+
+    state_at(move)
+        Used to get the state of the game once a number of moves have been played.
+
+    final_state()
+        Used to get the state of the game at the end of the log.
+
+    events()
+        Used to replay the whole game, getting what happened on each move.
+    """
+
+    def __init__(self, log: MoveLog, terrain: np.ndarray = None, interval: int = keyframe_interval):
+        """
+        Parameters
+        ----------
+        log: MoveLog
+            the moves of the game.
+        terrain: np.array((width, height)) (optional)
+            the terrain of the map, loaded from the map number of the log if None.
+        interval: int (optional)
+            the number of moves between two keyframes.
+        """
+        if terrain is None:
+            from game_map import GameMap
+
+            terrain = GameMap("maps/map" + str(log.map_number) + ".csv").terrain
+        self.log = log
+        self.interval = interval
+        first = simulation.new_state(terrain, log.starts)
+        self.terrain = first.terrain
+        self.keyframes = {0: first}
+
+    def __len__(self):
+        return len(self.log)
+
+    def step(self, state: simulation.RaceState, move: int):
+        """Used to apply a move of the log to a state.
+
+        :return: the new RaceState and the Event of the move.
+        """
+        player, action = decode_move(self.log.moves[move])
+        return simulation.apply_move(state, player, action)
+
+    def build_keyframes(self):
+        """Used to replay the whole game, keeping every keyframe.
+
+        :return: the list of the keyframes, the first one being the state before the first move.
+        """
+        state = self.keyframes[0]
+        for move in range(len(self.log)):
+            if move % self.interval == 0:
+                self.keyframes.setdefault(move // self.interval, state)
+            state, _ = self.step(state, move)
+        return [self.keyframes[index] for index in sorted(self.keyframes)]
+
+    def state_at(self, move: int):
+        """Used to get the state of the game once a number of moves have been played, starting from the closest
+        keyframe before it (the keyframes on the way being kept).
+
+        Parameters
+        ----------
+        move: int
+            the number of moves played, from 0 to len(self).
+
+        :return: the RaceState.
+        """
+        if not 0 <= move <= len(self.log):
+            raise IndexError("Move " + str(move) + " is outside of the log")
+        index = move // self.interval
+        while index not in self.keyframes:
+            index -= 1
+        state = self.keyframes[index]
+        for played in range(index * self.interval, move):
+            state, _ = self.step(state, played)
+            if (played + 1) % self.interval == 0:
+                self.keyframes.setdefault((played + 1) // self.interval, state)
+        return state
+
+    def final_state(self):
+        """Used to get the state of the game at the end of the log."""
+        return self.state_at(len(self.log))
+
+    def events(self):
+        """Used to replay the whole game, getting what happened on each move.
+
+        :return: the list of (player number, Event) of every move, the Event being None for the moves of players who
+        were already out.
+        """
+        state = self.keyframes[0]
+        events = []
+        for move in range(len(self.log)):
+            player, _ = decode_move(self.log.moves[move])
+            state, event = self.step(state, move)
+            events.append((player, event))
+        return events
+
+
+def render_state(replay: Replay, state: simulation.RaceState, path: str):
+    """Used to draw a state of a replayed game, as the game would show it, into an image file.
+
+    Parameters
+    ----------
+    replay: Replay
+        the replay the state comes from.
+    state: simulation.RaceState
+        the state to draw.
+    path: str
+        the path of the image file (its extension giving its format, for example .png).
+    """
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import pygame
+    from main import MyGame
+
+    game = MyGame(replay.log.map_number)
+    for number in range(state.player_count):
+        game.game.new_player(number, "Player " + str(number + 1), state.positions[number].copy())
+    game.restore(state)
+    game.render()
+    pygame.image.save(game.window, path)
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Replays a recorded game headlessly.")
+    parser.add_argument("log", help="the replay file, written by the game at the end of each game.")
+    parser.add_argument("--move", type=int, default=None, help="the number of moves to replay (all of them by default).")
+    parser.add_argument("--render", help="an image file to draw the game into, once the moves are replayed.")
+    options = parser.parse_args(arguments)
+
+    log_path = os.path.abspath(options.log)
+    render_path = os.path.abspath(options.render) if options.render else None
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    start = time.perf_counter()
+    replay = load(log_path)
+    loaded = time.perf_counter()
+    move = len(replay) if options.move is None else options.move
+    state = replay.state_at(move)
+    replayed = time.perf_counter()
+    print("Map", replay.log.map_number, "with", replay.log.starts.shape[0], "players,", len(replay), "moves")
+    print("Loaded in", round((loaded - start) * 1000, 3), "ms, state after move", move, "found in",
+          round((replayed - loaded) * 1000, 3), "ms")
+    for number in range(state.player_count):
+        print("Player", number + 1, simulation.PlayerState(int(state.states[number])).name,
+              "at", state.positions[number].tolist(), "speed", state.speeds[number].tolist())
+    if render_path:
+        render_state(replay, state, render_path)
+        print("Drawn into", render_path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,316 @@
+from enum import Enum
+from functools import lru_cache
+import numpy as np
+
+accelerations = np.array([[0, -1], [-1, 0], [0, 1], [1, 0], [1, -1], [1, 1], [-1, 1], [-1, -1], [0, 0]])
+"""The nine accelerations a player can choose from, in the same order as constants.default_inputs (numpad 8, 4, 2, 6,
+9, 3, 1, 7 and 5)."""
+
+PATH_CLEAR = 1
+"""The path is clear."""
+PATH_CRASH = 2
+"""The path leads to a crash (a wall, another player's trace or out of the map)."""
+PATH_WIN = 3
+"""The path goes on/over the finish line without crashing."""
+
+TERRAIN_SHIFT = 8
+"""The terrain layer of a map holds the tile flags shifted by this many bits (TileState.WALL >> 8 = 1)."""
+TERRAIN_WALL = 1
+"""The terrain value of a wall (TileState.WALL)."""
+TERRAIN_WIN = 2
+"""The terrain value of a finish line tile (TileState.WIN)."""
+TERRAIN_BLOCKING = 0xFF & ~TERRAIN_WIN
+"""The terrain bits of the tiles a path can't go on/over (everything but the finish line)."""
+
+
+class PlayerState(Enum):
+    """Defines in which state the player currently is.
+
+    Arguments
+    ---------
+    1: CAN_PLAY
+        if in this state, the player can act normally.
+    2: IS_OUT
+        if in this state, the player has lost and cannot move until the end.
+    3: HAS_WON
+        if in this state, the player will be declared (one of the) winner(s) at the end of the turn.
+    """
+
+    CAN_PLAY = 1
+    IS_OUT = 2
+    HAS_WON = 3
+
+
+class WalkTable:
+    """A class holding the tiles walked on by a move, relative to its starting position, for every integer velocity up
+    to a maximum speed, so that they never have to be computed during the game.
+
+    The i-th tile of a move of velocity v is v * i / n rounded toward zero, n being the largest component of v, which
+    is computed with integers only: the last tile is always exactly the landing tile.
+
+    Attributes
+    ----------
+    max_speed: int
+        the highest speed component the table holds.
+    offsets: np.array((2 * max_speed + 1, 2 * max_speed + 1, max_speed + 1, 2))
+        for each velocity (indexed by vx + max_speed, vy + max_speed), the offsets of the tiles walked on, padded by
+        repeating the landing tile.
+    lengths: np.array((2 * max_speed + 1, 2 * max_speed + 1))
+        for each velocity, the number of tiles walked on.
+
+    Methods
+    -------
+    walk(speed_x, speed_y)
+        Used to get the offsets of the tiles walked on by a move.
+
+    padded(velocities)
+        Used to get the offsets of the tiles walked on by several moves, padded to the same length.
+    """
+
+    def __init__(self, max_speed: int):
+        """
+        Parameters
+        ----------
+        max_speed: int
+            the highest speed component the table holds.
+        """
+        self.max_speed = max_speed
+        speeds = np.arange(-max_speed, max_speed + 1)
+        speed_x, speed_y = np.meshgrid(speeds, speeds, indexing="ij")
+        self.lengths = np.maximum(np.absolute(speed_x), np.absolute(speed_y)) + 1
+        steps = np.minimum(np.arange(max_speed + 1), self.lengths[..., None] - 1)
+        divider = np.maximum(self.lengths - 1, 1)[..., None]
+        self.offsets = np.stack(
+            [
+                np.sign(speed_x)[..., None] * (np.absolute(speed_x)[..., None] * steps // divider),
+                np.sign(speed_y)[..., None] * (np.absolute(speed_y)[..., None] * steps // divider),
+            ],
+            axis=-1,
+        )
+        self.offsets.flags.writeable = False
+
+    def walk(self, speed_x: int, speed_y: int):
+        """Used to get the offsets of the tiles walked on by a move.
+
+        Parameters
+        ----------
+        speed_x, speed_y: int
+            the velocity of the move.
+
+        :return: an array of shape (tile_count, 2) with the offsets of the tiles, starting with [0, 0].
+        """
+        if abs(speed_x) > self.max_speed or abs(speed_y) > self.max_speed:
+            return exact_walk(speed_x, speed_y)
+        x = speed_x + self.max_speed
+        y = speed_y + self.max_speed
+        return self.offsets[x, y, :self.lengths[x, y]]
+
+    def padded(self, velocities: np.ndarray):
+        """Used to get the offsets of the tiles walked on by several moves, padded to the same length by repeating
+        their landing tile.
+
+        Parameters
+        ----------
+        velocities: np.array((move_count, 2))
+            the velocity of each move.
+
+        :return: an array of shape (move_count, tile_count, 2).
+        """
+        velocities = np.asarray(velocities, dtype=int).reshape(-1, 2)
+        length = np.absolute(velocities).max(initial=0) + 1
+        if length <= self.max_speed + 1:
+            return self.offsets[velocities[:, 0] + self.max_speed, velocities[:, 1] + self.max_speed, :length]
+        padded = np.empty((len(velocities), length, 2), dtype=int)
+        for row, (speed_x, speed_y) in enumerate(velocities):
+            walk = self.walk(speed_x, speed_y)
+            padded[row, :len(walk)] = walk
+            padded[row, len(walk):] = walk[-1]
+        return padded
+
+
+@lru_cache(maxsize=1024)
+def exact_walk(speed_x: int, speed_y: int):
+    """Used to get the offsets of the tiles walked on by a move faster than what the walk table holds, with the same
+    integer rule as WalkTable.
+
+    Parameters
+    ----------
+    speed_x, speed_y: int
+        the velocity of the move.
+
+    :return: an array of shape (tile_count, 2) with the offsets of the tiles, starting with [0, 0].
+    """
+    max_len = max(abs(speed_x), abs(speed_y))
+    steps = np.arange(max_len + 1)
+    divider = max(max_len, 1)
+    walk = np.stack(
+        [np.sign(speed_x) * (abs(speed_x) * steps // divider), np.sign(speed_y) * (abs(speed_y) * steps // divider)],
+        axis=-1,
+    )
+    walk.flags.writeable = False
+    return walk
+
+
+walk_table = WalkTable(16)
+"""The walk table used by the game, holding every velocity up to a speed of 16 on each axis."""
+
+
+def set_max_walk_speed(max_speed: int):
+    """Used to change the highest speed held by the walk table, faster moves being computed (and cached) when needed.
+
+    Parameters
+    ----------
+    max_speed: int
+        the highest speed component the table has to hold.
+    """
+    global walk_table
+    walk_table = WalkTable(max_speed)
+
+
+def walk_coordinates(position, velocity):
+    """Used to determine which tiles a player is going to go over when moving from a position with a velocity.
+
+    Parameters
+    ----------
+    position: np.array([,])
+        the position the player starts from.
+    velocity: np.array([,])
+        the speed of the player for this move.
+
+    :return: a tuple of two arrays, the x and y coordinates of the tiles walked on, starting position included.
+    """
+    walk = walk_table.walk(int(velocity[0]), int(velocity[1]))
+    return position[0] + walk[:, 0], position[1] + walk[:, 1]
+
+
+def path_outcome(terrain: np.ndarray, occupancy: np.ndarray, position, velocity, own_value: int):
+    """Used to know if a player can go from his position to the next one with a velocity, without colliding with a
+    player or going on/over a tile that can't be run on.
+
+    Parameters
+    ----------
+    terrain: np.array((width, height))
+        the terrain layer of the map (TERRAIN_WALL, TERRAIN_WIN or 0 for each tile).
+    occupancy: np.array((width, height))
+        the values of the players' traces on each tile, or None to only look at the terrain.
+    position: np.array([,])
+        the position the player starts from.
+    velocity: np.array([,])
+        the speed of the player for this move.
+    own_value: int
+        the value of the player's own trace, which he can go over.
+
+    :return: PATH_CLEAR if the path is clear, PATH_CRASH if the path will lead to a crash and PATH_WIN if the path
+    will lead to a win.
+    """
+    width, height = terrain.shape
+    landing_x = position[0] + velocity[0]
+    landing_y = position[1] + velocity[1]
+    if not (0 <= landing_x <= width - 1 and 0 <= landing_y <= height - 1) or position[0] < 0 or position[1] < 0:
+        return PATH_CRASH
+    walk = walk_coordinates(position, velocity)
+    path_terrain = terrain[walk]
+    if np.any(path_terrain & TERRAIN_BLOCKING):
+        return PATH_CRASH
+    if occupancy is not None and np.any(occupancy[walk] & (~own_value & 0xFF)):
+        return PATH_CRASH
+    if np.any(path_terrain == TERRAIN_WIN):
+        return PATH_WIN
+    return PATH_CLEAR
+
+
+def path_outcomes(terrain: np.ndarray, occupancy: np.ndarray, position, velocities, own_value: int):
+    """Used to know the outcome of several moves starting from the same position at once, following the same rules as
+    path_outcome. The tiles walked on by every move are gathered in a single array from the walk table.
+
+    Parameters
+    ----------
+    terrain: np.array((width, height))
+        the terrain layer of the map (TERRAIN_WALL, TERRAIN_WIN or 0 for each tile).
+    occupancy: np.array((width, height))
+        the values of the players' traces on each tile, or None to only look at the terrain.
+    position: np.array([,])
+        the position the player starts from.
+    velocities: np.array((move_count, 2))
+        the speed of the player for each move.
+    own_value: int
+        the value of the player's own trace, which he can go over.
+
+    :return: an array with PATH_CLEAR, PATH_CRASH or PATH_WIN for each move.
+    """
+    velocities = np.asarray(velocities)
+    width, height = terrain.shape
+    outcomes = np.full(len(velocities), PATH_CRASH)
+    if position[0] < 0 or position[1] < 0:
+        return outcomes
+    landing = position + velocities
+    inside = (landing[:, 0] >= 0) & (landing[:, 0] < width) & (landing[:, 1] >= 0) & (landing[:, 1] < height)
+    walks = walk_table.padded(velocities[inside])
+    walk = (position[0] + walks[..., 0], position[1] + walks[..., 1])
+    path_terrain = terrain[walk]
+    crash = np.any(path_terrain & TERRAIN_BLOCKING, axis=1)
+    if occupancy is not None:
+        crash |= np.any(occupancy[walk] & (~own_value & 0xFF), axis=1)
+    win = np.any(path_terrain == TERRAIN_WIN, axis=1)
+    outcomes[inside] = np.where(crash, PATH_CRASH, np.where(win, PATH_WIN, PATH_CLEAR))
+    return outcomes
+
+
+def braking_distances(velocities):
+    """Used to get, for each axis of each speed, how far the player goes before stopping if he brakes every turn
+    (x + (x - 1) + ... + 1 tiles for a speed x).
+
+    Parameters
+    ----------
+    velocities: np.array((move_count, 2))
+        the speeds of the player.
+
+    :return: an array with the signed braking distance on each axis.
+    """
+    speed = np.absolute(velocities)
+    return np.sign(velocities) * (speed * (speed + 1) // 2)
+
+
+def evaluate_moves(
+    terrain: np.ndarray,
+    occupancy: np.ndarray,
+    position,
+    speed,
+    own_value: int,
+    candidates: np.ndarray = accelerations,
+    viability=None,
+):
+    """Used to evaluate all the accelerations a player can choose in a single vectorized pass: the outcome of each
+    move, and whether it is unsafe (the same check as Player.collision_speed_check). A move is unsafe if it crashes,
+    or if it lands in a state from which every continuation crashes into the terrain, which the viability table of
+    the map tells exactly. Without a table, the braking distance of the new speed is checked instead.
+
+    Parameters
+    ----------
+    terrain: np.array((width, height))
+        the terrain layer of the map (TERRAIN_WALL, TERRAIN_WIN or 0 for each tile).
+    occupancy: np.array((width, height))
+        the values of the players' traces on each tile, or None to only look at the terrain.
+    position: np.array([,])
+        the position of the player.
+    speed: np.array([,])
+        the current speed of the player.
+    own_value: int
+        the value of the player's own trace, which he can go over.
+    candidates: np.array((move_count, 2)) (optional)
+        the accelerations to evaluate, defaulting to the nine accelerations.
+    viability: ViabilityTable (optional)
+        the viability table of the map (GameMap.viability_table), the braking distance being used if None.
+
+    :return: the array of path outcomes of each move and the array of booleans telling if each move is unsafe.
+    """
+    velocities = np.asarray(speed) + candidates
+    if viability is not None:
+        moves = path_outcomes(terrain, occupancy, position, velocities, own_value)
+        return moves, (moves == PATH_CRASH) | ~viability.viable(np.asarray(position) + velocities, velocities)
+    outcomes = path_outcomes(
+        terrain, occupancy, position, np.concatenate([velocities, braking_distances(velocities)]), own_value
+    )
+    moves = outcomes[:len(candidates)]
+    unsafe = (moves == PATH_CRASH) | (outcomes[len(candidates):] == PATH_CRASH)
+    return moves, unsafe
@@ -0,0 +1,345 @@
+import argparse
+import asyncio
+import itertools
+import os
+import sys
+import numpy as np
+import protocol
+import rules
+from game import Game
+from player import Player
+from player import PlayerState
+from protocol import Message, Reason
+from simulation import RETIRE, start_positions
+
+turn_timeout = 60.0
+"""The time (in seconds) a player has to send his move before he is taken out of the game."""
+
+
+class Connection:
+    """A client connected to the server, playing in a game.
+
+    Attributes
+    ----------
+    reader: asyncio.StreamReader
+        the stream the messages of the client are read from.
+    writer: asyncio.StreamWriter
+        the stream the messages to the client are written to.
+    name: str
+        the name of the player.
+    moves: asyncio.Queue
+        the moves received from the client and not handled yet, as (move number, acceleration index) tuples, None
+        once the client is disconnected.
+    connected: bool
+        whether the client is still connected.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, name: str):
+        self.reader = reader
+        self.writer = writer
+        self.name = name
+        self.moves = asyncio.Queue()
+        self.connected = True
+
+    def send(self, message: Message, payload: bytes = b""):
+        """Used to send a message to the client, doing nothing if he is disconnected."""
+        if self.connected and not self.writer.is_closing():
+            self.writer.write(protocol.frame(message, payload))
+
+
+class RemoteGame:
+    """A game played by remote clients, the server holding its Game and checking every move with the same rules as
+    MyGame: the players play in turn, a player who can't save himself anymore is taken out, and the game ends as soon
+    as a player reaches the finish line or everyone is out. After each move, only what changed (the player's new
+    position, speed and state) is sent to the clients.
+
+    Attributes
+    ----------
+    game_id: int
+        the number of the game on the server.
+    map_number: int
+        the number of the map.
+    player_count: int
+        the number of players the game starts with.
+    connections: list
+        the connection of each player, in the order of their numbers.
+    game: Game
+        the state of the game, None until it starts.
+    move_count: int
+        the number of moves played, used to number the turns sent to the clients.
+    turn_count: int
+        the number of the player whose turn it is.
+
+    Methods
+    -------
+    add(connection)
+        Used to add a player to the game before it starts.
+
+    remove(connection)
+        Used to remove a player from the game before it starts.
+
+    run()
+        Used to play the game until it's over.
+
+    play_turn(player)
+        Used to wait for a valid move of the player and play it.
+
+    end_of_player(player)
+        Used to take the player out of the game if he can't save himself anymore.
+    """
+
+    def __init__(self, game_id: int, map_number: int, player_count: int):
+        """
+        Parameters
+        ----------
+        game_id: int
+            the number of the game on the server.
+        map_number: int
+            the number of the map.
+        player_count: int
+            the number of players the game starts with.
+        """
+        self.game_id = game_id
+        self.map_number = map_number
+        self.player_count = player_count
+        self.connections = []
+        self.game = None
+        self.move_count = 0
+        self.turn_count = 0
+
+    @property
+    def full(self):
+        return len(self.connections) == self.player_count
+
+    def add(self, connection: Connection):
+        """Used to add a player to the game before it starts."""
+        self.connections.append(connection)
+
+    def remove(self, connection: Connection):
+        """Used to remove a player from the game before it starts."""
+        self.connections.remove(connection)
+
+    def broadcast(self, message: Message, payload: bytes = b""):
+        """Used to send a message to every player of the game."""
+        for connection in self.connections:
+            connection.send(message, payload)
+
+    def send_delta(self, player: Player, action: int):
+        """Used to tell every player what changed after a move: the new position, speed and state of the player."""
+        state = player.state_check(self.game.game_map)
+        self.broadcast(Message.DELTA, protocol.DELTA.pack(
+            self.move_count, player.number, action, state.value, *player.position, *player.speed
+        ))
+
+    async def run(self):
+        """Used to create the Game, send its start to every player and play it until it's over, following the turn
+        order of MyGame.run."""
+        self.game = Game(self.map_number)
+        positions = start_positions(self.game.game_map.start_grid, self.player_count)
+        names = [connection.name for connection in self.connections]
+        for number, (position, name) in enumerate(zip(positions, names)):
+            self.game.new_player(number, name, position)
+        for number, connection in enumerate(self.connections):
+            connection.send(Message.START, protocol.encode_start(
+                self.game_id, number, self.map_number, positions, names
+            ))
+        while not self.is_over():
+            player = self.game.player_list[self.turn_count]
+            if player.state_check(self.game.game_map) == PlayerState.IS_OUT:
+                player.has_played = True
+            else:
+                self.game.update(player)
+                if not self.end_of_player(player):
+                    await self.play_turn(player)
+                self.move_count += 1
+            self.turn_count = (self.turn_count + 1) % self.player_count
+            self.game.player_state_reset()
+        ranking = [player.number for player in self.game.ranking()]
+        self.broadcast(Message.END, protocol.END.pack(len(ranking)) + bytes(ranking))
+        for connection in self.connections:
+            if connection.connected:
+                try:
+                    await connection.writer.drain()
+                except ConnectionError:
+                    connection.connected = False
+
+    def is_over(self):
+        """Used to know if the game is over, as in MyGame.end_of_game: a player has won or everyone is out."""
+        states = self.game.player_states()
+        return bool((states == PlayerState.HAS_WON.value).any() or (states == PlayerState.IS_OUT.value).all())
+
+    async def play_turn(self, player: Player):
+        """Used to ask a player for his move and wait for a valid one (the moves that are unsafe or answer to an
+        earlier turn being refused), then play it. A player who doesn't answer within turn_timeout seconds, or who
+        disconnects, is taken out of the game.
+
+        Parameters
+        ----------
+        player: Player
+            the player whose turn it is.
+        """
+        connection = self.connections[player.number]
+        self.broadcast(Message.TURN, protocol.TURN.pack(self.move_count, player.number))
+        while True:
+            try:
+                move = await asyncio.wait_for(connection.moves.get(), turn_timeout) if connection.connected else None
+            except asyncio.TimeoutError:
+                move = None
+            if move is None:
+                self.retire(player)
+                return
+            move_count, action = move
+            if move_count != self.move_count:
+                connection.send(Message.REJECT, protocol.REJECT.pack(move_count, Reason.NOT_YOUR_TURN.value))
+            elif action >= len(rules.accelerations):
+                connection.send(Message.REJECT, protocol.REJECT.pack(move_count, Reason.UNKNOWN_ACTION.value))
+            elif player.collision_speed_check(self.game.game_map, rules.accelerations[action], True):
+                connection.send(Message.REJECT, protocol.REJECT.pack(move_count, Reason.UNSAFE.value))
+            else:
+                break
+        self.move_player(player, action)
+        self.send_delta(player, action)
+        self.end_of_player(player)
+
+    def move_player(self, player: Player, action: int):
+        """Used to move a player with an acceleration, as MyGame.move_player does."""
+        game_map = self.game.game_map
+        player.speed += rules.accelerations[action]
+        outcome = player.path_checking(game_map)
+        if outcome == rules.PATH_CLEAR:
+            game_map.modify_tile_list_state(player.get_walk_coordinates(), 2**player.number)
+            player.plays()
+        elif outcome == rules.PATH_CRASH:
+            player.is_out()
+        else:
+            player.plays()
+
+    def end_of_player(self, player: Player):
+        """Used to take the player out of the game if he can't save himself anymore, with the same check as
+        MyGame.end_of_player with the collision help.
+
+        :return: True if the player has been taken out of the game, False if he can still play.
+        """
+        game_map = self.game.game_map
+        if player.state_check(game_map) != PlayerState.CAN_PLAY:
+            if player.state_check(game_map) == PlayerState.IS_OUT:
+                game_map.remove_previous_move(2**player.number)
+            return player.state_check(game_map) == PlayerState.IS_OUT
+        outcomes, unsafe = player.evaluate_accelerations(game_map, True)
+        unsafe |= game_map.finish_distances(player.position + player.speed + rules.accelerations) < 0
+        if np.all(unsafe):
+            self.retire(player)
+            return True
+        return False
+
+    def retire(self, player: Player):
+        """Used to take a player out of the game, his trace being removed, and tell every player."""
+        player.is_out()
+        player.has_played = True
+        self.game.game_map.remove_previous_move(2**player.number)
+        self.send_delta(player, RETIRE)
+
+
+class GameServer:
+    """A server hosting many games at the same time in a single process. The clients say which map and how many
+    players they want, and are put in the same game until it is full, which then starts.
+
+    Attributes
+    ----------
+    lobbies: dict
+        the game waiting for players, by (map number, number of players).
+    games: dict
+        the games being played, by number.
+    game_ids: itertools.count
+        the numbers given to the games.
+
+    Methods
+    -------
+    handle(reader, writer)
+        Used to serve a client, from his JOIN message until he disconnects.
+
+    start(host, port)
+        Used to start listening for clients.
+    """
+
+    def __init__(self):
+        self.lobbies = {}
+        self.games = {}
+        self.game_ids = itertools.count(1)
+        self.tasks = set()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Used to serve a client: he is added to a game with his JOIN message, then his moves are passed to the game
+        until he disconnects."""
+        message, payload = await protocol.read_frame(reader)
+        if message != Message.JOIN:
+            writer.close()
+            return
+        map_number, player_count = protocol.JOIN.unpack_from(payload)
+        if not 0 < player_count < 9 or not os.path.exists("maps/map" + str(map_number) + ".csv"):
+            writer.close()
+            return
+        connection = Connection(reader, writer, payload[protocol.JOIN.size:].decode(errors="replace"))
+        key = (map_number, player_count)
+        if key not in self.lobbies:
+            self.lobbies[key] = RemoteGame(next(self.game_ids), map_number, player_count)
+        remote_game = self.lobbies[key]
+        remote_game.add(connection)
+        if remote_game.full:
+            del self.lobbies[key]
+            self.games[remote_game.game_id] = remote_game
+            task = asyncio.create_task(remote_game.run())
+            self.tasks.add(task)
+            task.add_done_callback(lambda done: self.end_game(remote_game, done))
+
+        while True:
+            message, payload = await protocol.read_frame(reader)
+            if message is None:
+                break
+            if message == Message.MOVE:
+                connection.moves.put_nowait(protocol.MOVE.unpack(payload))
+        connection.connected = False
+        connection.moves.put_nowait(None)
+        if remote_game.game is None and connection in remote_game.connections:
+            remote_game.remove(connection)
+        writer.close()
+
+    def end_game(self, remote_game: RemoteGame, task: asyncio.Task):
+        """Used to forget a game once it's over, closing the connections of its players."""
+        self.tasks.discard(task)
+        self.games.pop(remote_game.game_id, None)
+        if not task.cancelled() and task.exception() is not None:
+            print("Game", remote_game.game_id, "stopped:", repr(task.exception()), file=sys.stderr)
+        for connection in remote_game.connections:
+            connection.writer.close()
+
+    async def start(self, host: str = "127.0.0.1", port: int = protocol.default_port):
+        """Used to start listening for clients.
+
+        :return: the asyncio.Server.
+        """
+        return await asyncio.start_server(self.handle, host, port)
+
+
+async def serve(host: str, port: int):
+    server = await GameServer().start(host, port)
+    print("Serving on", ", ".join(str(socket.getsockname()) for socket in server.sockets))
+    async with server:
+        await server.serve_forever()
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Hosts games played by remote clients (see client.py).")
+    parser.add_argument("--host", default="127.0.0.1", help="the address to listen on.")
+    parser.add_argument("--port", type=int, default=protocol.default_port, help="the port to listen on.")
+    options = parser.parse_args(arguments)
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        asyncio.run(serve(options.host, options.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,352 @@
+from collections import namedtuple
+from enum import Enum
+import struct
+import numpy as np
+import rules
+from rules import PlayerState
+
+RETIRE = len(rules.accelerations)
+"""The action used when a player is taken out of the game because he can't save himself anymore."""
+
+CAN_PLAY = PlayerState.CAN_PLAY.value
+IS_OUT = PlayerState.IS_OUT.value
+HAS_WON = PlayerState.HAS_WON.value
+
+STATE_VERSION = 1
+STATE_HEADER = struct.Struct("<BBBHH")
+"""version, number of players, turn, width and height of the map of a serialized RaceState."""
+STATE_PLAYER = struct.Struct("<4hbH")
+"""position, speed, PlayerState value and length of the trail of a player in a serialized RaceState."""
+
+Undo = namedtuple("Undo", ["player", "position", "speed", "state", "trail", "turn"])
+"""What a move changes in a RaceState (the values before the move), to undo it with RaceState.undo."""
+
+
+class Event(Enum):
+    """Defines what happened to a player during his move.
+
+    Arguments
+    ---------
+    1: MOVED
+        the player moved to his next tile.
+    2: CRASHED
+        the player crashed (into a wall, another player's trace or out of the map) and is out.
+    3: WON
+        the player reached the finish line.
+    4: RETIRED
+        the player was taken out of the game because he couldn't save himself anymore.
+    """
+
+    MOVED = 1
+    CRASHED = 2
+    WON = 3
+    RETIRED = 4
+
+
+class RaceState:
+    """A class holding everything that changes during a game, without any pygame object, so that games can be
+    simulated headlessly. A state is never modified: applying a move returns a new state sharing the unchanged arrays.
+
+    Attributes
+    ----------
+    terrain: np.array((width, height))
+        the read-only terrain layer of the map (GameMap.terrain), shared between all the states of a game.
+    positions: np.array((player_count, 2))
+        the position of each player, [-1, -1] for the players that are out.
+    speeds: np.array((player_count, 2))
+        the speed of each player.
+    states: np.array(player_count)
+        the PlayerState value of each player.
+    trails: tuple
+        for each player, the flat indexes of the tiles he went over during his last move.
+    turn: int
+        the number of the player who has to play next.
+
+    Methods
+    -------
+    occupancy()
+        Used to get the map of the players' traces.
+
+    is_over()
+        Used to know if the game is over.
+
+    apply(player, action)
+        Used to play a move, getting what is needed to undo it.
+
+    undo(record)
+        Used to get the state as it was before a move.
+
+    to_bytes()
+        Used to serialize the state, without its terrain.
+
+    from_bytes(data, terrain)
+        Used to read a state serialized by to_bytes.
+    """
+
+    def __init__(self, terrain, positions, speeds, states, trails, turn):
+        self.terrain = terrain
+        self.positions = positions
+        self.speeds = speeds
+        self.states = states
+        self.trails = trails
+        self.turn = turn
+        for array in (positions, speeds, states):
+            array.flags.writeable = False
+
+    @property
+    def player_count(self):
+        return len(self.positions)
+
+    def __eq__(self, other):
+        if not isinstance(other, RaceState):
+            return NotImplemented
+        return (
+            self.turn == other.turn
+            and self.terrain.shape == other.terrain.shape
+            and np.array_equal(self.positions, other.positions)
+            and np.array_equal(self.speeds, other.speeds)
+            and np.array_equal(self.states, other.states)
+            and len(self.trails) == len(other.trails)
+            and all(np.array_equal(trail, other_trail) for trail, other_trail in zip(self.trails, other.trails))
+        )
+
+    __hash__ = None
+
+    def occupancy(self):
+        """Used to get the map of the players' traces.
+
+        :return: a uint8 2D array containing, for each tile, the values of the players whose trace is on it (the same
+        layer as GameMap.occupancy).
+        """
+        occupancy = np.zeros(self.terrain.size, dtype=np.uint8)
+        for number, trail in enumerate(self.trails):
+            occupancy[trail] |= np.uint8(2**number)
+        return occupancy.reshape(self.terrain.shape)
+
+    def is_over(self):
+        """Used to know if the game is over, either because a player has won or because everyone is out."""
+        states = self.states.tolist()
+        return HAS_WON in states or states.count(IS_OUT) == len(states)
+
+    def apply(self, player: int, action: int):
+        """Used to play a move (see apply_move), keeping the values it changes so that it can be undone without
+        keeping this state: the cost of both is in the number of players and the length of the trail.
+
+        Parameters
+        ----------
+        player: int
+            the number of the player who plays.
+        action: int
+            the index of the acceleration in rules.accelerations, or RETIRE.
+
+        :return: the new RaceState, the Event of the move and the Undo record of the move.
+        """
+        record = Undo(
+            player, self.positions[player].copy(), self.speeds[player].copy(), self.states[player],
+            self.trails[player], self.turn
+        )
+        state, event = apply_move(self, player, action)
+        return state, event, record
+
+    def undo(self, record: Undo):
+        """Used to get the state as it was before a move.
+
+        Parameters
+        ----------
+        record: Undo
+            the record returned by apply when the move was played.
+
+        :return: the RaceState before the move.
+        """
+        positions = self.positions.copy()
+        speeds = self.speeds.copy()
+        states = self.states.copy()
+        trails = list(self.trails)
+        positions[record.player] = record.position
+        speeds[record.player] = record.speed
+        states[record.player] = record.state
+        trails[record.player] = record.trail
+        return RaceState(self.terrain, positions, speeds, states, tuple(trails), record.turn)
+
+    def trail_type(self):
+        """Used to get the type the trails are serialized with: 16 bits if every tile of the map fits, else 32."""
+        return np.dtype("<u2") if self.terrain.size <= 2**16 else np.dtype("<u4")
+
+    def to_bytes(self):
+        """Used to serialize the state, to save it or send it to another process: a header, then the position, speed,
+        state and trail of each player. The terrain isn't included, only its size.
+
+        :return: the bytes of the state (about 12 bytes per player, plus 2 per tile of their trails).
+        """
+        width, height = self.terrain.shape
+        data = bytearray(STATE_HEADER.pack(STATE_VERSION, self.player_count, self.turn, width, height))
+        trail_type = self.trail_type()
+        for position, speed, state, trail in zip(self.positions, self.speeds, self.states, self.trails):
+            data += STATE_PLAYER.pack(*position, *speed, state, len(trail))
+            data += np.asarray(trail, dtype=trail_type).tobytes()
+        return bytes(data)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, terrain: np.ndarray):
+        """Used to read a state serialized by to_bytes.
+
+        Parameters
+        ----------
+        data: bytes
+            the bytes of the state.
+        terrain: np.array((width, height))
+            the terrain of the map of the state.
+
+        :return: the RaceState.
+        """
+        version, player_count, turn, width, height = STATE_HEADER.unpack_from(data)
+        if version != STATE_VERSION:
+            raise ValueError("Unknown version of the game state: " + str(version))
+        if (width, height) != terrain.shape:
+            raise ValueError("The game state doesn't match the size of the map")
+        state = new_state(terrain, np.zeros((player_count, 2)))
+        positions = np.zeros((player_count, 2), dtype=np.int64)
+        speeds = np.zeros((player_count, 2), dtype=np.int64)
+        states = np.zeros(player_count, dtype=np.int8)
+        trails = []
+        trail_type = state.trail_type()
+        offset = STATE_HEADER.size
+        for player in range(player_count):
+            x, y, speed_x, speed_y, states[player], length = STATE_PLAYER.unpack_from(data, offset)
+            positions[player] = x, y
+            speeds[player] = speed_x, speed_y
+            offset += STATE_PLAYER.size
+            trails.append(np.frombuffer(data, dtype=trail_type, count=length, offset=offset).astype(np.int64))
+            offset += length * trail_type.itemsize
+        return cls(state.terrain, positions, speeds, states, tuple(trails), turn)
+
+
+def new_state(terrain: np.ndarray, positions):
+    """Used to create the state at the beginning of a game.
+
+    Parameters
+    ----------
+    terrain: np.array((width, height))
+        the terrain layer of the map (GameMap.terrain).
+    positions: np.array((player_count, 2))
+        the starting position of each player.
+
+    :return: the RaceState of the first turn.
+    """
+    terrain = np.asarray(terrain, dtype=np.uint8)
+    if terrain.flags.writeable:
+        terrain = terrain.copy()
+        terrain.flags.writeable = False
+    positions = np.array(positions, dtype=np.int64).reshape(-1, 2)
+    states = np.full(len(positions), CAN_PLAY, dtype=np.int8)
+    trails = tuple(np.zeros(0, dtype=np.int64) for _ in range(len(positions)))
+    return RaceState(terrain, positions, np.zeros_like(positions), states, trails, 0)
+
+
+def start_positions(start_grid: np.ndarray, player_count: int):
+    """Used to place the players on the starting grid of a map, the same way as the game does: the first player gets
+    the last slot used and the others fill the grid in order.
+
+    Parameters
+    ----------
+    start_grid: np.array((start_count, 2))
+        the starting positions of the map (GameMap.start_grid).
+    player_count: int
+        the number of players in the game.
+
+    :return: an array with the position of each player.
+    """
+    return np.array([start_grid[player_count - 1]] + [start_grid[a - 1] for a in range(1, player_count)])
+
+
+def apply_move(state: RaceState, player: int, action: int):
+    """Used to make a player play his turn: his trace from the last turn is removed, then he moves with the chosen
+    acceleration following the same rules as Player.path_checking.
+
+    Parameters
+    ----------
+    state: RaceState
+        the state of the game before the move.
+    player: int
+        the number of the player who plays.
+    action: int
+        the index of the acceleration in rules.accelerations, or RETIRE.
+
+    :return: the new RaceState and the Event of the move (None if the player was already out or had won).
+    """
+    if state.states[player] != CAN_PLAY:
+        return state, None
+    positions = state.positions.copy()
+    speeds = state.speeds.copy()
+    states = state.states.copy()
+    trails = list(state.trails)
+    trails[player] = np.zeros(0, dtype=np.int64)
+    next_turn = (player + 1) % state.player_count
+
+    if action == RETIRE:
+        positions[player] = -1
+        speeds[player] = 0
+        states[player] = IS_OUT
+        return RaceState(state.terrain, positions, speeds, states, tuple(trails), next_turn), Event.RETIRED
+
+    speed = speeds[player] + rules.accelerations[action]
+    position = positions[player]
+    width, height = state.terrain.shape
+    landing = position + speed
+    path = None
+    outcome = rules.PATH_CRASH
+    if 0 <= landing[0] < width and 0 <= landing[1] < height:
+        walk_x, walk_y = rules.walk_coordinates(position, speed)
+        path = walk_x * height + walk_y
+        tile = state.terrain.flat[path]
+        crossed = any(
+            number != player and len(trail) > 0 and (path[:, None] == trail).any()
+            for number, trail in enumerate(trails)
+        )
+        if crossed or np.any(tile & rules.TERRAIN_BLOCKING):
+            outcome = rules.PATH_CRASH
+        elif np.any(tile == rules.TERRAIN_WIN):
+            outcome = rules.PATH_WIN
+        else:
+            outcome = rules.PATH_CLEAR
+
+    if outcome == rules.PATH_CRASH:
+        positions[player] = -1
+        speeds[player] = 0
+        states[player] = IS_OUT
+        event = Event.CRASHED
+    else:
+        positions[player] = landing
+        speeds[player] = speed
+        event = Event.MOVED
+        if outcome == rules.PATH_CLEAR:
+            trails[player] = path
+        elif tile[-1] == rules.TERRAIN_WIN:
+            states[player] = HAS_WON
+            event = Event.WON
+    return RaceState(state.terrain, positions, speeds, states, tuple(trails), next_turn), event
+
+
+def step(state: RaceState, actions):
+    """Used to play a whole round: every player still in the game plays once, in order, starting with the player
+    whose turn it is. The round stops as soon as the game is over.
+
+    Parameters
+    ----------
+    state: RaceState
+        the state of the game before the round.
+    actions: list
+        for each player, the index of his acceleration in rules.accelerations (or RETIRE), ignored for the players
+        that are out.
+
+    :return: the new RaceState and the list of (player number, Event) of the round.
+    """
+    events = []
+    for offset in range(state.player_count):
+        if state.is_over():
+            break
+        player = (state.turn + offset) % state.player_count
+        state, event = apply_move(state, player, actions[player])
+        if event is not None:
+            events.append((player, event))
+    return state, events
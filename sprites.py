@@ -0,0 +1,144 @@
+from collections import OrderedDict
+import math
+import pygame
+
+
+def heading(speed_x: int, speed_y: int):
+    """Used to get the direction of a speed, as the smallest integer vector pointing the same way ((4, -2) -> (2, -1)),
+    so that all the speeds going in the same direction share the same sprite.
+
+    Parameters
+    ----------
+    speed_x, speed_y: int
+        the speed of the car.
+
+    :return: a tuple of two integers, (0, 0) for a car that doesn't move.
+    """
+    divider = math.gcd(speed_x, speed_y)
+    if divider == 0:
+        return 0, 0
+    return speed_x // divider, speed_y // divider
+
+
+def heading_angle(direction: tuple):
+    """Used to get the angle a car texture has to be rotated by to point toward a direction, the texture pointing
+    upwards.
+
+    Parameters
+    ----------
+    direction: tuple
+        the heading of the car, as returned by heading.
+
+    :return: the angle in degrees, counterclockwise.
+    """
+    speed_x, speed_y = direction
+    if speed_y == 0:
+        return 180 + 90 * (speed_x > 0) - 90 * (speed_x < 0)
+    if speed_y > 0:
+        return 180 + math.degrees(math.atan(speed_x / speed_y))
+    return math.degrees(math.atan(speed_x / speed_y))
+
+
+class SpriteCache:
+    """A class keeping the textures already scaled to a tile size and rotated toward a heading, so that drawing a car
+    is just a blit. The sprites are shared between all the players using the same texture, and the least recently used
+    ones are dropped once the cache is full.
+
+    Attributes
+    ----------
+    capacity: int
+        the highest number of sprites kept.
+    sprites: OrderedDict
+        the sprites, by (texture, heading, tile_size), from the least to the most recently used.
+    hits: int
+        the number of sprites found in the cache.
+    misses: int
+        the number of sprites that had to be built.
+
+    Methods
+    -------
+    get(texture, speed, tile_size)
+        Used to get the sprite of a texture for a speed and a tile size.
+
+    clear()
+        Used to drop every sprite.
+    """
+
+    def __init__(self, capacity: int = 512):
+        """
+        Parameters
+        ----------
+        capacity: int (optional)
+            the highest number of sprites kept, defaulting to 512.
+        """
+        self.capacity = capacity
+        self.sprites = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, key: tuple):
+        """Used to get a sprite from the cache, marking it as the most recently used.
+
+        Parameters
+        ----------
+        key: tuple
+            the (texture, heading, tile_size) of the sprite.
+
+        :return: the sprite, or None if it isn't cached.
+        """
+        sprite = self.sprites.get(key)
+        if sprite is not None:
+            self.sprites.move_to_end(key)
+            self.hits += 1
+        return sprite
+
+    def store(self, key: tuple, sprite: pygame.Surface):
+        """Used to add a sprite to the cache, dropping the least recently used one if the cache is full.
+
+        Parameters
+        ----------
+        key: tuple
+            the (texture, heading, tile_size) of the sprite.
+        sprite: pygame.Surface
+            the scaled and rotated texture.
+        """
+        self.misses += 1
+        self.sprites[key] = sprite
+        while len(self.sprites) > self.capacity:
+            self.sprites.popitem(last=False)
+
+    def get(self, texture: pygame.Surface, speed, tile_size: int):
+        """Used to get the sprite of a texture for a speed and a tile size, building it (and the scaled texture it is
+        rotated from) the first time.
+
+        Parameters
+        ----------
+        texture: pygame.Surface
+            the texture of the car, pointing upwards.
+        speed: np.array([,])
+            the speed of the car, giving its heading.
+        tile_size: int
+            the size of a tile on the window.
+
+        :return: the surface to blit.
+        """
+        direction = heading(int(speed[0]), int(speed[1]))
+        key = (texture, direction, tile_size)
+        sprite = self.lookup(key)
+        if sprite is not None:
+            return sprite
+        scaled = self.lookup((texture, None, tile_size))
+        if scaled is None:
+            scaled = pygame.transform.scale(texture, (tile_size, tile_size))
+            self.store((texture, None, tile_size), scaled)
+        sprite = pygame.transform.rotate(scaled, heading_angle(direction))
+        self.store(key, sprite)
+        return sprite
+
+    def clear(self):
+        """Used to drop every sprite, for example when the textures are loaded again."""
+        self.sprites.clear()
+
+
+sprite_cache = SpriteCache()
+"""The sprite cache shared by all the players."""
@@ -0,0 +1,289 @@
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+import numpy as np
+import ai
+import rules
+import simulation
+from game_map import GameMap
+
+map_numbers = (1, 2, 3, 4, 5)
+"""The maps the tournament is played on by default."""
+
+max_moves = 300
+"""The highest number of moves of each player before a game is stopped as unfinished."""
+
+loaded_maps = {}
+"""The terrain, starting grid, distance field and viability table of each map loaded by the process, by map number."""
+
+
+def load_map(map_number: int):
+    """Used to load a map once per process, the maps and their starting grids being read from maps/ and positions/.
+
+    :return: the terrain, the starting grid, the distance field and the viability table of the map.
+    """
+    if map_number not in loaded_maps:
+        game_map = GameMap("maps/map" + str(map_number) + ".csv")
+        loaded_maps[map_number] = (
+            game_map.terrain, game_map.start_grid, game_map.distance_field(), game_map.viability_table()
+        )
+    return loaded_maps[map_number]
+
+
+def hopeless(state: simulation.RaceState, player: int, distances: np.ndarray, viability):
+    """Used to know if a player should be taken out of the game, the same way as MyGame.end_of_player with the
+    collision help: every acceleration is unsafe or lands on a tile from which the finish line can't be reached.
+
+    Parameters
+    ----------
+    state: simulation.RaceState
+        the state of the game after the move of the player.
+    player: int
+        the number of the player.
+    distances: np.array((width, height))
+        the distance field of the map.
+    viability: ViabilityTable
+        the viability table of the map.
+    """
+    moves, unsafe = rules.evaluate_moves(
+        state.terrain, state.occupancy(), state.positions[player], state.speeds[player], 2**player,
+        viability=viability
+    )
+    landings = state.positions[player] + state.speeds[player] + rules.accelerations
+    unsafe |= ai.landing_distances(distances, landings) == distances.size
+    return bool(np.all(unsafe))
+
+
+def play_game(map_number: int, seats: tuple, seed: int, budget: float, move_limit: int = max_moves,
+              workers: int = 0):
+    """Used to play a game between AI players without any window, following the turn order and end conditions of
+    MyGame.run: each player still in the game moves in turn, is taken out if he can't save himself anymore, and the
+    game ends as soon as a player reaches the finish line or everyone is out.
+
+    Parameters
+    ----------
+    map_number: int
+        the number of the map.
+    seats: tuple
+        the policy of each player (see ai.policies), in the order of the starting grid.
+    seed: int
+        the seed of the random generator of the game.
+    budget: float
+        the time a monte_carlo player can spend on each move, in seconds.
+    move_limit: int (optional)
+        the highest number of moves of each player before the game is stopped.
+    workers: int (optional)
+        the number of processes of the ai pool running the rollouts of the monte_carlo players, 0 (the default, as
+        the games of a tournament already run on every core) to run them in this process.
+
+    :return: a dictionary describing the game: the map, the seats, the winner (None if nobody won), the outcome and
+    number of moves of each player, and the time it took.
+    """
+    start = time.perf_counter()
+    terrain, start_grid, distances, viability = load_map(map_number)
+    rng = np.random.default_rng(seed)
+    state = simulation.new_state(terrain, simulation.start_positions(start_grid, len(seats)))
+    outcomes = ["playing"] * len(seats)
+    moves = [0] * len(seats)
+    winner = None
+    while not state.is_over():
+        state = ai.next_turn(state)
+        player = state.turn
+        if moves[player] >= move_limit:
+            outcomes = ["unfinished" if outcome == "playing" else outcome for outcome in outcomes]
+            break
+        action = ai.choose_action(
+            state, player, distances, seats[player], budget, workers=workers, rng=rng, viability=viability
+        )
+        state, event = simulation.apply_move(state, player, action)
+        moves[player] += 1
+        if event == simulation.Event.WON:
+            outcomes[player] = "won"
+            winner = player
+        elif event == simulation.Event.CRASHED:
+            outcomes[player] = "crashed"
+        elif hopeless(state, player, distances, viability):
+            state, _ = simulation.apply_move(state, player, simulation.RETIRE)
+            outcomes[player] = "retired"
+    return {
+        "map": map_number,
+        "seats": list(seats),
+        "winner": winner,
+        "outcomes": outcomes,
+        "moves": moves,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def play_task(task: tuple):
+    """Used to play a game of the tournament in a process of the pool (see play_game)."""
+    return play_game(*task)
+
+
+def schedule(policies, player_count: int, maps, games: int, seed: int, budget: float, move_limit: int):
+    """Used to list the games of the tournament: games games on each map for each pairing of policies (every
+    combination of player_count policies), the players changing seats from one game to the next so that no policy
+    keeps the best starting position.
+
+    :return: the list of the arguments of play_game for each game.
+    """
+    pairings = list(itertools.combinations_with_replacement(policies, player_count))
+    seeds = np.random.SeedSequence(seed).generate_state(len(pairings) * len(maps) * games)
+    tasks = []
+    for pairing, map_number, game in itertools.product(pairings, maps, range(games)):
+        rotation = game % player_count
+        seats = pairing[rotation:] + pairing[:rotation]
+        tasks.append((map_number, seats, int(seeds[len(tasks)]), budget, move_limit))
+    return tasks
+
+
+def rate(count: int, total: int):
+    return round(count / total, 4) if total else None
+
+
+def summarize(results: list, seconds: float, workers: int):
+    """Used to aggregate the results of the games of a tournament.
+
+    Parameters
+    ----------
+    results: list
+        the dictionaries returned by play_game.
+    seconds: float
+        the time the whole tournament took.
+    workers: int
+        the number of processes that played the games.
+
+    :return: a dictionary with the totals, the results of each policy (win, crash and retirement rates, moves needed
+    to win), of each map (how often it is finished, and the win rate of each starting position) and of each pairing.
+    """
+    policies = {}
+    maps = {}
+    pairings = {}
+    for result in results:
+        map_entry = maps.setdefault(str(result["map"]), {
+            "games": 0, "finished": 0, "unfinished": 0, "winning_moves": [], "seat_games": {}, "seat_wins": {}
+        })
+        map_entry["games"] += 1
+        map_entry["finished"] += result["winner"] is not None
+        map_entry["unfinished"] += "unfinished" in result["outcomes"]
+        pairing = " vs ".join(sorted(result["seats"]))
+        pairing_entry = pairings.setdefault(pairing, {"games": 0, "draws": 0, "wins": {}})
+        pairing_entry["games"] += 1
+        pairing_entry["draws"] += result["winner"] is None
+        for seat, (policy, outcome, moves) in enumerate(zip(result["seats"], result["outcomes"], result["moves"])):
+            entry = policies.setdefault(policy, {
+                "players": 0, "won": 0, "crashed": 0, "retired": 0, "winning_moves": []
+            })
+            entry["players"] += 1
+            map_entry["seat_games"][seat] = map_entry["seat_games"].get(seat, 0) + 1
+            if outcome in ("won", "crashed", "retired"):
+                entry[outcome] += 1
+            if outcome == "won":
+                entry["winning_moves"].append(moves)
+                map_entry["winning_moves"].append(moves)
+                map_entry["seat_wins"][seat] = map_entry["seat_wins"].get(seat, 0) + 1
+                pairing_entry["wins"][policy] = pairing_entry["wins"].get(policy, 0) + 1
+
+    for entry in policies.values():
+        winning_moves = entry.pop("winning_moves")
+        entry.update({
+            "win_rate": rate(entry["won"], entry["players"]),
+            "crash_rate": rate(entry["crashed"], entry["players"]),
+            "retire_rate": rate(entry["retired"], entry["players"]),
+            "mean_moves_to_win": round(float(np.mean(winning_moves)), 2) if winning_moves else None,
+        })
+    for entry in maps.values():
+        winning_moves = entry.pop("winning_moves")
+        seat_games = entry.pop("seat_games")
+        seat_wins = entry.pop("seat_wins")
+        entry.update({
+            "finish_rate": rate(entry["finished"], entry["games"]),
+            "mean_moves_to_win": round(float(np.mean(winning_moves)), 2) if winning_moves else None,
+            "median_moves_to_win": float(np.median(winning_moves)) if winning_moves else None,
+            "seat_win_rates": {
+                str(seat): rate(seat_wins.get(seat, 0), games) for seat, games in sorted(seat_games.items())
+            },
+        })
+    return {
+        "games": len(results),
+        "seconds": round(seconds, 3),
+        "games_per_second": round(len(results) / seconds, 3) if seconds else None,
+        "workers": workers,
+        "policies": policies,
+        "maps": maps,
+        "pairings": pairings,
+    }
+
+
+def run(tasks: list, workers: int):
+    """Used to play the games of a tournament, on workers processes (in this process if workers is 0).
+
+    :return: the list of the results of the games, in the order of the tasks.
+    """
+    if workers == 0:
+        return [play_task(task) for task in tasks]
+    chunk = max(1, len(tasks) // (workers * 8))
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        results = []
+        for result in executor.map(play_task, tasks, chunksize=chunk):
+            results.append(result)
+            if len(results) % max(1, len(tasks) // 20) == 0:
+                print("Played", len(results), "/", len(tasks), "games", file=sys.stderr)
+        return results
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Plays AI players against each other on the maps, without any window.")
+    parser.add_argument("--policy", action="append", choices=ai.policies,
+                        help="a policy taking part in the tournament (all of them by default), can be repeated.")
+    parser.add_argument("--players", type=int, default=2, help="the number of players in each game (2 by default).")
+    parser.add_argument("--map", action="append", type=int, choices=map_numbers,
+                        help="a map to play on (all of them by default), can be repeated.")
+    parser.add_argument("--games", type=int, default=10, help="the number of games per pairing and per map.")
+    parser.add_argument("--budget", type=float, default=0.05,
+                        help="the time a monte_carlo player can spend on each move, in seconds.")
+    parser.add_argument("--max-moves", type=int, default=max_moves,
+                        help="the number of moves of a player after which a game is stopped as unfinished.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="the number of processes playing games (one per core by default, 0 to play in this one).")
+    parser.add_argument("--seed", type=int, default=None, help="the seed of the tournament, to play it again.")
+    parser.add_argument("--output", default="tournament.json", help="the JSON file the summary is written to.")
+    parser.add_argument("--games-file", help="a JSON file to write the result of every game to.")
+    options = parser.parse_args(arguments)
+    if not 0 < options.players < 9:
+        parser.error("there can be between 1 and 8 players in a game")
+
+    output = os.path.abspath(options.output)
+    games_file = os.path.abspath(options.games_file) if options.games_file else None
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    seed = options.seed if options.seed is not None else int(np.random.SeedSequence().entropy % 2**32)
+    tasks = schedule(options.policy or ai.policies, options.players, options.map or map_numbers, options.games, seed,
+                     options.budget, options.max_moves)
+    print("Playing", len(tasks), "games on", options.workers, "processes (seed", str(seed) + ")", file=sys.stderr)
+    start = time.perf_counter()
+    results = run(tasks, options.workers)
+    summary = summarize(results, time.perf_counter() - start, options.workers)
+    summary["seed"] = seed
+    summary["players"] = options.players
+    summary["budget"] = options.budget
+
+    with open(output, "w") as file:
+        json.dump(summary, file, indent=2)
+    if games_file:
+        with open(games_file, "w") as file:
+            json.dump(results, file)
+    for policy, entry in sorted(summary["policies"].items()):
+        print(policy.ljust(12), "win", entry["win_rate"], "crash", entry["crash_rate"], "retire", entry["retire_rate"],
+              file=sys.stderr)
+    print(summary["games"], "games in", summary["seconds"], "s,", summary["games_per_second"], "games/s, summary in",
+          output, file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
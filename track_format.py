@@ -0,0 +1,179 @@
+import glob
+import os
+import struct
+import numpy as np
+import map_cache
+import rules
+
+MAGIC = b"CARTRACK"
+VERSION = 2
+HEADER = struct.Struct("<8sHHHH4q")
+"""magic, version, width, height, number of starting positions, then the signatures of the map and positions csv
+files (modification time and size of each)."""
+HEADER_SIZE = 64
+"""The size of the header once padded, so that the terrain starts on an aligned offset."""
+TRACK_SUFFIX = ".track"
+
+loaded_tracks = {}
+"""The tracks already mapped in memory by this process, by path, along with the signatures they were built from."""
+
+
+class Track:
+    """A class holding the terrain and starting positions of a map, as stored in a compiled track file.
+
+    Attributes
+    ---------
+    terrain: np.array((width, height))
+        the read-only, memory-mapped uint8 terrain (rules.TERRAIN_WALL, rules.TERRAIN_WIN or 0 for each tile).
+    starts: np.array((start_count, 2))
+        the read-only, memory-mapped uint16 starting positions, in the order of the positions csv file.
+    width: int
+        the width (x coordinates) of the map.
+    height: int
+        the height (y coordinates) of the map.
+    """
+
+    def __init__(self, terrain: np.ndarray, starts: np.ndarray):
+        """
+        Parameters
+        ----------
+        terrain: np.array((width, height))
+            the terrain of the map.
+        starts: np.array((start_count, 2))
+            the starting positions of the map.
+        """
+        self.terrain = terrain
+        self.starts = starts
+        self.width, self.height = terrain.shape
+
+
+def position_file(map_file: str):
+    """Used to get the starting positions csv file matching a map csv file (maps/map1.csv -> positions/position1.csv).
+
+    Parameters
+    ----------
+    map_file: str
+        the path of the map csv file.
+    """
+    folder, name = os.path.split(map_file)
+    return os.path.join(os.path.dirname(folder), "positions", name.replace("map", "position", 1))
+
+
+def signatures(map_file: str):
+    """Used to get the signatures of the csv files a track is compiled from, the positions one being zeros if the
+    map has no starting positions file.
+
+    Parameters
+    ----------
+    map_file: str
+        the path of the map csv file.
+    """
+    positions = position_file(map_file)
+    if os.path.exists(positions):
+        return np.concatenate([map_cache.source_signature(map_file), map_cache.source_signature(positions)])
+    return np.concatenate([map_cache.source_signature(map_file), np.zeros(2, dtype=np.int64)])
+
+
+def starts_offset(width: int, height: int):
+    """Used to get where the starting positions begin in a track file, right after the terrain but on an offset
+    aligned for them.
+
+    Parameters
+    ----------
+    width, height: int
+        the size of the map.
+    """
+    return HEADER_SIZE + (width * height + 7) // 8 * 8
+
+
+def compile_track(map_file: str, track_file: str = None):
+    """Used to convert a map csv file (and its starting positions csv file) into a compiled track file.
+
+    The csv files store the integer tile flags as floats (2.560000000000000000e+02), so they are read as floats
+    before being converted. Only the terrain is kept (the flags shifted by rules.TERRAIN_SHIFT), one byte per tile.
+
+    Parameters
+    ----------
+    map_file: str
+        the path of the map csv file.
+    track_file: str (optional)
+        the path of the track file to write, defaulting to the map csv path with a .track extension.
+
+    :return: the path of the track file.
+    """
+    if track_file is None:
+        track_file = map_cache.cache_path(map_file, TRACK_SUFFIX)
+    tiles = np.loadtxt(map_file, delimiter=",", ndmin=2).astype(np.int64)
+    terrain = (tiles >> rules.TERRAIN_SHIFT).astype(np.uint8)
+    positions = position_file(map_file)
+    if os.path.exists(positions):
+        starts = np.loadtxt(positions, delimiter=",", ndmin=2).astype("<u2")
+    else:
+        starts = np.zeros((0, 2), dtype="<u2")
+
+    width, height = terrain.shape
+    header = HEADER.pack(MAGIC, VERSION, width, height, len(starts), *signatures(map_file))
+    temporary = track_file + "." + str(os.getpid()) + ".tmp"
+    with open(temporary, "wb") as file:
+        file.write(header.ljust(HEADER_SIZE, b"\0"))
+        file.write(np.ascontiguousarray(terrain).tobytes().ljust(starts_offset(width, height) - HEADER_SIZE, b"\0"))
+        file.write(np.ascontiguousarray(starts).tobytes())
+    os.replace(temporary, track_file)
+    return track_file
+
+
+def read_track(track_file: str):
+    """Used to map a compiled track file in memory.
+
+    Parameters
+    ----------
+    track_file: str
+        the path of the track file.
+
+    :return: the Track and the signatures of the csv files it was compiled from, or None if the file is not a valid
+    track file.
+    """
+    try:
+        with open(track_file, "rb") as file:
+            header = file.read(HEADER.size)
+        magic, version, width, height, start_count, *source = HEADER.unpack(header)
+    except (OSError, struct.error):
+        return None
+    if magic != MAGIC or version != VERSION:
+        return None
+    terrain = np.memmap(track_file, dtype=np.uint8, mode="r", offset=HEADER_SIZE, shape=(width, height))
+    starts = np.memmap(
+        track_file, dtype="<u2", mode="r", offset=starts_offset(width, height), shape=(start_count, 2)
+    ) if start_count else np.zeros((0, 2), dtype="<u2")
+    return Track(terrain, starts), np.array(source, dtype=np.int64)
+
+
+def load_track(map_file: str):
+    """Used to get the compiled track of a map csv file, compiling it again if the csv files changed since.
+
+    Tracks are memory-mapped read-only, so loading one is near-instant and its pages are shared between the
+    processes using it. Each process also keeps the tracks it already mapped, as long as the csv files don't change.
+
+    Parameters
+    ----------
+    map_file: str
+        the path of the map csv file.
+
+    :return: the Track of the map.
+    """
+    source = signatures(map_file)
+    if map_file in loaded_tracks and np.array_equal(loaded_tracks[map_file][1], source):
+        return loaded_tracks[map_file][0]
+    loaded_tracks.pop(map_file, None)
+    track_file = map_cache.cache_path(map_file, TRACK_SUFFIX)
+    compiled = read_track(track_file)
+    if compiled is None or not np.array_equal(compiled[1], source):
+        compile_track(map_file, track_file)
+        compiled = read_track(track_file)
+    loaded_tracks[map_file] = compiled
+    return compiled[0]
+
+
+if __name__ == "__main__":
+    for csv_file in sorted(glob.glob(os.path.join("maps", "map*.csv"))):
+        print("Compiled", csv_file, "to", compile_track(csv_file))
@@ -0,0 +1,283 @@
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import rules
+
+start_slots = 8
+"""The number of starting positions of a generated track, as many as the players a game can have."""
+batch_size = 256
+"""The number of candidate tracks generated and checked at once."""
+
+
+def smooth(walls: np.ndarray, steps: int):
+    """Used to turn random noise into blobs of walls with a cellular automaton: a tile becomes a wall when at least
+    five of its eight neighbours are walls, and stays one when at least four are. The tiles outside of the map count
+    as open.
+
+    Parameters
+    ----------
+    walls: np.array((batch, width, height))
+        the walls of each track.
+    steps: int
+        the number of steps of the automaton.
+
+    :return: the smoothed walls.
+    """
+    width, height = walls.shape[1:]
+    for _ in range(steps):
+        padded = np.pad(walls, ((0, 0), (1, 1), (1, 1))).astype(np.uint8)
+        neighbours = sum(
+            padded[:, 1 + dx:1 + dx + width, 1 + dy:1 + dy + height]
+            for dx in (-1, 0, 1) for dy in (-1, 0, 1) if dx or dy
+        )
+        walls = (neighbours >= 5) | (walls & (neighbours >= 4))
+    return walls
+
+
+def candidates(rng: np.random.Generator, count: int, width: int, height: int, density: float, steps: int):
+    """Used to generate random tracks: blobs of walls, a column of starting positions near the left side and a finish
+    line on the right side, both cleared of walls.
+
+    Parameters
+    ----------
+    rng: np.random.Generator
+        the random generator of the tracks.
+    count: int
+        the number of tracks.
+    width, height: int
+        the size of the tracks.
+    density: float
+        the share of walls in the noise the walls are grown from.
+    steps: int
+        the number of smoothing steps (see smooth).
+
+    :return: the terrain of each track as an array of shape (count, width, height), and the starting positions of each
+    track as an array of shape (count, start_slots, 2).
+    """
+    walls = smooth(rng.random((count, width, height)) < density, steps)
+    xs = np.arange(width)[None, :, None]
+    ys = np.arange(height)[None, None, :]
+
+    start_y = rng.integers(0, height - start_slots + 1, size=count)[:, None, None]
+    start_area = (xs < 4) & (ys >= start_y - 1) & (ys <= start_y + start_slots)
+    finish_height = rng.integers(3, max(4, height // 3), size=count)[:, None, None]
+    finish_y = rng.integers(0, height - finish_height + 1)
+    finish = (xs >= width - 3) & (ys >= finish_y) & (ys < finish_y + finish_height)
+    walls &= ~start_area & ~finish
+
+    terrain = np.where(walls, rules.TERRAIN_WALL, 0).astype(np.uint8)
+    terrain[finish] = rules.TERRAIN_WIN
+    starts = np.empty((count, start_slots, 2), dtype=int)
+    starts[:, :, 0] = 1
+    starts[:, :, 1] = start_y[:, :, 0] + np.arange(start_slots)[::-1]
+    return terrain, starts
+
+
+def distance_fields(terrains: np.ndarray):
+    """Used to get the distance field of many tracks at once, with the same breadth-first search as
+    GameMap.distance_field: every step grows the frontier of all the tracks to the eight neighbours of its tiles.
+
+    Parameters
+    ----------
+    terrains: np.array((batch, width, height))
+        the terrain of each track.
+
+    :return: an array with the number of moves from each tile to the finish line of its track, -1 if the finish line
+    can't be reached.
+    """
+    passable = (terrains & rules.TERRAIN_WALL) == 0
+    frontier = passable & ((terrains & rules.TERRAIN_WIN) != 0)
+    reached = frontier.copy()
+    distances = np.full(terrains.shape, -1, dtype=np.int32)
+    distances[frontier] = 0
+    step = 0
+    while frontier.any():
+        step += 1
+        grown = frontier.copy()
+        grown[:, 1:, :] |= frontier[:, :-1, :]
+        grown[:, :-1, :] |= frontier[:, 1:, :]
+        spread = grown.copy()
+        spread[:, :, 1:] |= grown[:, :, :-1]
+        spread[:, :, :-1] |= grown[:, :, 1:]
+        frontier = spread & passable & ~reached
+        distances[frontier] = step
+        reached |= frontier
+    return distances
+
+
+def verify(terrains: np.ndarray, starts: np.ndarray, min_length: int, max_spread: int):
+    """Used to know which tracks can be raced: the finish line has to be reachable from every starting position, far
+    enough from them, and at almost the same distance from each of them so that no starting position is favoured.
+
+    Parameters
+    ----------
+    terrains: np.array((batch, width, height))
+        the terrain of each track.
+    starts: np.array((batch, start_slots, 2))
+        the starting positions of each track.
+    min_length: int
+        the least number of moves from a starting position to the finish line.
+    max_spread: int
+        the highest difference between the distances of two starting positions of a track.
+
+    :return: an array of booleans, True for the tracks that can be raced.
+    """
+    distances = distance_fields(terrains)
+    batch = np.arange(len(terrains))[:, None]
+    start_distances = distances[batch, starts[:, :, 0], starts[:, :, 1]]
+    return (
+        (start_distances >= 0).all(axis=1)
+        & (start_distances.min(axis=1) >= min_length)
+        & (start_distances.max(axis=1) - start_distances.min(axis=1) <= max_spread)
+    )
+
+
+def track_files(folder: str, number: int):
+    """Used to get the csv files of a track: folder/maps/map<number>.csv and folder/positions/position<number>.csv.
+
+    :return: the paths of the map and positions csv files.
+    """
+    return (os.path.join(folder, "maps", "map" + str(number) + ".csv"),
+            os.path.join(folder, "positions", "position" + str(number) + ".csv"))
+
+
+def save_track(folder: str, number: int, terrain: np.ndarray, starts: np.ndarray):
+    """Used to write a track in the same csv files as the maps of the game: folder/maps/map<number>.csv, holding the
+    tile flags as floats, and folder/positions/position<number>.csv holding the starting positions.
+
+    Parameters
+    ----------
+    folder: str
+        the folder holding the maps and positions folders.
+    number: int
+        the number of the map.
+    terrain: np.array((width, height))
+        the terrain of the track.
+    starts: np.array((start_count, 2))
+        the starting positions of the track.
+    """
+    map_file, positions_file = track_files(folder, number)
+    tiles = terrain.astype(np.int64) << rules.TERRAIN_SHIFT
+    np.savetxt(map_file, tiles.astype(float), delimiter=",")
+    np.savetxt(positions_file, starts.astype(float), delimiter=",")
+
+
+def generate_task(task: tuple):
+    """Used to generate and save the tracks of a task (see generate), batch after batch until there are enough.
+
+    :return: the number of candidate tracks generated and the number of tracks saved.
+    """
+    folder, numbers, seed, width, height, density, steps, min_length, max_spread = task
+    rng = np.random.default_rng(seed)
+    tried = 0
+    saved = 0
+    while saved < len(numbers):
+        terrains, starts = candidates(rng, batch_size, width, height, density, steps)
+        tried += batch_size
+        for index in np.flatnonzero(verify(terrains, starts, min_length, max_spread))[:len(numbers) - saved]:
+            save_track(folder, numbers[saved], terrains[index], starts[index])
+            saved += 1
+        if tried >= batch_size * 1000 and saved == 0:
+            raise ValueError("No track of size " + str(width) + "x" + str(height) + " can be raced with these settings")
+    return tried, saved
+
+
+def generate(folder: str, count: int, width: int, height: int, seed: int, workers: int, first: int = 1,
+             density: float = 0.45, steps: int = 4, min_length: int = None, max_spread: int = 1, force: bool = False):
+    """Used to generate tracks on workers processes (in this process if workers is 0), each one getting its share of
+    the map numbers and its own random seed. Nothing is generated if one of the csv files of the tracks already
+    exists, unless force is True.
+
+    Parameters
+    ----------
+    folder: str
+        the folder the maps and positions folders are written to.
+    count: int
+        the number of tracks.
+    width, height: int
+        the size of the tracks.
+    seed: int
+        the seed of the generation, to generate the same tracks again.
+    workers: int
+        the number of processes generating tracks.
+    first: int (optional)
+        the number of the first map.
+    density, steps: (optional)
+        the settings of the walls (see candidates).
+    min_length: int (optional)
+        the least number of moves from a starting position to the finish line, half the width by default.
+    max_spread: int (optional)
+        the highest difference between the distances of the starting positions of a track to the finish line.
+    force: bool (optional)
+        whether to overwrite the csv files that already exist.
+
+    :return: the number of candidate tracks generated and the number of tracks saved.
+    """
+    if width < 8 or height < start_slots + 2:
+        raise ValueError("A track must be at least 8x" + str(start_slots + 2))
+    if min_length is None:
+        min_length = width // 2
+    if not force:
+        for number in range(first, first + count):
+            for path in track_files(folder, number):
+                if os.path.exists(path):
+                    raise FileExistsError(path + " already exists, use --force to overwrite it")
+    os.makedirs(os.path.join(folder, "maps"), exist_ok=True)
+    os.makedirs(os.path.join(folder, "positions"), exist_ok=True)
+    numbers = np.arange(first, first + count)
+    shares = [share.tolist() for share in np.array_split(numbers, max(1, workers * 4)) if len(share)]
+    seeds = np.random.SeedSequence(seed).spawn(len(shares))
+    tasks = [
+        (folder, share, task_seed, width, height, density, steps, min_length, max_spread)
+        for share, task_seed in zip(shares, seeds)
+    ]
+    if workers == 0:
+        results = [generate_task(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            results = list(executor.map(generate_task, tasks))
+    return sum(tried for tried, _ in results), sum(saved for _, saved in results)
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Generates random tracks that every starting position can race on.")
+    parser.add_argument("--count", type=int, default=100, help="the number of tracks to generate.")
+    parser.add_argument("--width", type=int, default=40, help="the width of the tracks.")
+    parser.add_argument("--height", type=int, default=25, help="the height of the tracks.")
+    parser.add_argument("--output", default="generated",
+                        help="the folder the maps and positions folders are written to.")
+    parser.add_argument("--first", type=int, default=1, help="the number of the first map.")
+    parser.add_argument("--density", type=float, default=0.45, help="the share of walls in the starting noise.")
+    parser.add_argument("--steps", type=int, default=4, help="the number of smoothing steps of the walls.")
+    parser.add_argument("--min-length", type=int, default=None,
+                        help="the least number of moves to the finish line (half the width by default).")
+    parser.add_argument("--max-spread", type=int, default=1,
+                        help="the highest difference between the distances of the starting positions to the finish.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="the number of processes generating tracks (one per core by default, 0 to use this one).")
+    parser.add_argument("--seed", type=int, default=None, help="the seed of the generation, to generate it again.")
+    parser.add_argument("--force", action="store_true", help="overwrite the maps and positions that already exist.")
+    options = parser.parse_args(arguments)
+
+    seed = options.seed if options.seed is not None else int(np.random.SeedSequence().entropy % 2**32)
+    print("Generating", options.count, "tracks on", options.workers, "processes (seed", str(seed) + ")",
+          file=sys.stderr)
+    start = time.perf_counter()
+    try:
+        tried, saved = generate(options.output, options.count, options.width, options.height, seed, options.workers,
+                                options.first, options.density, options.steps, options.min_length, options.max_spread,
+                                options.force)
+    except (ValueError, FileExistsError) as error:
+        parser.error(str(error))
+    seconds = time.perf_counter() - start
+    print(saved, "tracks saved in", options.output, "out of", tried, "candidates in", round(seconds, 3), "s,",
+          round(saved / seconds * 60), "tracks/min", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+import numpy as np
+import rules
+
+VERSION = 1
+"""The version of the way the tables are computed, the cached tables being computed again when it changes."""
+
+
+def speed_limit(length: int):
+    """Used to know the highest speed a car starting at rest can reach on an axis of a given length: going from a
+    speed 0 to a speed v moves the car by at least 1 + ... + v tiles, which can't be more than the length of the axis.
+
+    Parameters
+    ----------
+    length: int
+        the number of tiles of the map on this axis.
+    """
+    speed = 0
+    while (speed + 1) * (speed + 2) // 2 <= length - 1:
+        speed += 1
+    return speed
+
+
+class ViabilityTable:
+    """A class telling, for every state of a car on a map (its position and its speed), whether the car can keep
+    moving forever without crashing into a wall or going out of the map, or reach the finish line. A car in any
+    other state will crash whatever it does, even if it isn't obvious yet.
+
+    The table is computed by backward induction: every state on a tile that can be run on starts as viable, then a
+    state stays viable only if one of the nine accelerations leads, through a clear path, to a viable state, until
+    nothing changes. Since every car moves the same way from every tile, each step handles all the tiles of a speed at
+    once with array shifts. Only the terrain is looked at, not the players' traces. The result is kept as a packed
+    bit array, one bit per state.
+
+    Attributes
+    ----------
+    width: int
+        the width of the map.
+    height: int
+        the height of the map.
+    max_speed_x: int
+        the highest speed on the x axis held by the table (the highest a car can reach on this map).
+    max_speed_y: int
+        the highest speed on the y axis held by the table.
+    bits: np.array
+        the packed bits of the table, indexed by speed (x then y) then by tile.
+
+    Methods
+    -------
+    compute(terrain)
+        Used to compute the table of a map.
+
+    viable(positions, speeds)
+        Used to know whether several states are viable.
+    """
+
+    def __init__(self, width: int, height: int, max_speed_x: int, max_speed_y: int, bits: np.ndarray):
+        """
+        Parameters
+        ----------
+        width, height: int
+            the size of the map.
+        max_speed_x, max_speed_y: int
+            the highest speed on each axis held by the table.
+        bits: np.array
+            the packed bits of the table (see compute).
+        """
+        self.width = width
+        self.height = height
+        self.max_speed_x = max_speed_x
+        self.max_speed_y = max_speed_y
+        self.bits = bits
+
+    @classmethod
+    def compute(cls, terrain: np.ndarray):
+        """Used to compute the table of a map.
+
+        Parameters
+        ----------
+        terrain: np.array((width, height))
+            the terrain layer of the map (GameMap.terrain).
+
+        :return: the ViabilityTable.
+        """
+        width, height = terrain.shape
+        max_speed_x = speed_limit(width)
+        max_speed_y = speed_limit(height)
+        passable = (terrain & rules.TERRAIN_BLOCKING) == 0
+        win = terrain == rules.TERRAIN_WIN
+        speeds_x = range(-max_speed_x, max_speed_x + 1)
+        speeds_y = range(-max_speed_y, max_speed_y + 1)
+
+        clear = np.zeros((len(speeds_x), len(speeds_y), width, height), dtype=bool)
+        for i, speed_x in enumerate(speeds_x):
+            for j, speed_y in enumerate(speeds_y):
+                x0, x1 = max(0, -speed_x), min(width, width - speed_x)
+                y0, y1 = max(0, -speed_y), min(height, height - speed_y)
+                if x0 >= x1 or y0 >= y1:
+                    continue
+                path = np.ones((x1 - x0, y1 - y0), dtype=bool)
+                for offset_x, offset_y in rules.walk_table.walk(speed_x, speed_y):
+                    path &= passable[x0 + offset_x:x1 + offset_x, y0 + offset_y:y1 + offset_y]
+                clear[i, j, x0:x1, y0:y1] = path
+
+        viable = np.broadcast_to(passable, clear.shape).copy()
+        reach = np.zeros_like(clear)
+        while True:
+            for i, speed_x in enumerate(speeds_x):
+                for j, speed_y in enumerate(speeds_y):
+                    x0, x1 = max(0, -speed_x), min(width, width - speed_x)
+                    y0, y1 = max(0, -speed_y), min(height, height - speed_y)
+                    reach[i, j, x0:x1, y0:y1] = (
+                        clear[i, j, x0:x1, y0:y1]
+                        & viable[i, j, x0 + speed_x:x1 + speed_x, y0 + speed_y:y1 + speed_y]
+                    )
+            escape = np.zeros_like(viable)
+            for acceleration_x, acceleration_y in rules.accelerations:
+                source_x = slice(max(0, -acceleration_x), len(speeds_x) - max(0, acceleration_x))
+                source_y = slice(max(0, -acceleration_y), len(speeds_y) - max(0, acceleration_y))
+                target_x = slice(max(0, acceleration_x), len(speeds_x) + min(0, acceleration_x))
+                target_y = slice(max(0, acceleration_y), len(speeds_y) + min(0, acceleration_y))
+                escape[source_x, source_y] |= reach[target_x, target_y]
+            updated = passable & (win | escape)
+            if np.array_equal(updated, viable):
+                break
+            viable = updated
+        return cls(width, height, max_speed_x, max_speed_y, np.packbits(viable.ravel()))
+
+    def viable(self, positions, speeds):
+        """Used to know whether several states are viable. The states outside of the map, or with a speed too high to
+        be reached on this map, are not.
+
+        Parameters
+        ----------
+        positions: np.array((count, 2))
+            the position of the car in each state.
+        speeds: np.array((count, 2))
+            the speed of the car in each state.
+
+        :return: an array of booleans, True for the viable states.
+        """
+        positions = np.asarray(positions).reshape(-1, 2)
+        speeds = np.asarray(speeds).reshape(-1, 2)
+        held = (
+            (positions[:, 0] >= 0) & (positions[:, 0] < self.width)
+            & (positions[:, 1] >= 0) & (positions[:, 1] < self.height)
+            & (np.absolute(speeds[:, 0]) <= self.max_speed_x) & (np.absolute(speeds[:, 1]) <= self.max_speed_y)
+        )
+        speed_index = (speeds[:, 0] + self.max_speed_x) * (2 * self.max_speed_y + 1) + speeds[:, 1] + self.max_speed_y
+        index = (speed_index * self.width + positions[:, 0]) * self.height + positions[:, 1]
+        index = np.where(held, index, 0)
+        return held & ((self.bits[index >> 3] >> (7 - (index & 7))) & 1).astype(bool)